@@ -1,17 +1,89 @@
-from ultralytics import YOLO
+import argparse
 import cv2
+import json
+import signal
+import threading
 import time
-import random
 import numpy as np
-from datetime import datetime, timedelta
+from frame_pipeline import LatestQueue, start_pipeline, stop_pipeline
+from capture_device import DEFAULT_MODE_CACHE, CaptureDevice
+from motion_gate import MotionGate
+from box_tracker import BoxTracker
+from detections import NO_DETECTIONS, class_id, class_mask, scale_boxes
+from distraction_engine import DistractionEngine
+from study_bots import (format_time, get_average_session_length, get_book_recommendation,
+                        get_mental_health_recommendation, get_phone_distraction_percentage,
+                        get_study_recommendation)
+from detection_trace import DetectionTrace, TraceRecorder, TraceWriter
+from stage_metrics import StageMetrics, serve_metrics
+from event_server import EventServer
+from event_store import EventStore
+from analytics import DEFAULT_ANALYTICS_DIR, Analytics
+from inference_backends import BACKENDS, ModelLoader, build_detector, load_model
+from shm_ring import start_process_pipeline
+from overlays import LayerCache
+from widgets import Panel, Widget, WidgetTree
+from text_layout import text_size, wrap_text
+
+# Startup times (first frame, first detection) are measured from here
+app_started = time.perf_counter()
 
 global show_study_bot, show_mental_bot, show_book_recs, current_study_recommendation, current_mental_recommendation, current_book_recommendations
 
-model = YOLO("yolov8n.pt")
-video_capture = cv2.VideoCapture(0)
+parser = argparse.ArgumentParser(description="Study Focus Monitor")
+parser.add_argument("--headless", action="store_true",
+                    help="no window or overlays; print distraction events and stats as JSON lines")
+parser.add_argument("--stats-interval", type=float, default=5.0,
+                    help="seconds between stats lines in headless mode")
+parser.add_argument("--record", metavar="TRACE",
+                    help="append every frame's detections to a trace file")
+parser.add_argument("--replay", metavar="TRACE",
+                    help="run on a recorded trace instead of the camera and model")
+parser.add_argument("--show-metrics", action="store_true",
+                    help="start with the FPS / stage latency readout in the title bar ('f' toggles it)")
+parser.add_argument("--metrics-file", metavar="PATH",
+                    help="periodically write stage metrics here (JSON for *.json, Prometheus text otherwise)")
+parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                    help="serve stage metrics on http://127.0.0.1:PORT/metrics and /metrics.json")
+parser.add_argument("--events-port", type=int, metavar="PORT",
+                    help="push distraction events and focus stats to dashboards on ws://127.0.0.1:PORT/events")
+parser.add_argument("--events-origin", action="append", default=[], metavar="ORIGIN",
+                    help="also let the dashboard served from ORIGIN (e.g. http://localhost:8081) connect; repeatable")
+parser.add_argument("--store", metavar="PATH",
+                    help="keep every distraction and a focus sample a minute in this SQLite database")
+parser.add_argument("--analytics", metavar="DIR",
+                    help=f"keep hourly study / distraction rollups here for the bots (default: {DEFAULT_ANALYTICS_DIR}; "
+                         "replays only use them when given)")
+parser.add_argument("--no-analytics", action="store_true",
+                    help="keep the rollups for this run only, in memory")
+parser.add_argument("--backend", choices=BACKENDS, default="torch",
+                    help="inference backend; onnx / openvino export the weights once and cache them")
+parser.add_argument("--int8", action="store_true",
+                    help="use an INT8-quantized export (onnx / openvino backends)")
+parser.add_argument("--multiprocess", action="store_true",
+                    help="run the model in a worker process fed through a shared-memory frame ring")
+args = parser.parse_args()
+if args.record and args.replay:
+    parser.error("--record and --replay cannot be combined")
+
+# Inference mode: "full" runs the model on the whole frame, "roi" finds the person
+# at a small size first and then searches for the phone in a crop around them
+inference_mode = "full"
+roi_person_imgsz = 320
+roi_phone_imgsz = 640
+
 initial_width, initial_height = 1920, 1080
-video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, initial_width)
-video_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, initial_height)
+if args.replay:
+    # Everything comes from the trace: no camera, and the model is never loaded
+    trace = DetectionTrace(args.replay)
+    class_names = trace.names
+    initial_width, initial_height = trace.width, trace.height
+    person_class_id = class_id(class_names, "person")
+    phone_class_id = class_id(class_names, "cell phone")
+else:
+    # Known once the model has loaded (see start_detection)
+    class_names = None
+    person_class_id = phone_class_id = None
 
 user_question = ""
 input_active = False
@@ -38,36 +110,35 @@ def process_user_question(question):
     if "focus" in q_lower or "concentrate" in q_lower:
         return f"Based on your recent focus metrics (focus rate: {focus_percentage:.1f}%), try the Pomodoro technique - 25 minutes focused, 5 minutes break."
     elif "efficient" in q_lower or "productivity" in q_lower:
-        return f"I noticed you had {len(distraction_logs)} distractions today. Try studying in a quiet spot or using noise-cancelling headphones."
+        return f"I noticed you had {session_stats.count} distractions today. Try studying in a quiet spot or using noise-cancelling headphones."
     elif "schedule" in q_lower or "time" in q_lower:
         return f"Your focus time is {format_time(focus_time)}. Consider scheduling {min(int(focus_time/3600) + 1, 8)} hours daily in 1-2 hour blocks."
     elif "phone" in q_lower or "distraction" in q_lower:
-        return f"Phone distractions account for {get_phone_distraction_percentage(distraction_logs):.1f}% of your interruptions. Consider an app blocker or placing the phone away."
+        return f"Phone distractions account for {get_phone_distraction_percentage(session_stats):.1f}% of your interruptions. Consider an app blocker or placing the phone away."
     elif "morning" in q_lower or "evening" in q_lower or "best time" in q_lower:
         return "Your peak focus time appears to be in the morning. Tackle your hardest tasks then."
     elif "remember" in q_lower or "retention" in q_lower or "memorize" in q_lower:
         return "Use spaced repetition. Review material after 1 day, 3 days, and 7 days for better long-term memory."
     elif "break" in q_lower or "rest" in q_lower:
-        return f"Your average session is {get_average_session_length(total_study_time, total_distraction_time)} minutes. Aim for 50-90 minute sessions with short breaks."
+        return f"Your average session is {get_average_session_length(total_study_time, distraction_engine.total_distraction_time)} minutes. Aim for 50-90 minute sessions with short breaks."
     elif "exam" in q_lower or "test" in q_lower or "recall" in q_lower:
         return "Try active recall methods: quiz yourself or practice past exams instead of just re-reading notes."
     else:
         return "I don't have specific tips for that question yet. Try asking about focus, efficiency, scheduling, memory, or exam prep."
 
-success, test_frame = video_capture.read()
-if success:
-    initial_height, initial_width = test_frame.shape[:2]
-
-cv2.namedWindow("Study Focus Monitor", cv2.WINDOW_NORMAL)
-cv2.resizeWindow("Study Focus Monitor", initial_width, initial_height)
-
-phone_detected_start_time = None
-person_absent_start_time = None
 person_absent_threshold = 5
 phone_detect_threshold = 3
 flicker_tolerance = 2.0
-last_phone_detection_time = None
-last_person_detection_time = None
+
+# Motion gate: skip the model while the scene is still and reuse the last detections
+motion_gate_enabled = True
+motion_sensitivity = 0.02  # fraction of pixels that must change to re-run the model
+motion_max_staleness = 1.0  # seconds; always re-run the model at least this often
+
+# Tracker mode: run the model only on keyframes and carry boxes forward in between
+tracker_enabled = False
+tracker_keyframe_interval = 6  # frames between detections (~5 Hz at 30 fps)
+tracker_min_score = 0.35  # re-detect early when a track's decayed confidence drops below this
 
 UI_BLUE = (255, 180, 50)
 UI_RED = (0, 0, 255)
@@ -79,69 +150,47 @@ UI_GRAY = (70, 70, 70)
 UI_ORANGE = (0, 165, 255)
 UI_DARK_GREEN = (0, 100, 0)
 
-study_panel_x = 0
-study_panel_y = 0
+# -------------------- STARTUP --------------------
+# The window comes up first with a placeholder, then the camera opens while
+# the model loads and warms up on a background thread. Frames are shown as
+# soon as the camera delivers them; detection switches on with the first
+# result.
+def show_splash(message):
+    canvas = np.zeros((initial_height, initial_width, 3), dtype=np.uint8)
+    message_size = text_size(message, cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2)[0]
+    cv2.putText(canvas, message, ((initial_width - message_size[0]) // 2, initial_height // 2),
+                cv2.FONT_HERSHEY_SIMPLEX, 1.0, UI_WHITE, 2)
+    cv2.imshow("Study Focus Monitor", canvas)
+    cv2.waitKey(1)
+
+if not args.headless:
+    cv2.namedWindow("Study Focus Monitor", cv2.WINDOW_NORMAL)
+    cv2.resizeWindow("Study Focus Monitor", initial_width, initial_height)
+    show_splash("Starting camera...")
+
+if args.replay or args.multiprocess:
+    # The worker process loads its own model once the camera's frame size is known
+    model_loader = None
+else:
+    # The ROI mode runs the model at two input sizes, which exported models only support with dynamic shapes
+    model_loader = ModelLoader(
+        lambda: load_model("yolov8n.pt", args.backend, int8=args.int8, dynamic=inference_mode == "roi"),
+        lambda model: build_detector(model, inference_mode, roi_person_imgsz, roi_phone_imgsz),
+        np.zeros((initial_height, initial_width, 3), dtype=np.uint8))
+if args.replay:
+    video_capture = None
+else:
+    # Fastest camera mode up to the display size that still gives the model a full-size input
+    # The mode is probed on the first start only; later starts reuse it
+    video_capture = CaptureDevice(0, initial_width, initial_height, min_width=640, mode_cache=DEFAULT_MODE_CACHE)
+
 study_panel_width = 400
-study_panel_height = 220
-mental_panel_x = 0
-mental_panel_y = 0
+study_panel_height = 260
 mental_panel_width = 400
 mental_panel_height = 200
-rec_x = 0
-rec_y = 0
 book_recs_width = 400
 book_recs_height = 300
 
-study_questions = [
-    "What's the best way to improve my focus?",
-    "How can I study more efficiently?",
-    "Should I take more breaks?",
-    "How can I avoid phone distractions?",
-    "What time of day is best for studying?",
-    "How do I maintain motivation?",
-    "What's a good study schedule?",
-    "How can I remember more of what I study?"
-]
-
-study_responses = [
-    "Based on your recent focus metrics (focus rate: {focus_percent:.1f}%), try Pomodoro: 25 on, 5 off.",
-    "You've had {distraction_count} distractions today. Try a quieter environment.",
-    "Your focus time is {focus_time_str}. Increase your daily study by 15 minutes each week.",
-    "Phone distractions are {phone_distractions:.1f}% of your interruptions. Consider phone-free timeslots.",
-    "Your pattern suggests morning is your peak focus time.",
-    "Use spaced reviews for better retention.",
-    "Your average study session is {avg_session_length} min. 50-90 min is ideal for deep work.",
-    "Active recall: test yourself rather than just reading."
-]
-
-mental_health_questions = [
-    "How can I manage study stress?",
-    "I'm feeling overwhelmed with my workload",
-    "How do I know if I'm studying too much?",
-    "What are signs of burnout?",
-    "I feel anxious before exams",
-    "How can I maintain work-life balance?"
-]
-
-mental_health_responses = [
-    "Your sessions are {session_length_trend}. Take breaks and try a 5-min meditation.",
-    "You've studied {total_study_hours_today:.1f} hrs today. Walk or stretch to recharge.",
-    "Your ratio is {study_break_ratio:.1f}:1. Try ~4:1 for a balanced approach.",
-    "You've studied {consecutive_study_days} consecutive days. Schedule a rest day to avoid burnout.",
-    "Evening shows more distractions ({evening_distractions}). Move tasks earlier if possible.",
-    "Try progressive muscle relaxation to reduce physical tension.",
-    "You scored {boundary_score}/10 on work-life boundaries. Separate your study/personal time.",
-    "Before each session, do 2 minutes of mindful breathing."
-]
-
-book_recommendations = [
-    ("Deep Work", 4.7),
-    ("Atomic Habits", 4.8),
-    ("The Power of Now", 4.5),
-    ("Digital Minimalism", 4.6),
-    ("Thinking, Fast and Slow", 4.4)
-]
-
 show_study_bot = False
 show_mental_bot = False
 show_book_recs = False
@@ -152,554 +201,593 @@ current_book_recommendations = []
 last_bot_update_time = time.time()
 bot_update_interval = 60
 
-focus_start_time = time.time()
-distraction_start_time = None
-total_distraction_time = 0
-distraction_logs = []
-current_distraction_session = None
-
-def format_time(seconds):
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    seconds = int(seconds % 60)
-    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-
-def format_12hour_time(time_str):
-    dt = datetime.strptime(time_str, "%H:%M:%S")
-    return dt.strftime("%I:%M %p")
-
-def get_phone_distraction_percentage(logs):
-    if not logs:
-        return 0
-    phone_count = sum(1 for log in logs if log["type"] == "Cell Phone")
-    return (phone_count / len(logs)) * 100
-
-def get_average_session_length(total_time, distraction_time):
-    if total_time <= 0:
-        return 0
-    focused_time = total_time - distraction_time
-
-    estimated_sessions = max(1, focused_time / 1800)
-    return round((focused_time / estimated_sessions) / 60)
-
-def get_session_length_trend(logs, current_time):
-    if not logs or len(logs) < 2:
-        return "fairly consistent"
-    recent_logs = logs[-min(5, len(logs)):]
-    durations = [log["duration"] for log in recent_logs]
-    if sum(durations) / len(durations) > 300:
-        return "showing longer breaks"
-    elif len(logs) > 5 and sum(durations) / len(durations) < 120:
-        return "improving with shorter breaks"
-    return "relatively steady"
-
-def get_study_recommendation(focus_percentage, distraction_logs, focus_time, total_study_time):
-    question = random.choice(study_questions)
-    response_template = random.choice(study_responses)
-    distraction_count = len(distraction_logs)
-    focus_time_str = format_time(focus_time)
-    phone_distractions = get_phone_distraction_percentage(distraction_logs)
-    avg_session_length = get_average_session_length(total_study_time, total_study_time - focus_time)
-    response = response_template.format(
-        focus_percent=focus_percentage,
-        distraction_count=distraction_count,
-        focus_time_str=focus_time_str,
-        phone_distractions=phone_distractions,
-        avg_session_length=avg_session_length
-    )
-    return question, response
-
-def get_mental_health_recommendation(total_study_time, distraction_logs, focus_time):
-    question = random.choice(mental_health_questions)
-    response_template = random.choice(mental_health_responses)
-    session_length_trend = get_session_length_trend(distraction_logs, time.time())
-    total_study_hours_today = total_study_time / 3600
-    if total_study_time - focus_time > 0:
-        study_break_ratio = focus_time / (total_study_time - focus_time)
-    else:
-        study_break_ratio = 5.0
-
-    consecutive_study_days = random.randint(1, 7)
-    evening_distractions = random.randint(2, 8)
-    boundary_score = random.randint(4, 9)
-    response = response_template.format(
-        session_length_trend=session_length_trend,
-        total_study_hours_today=total_study_hours_today,
-        study_break_ratio=study_break_ratio,
-        consecutive_study_days=consecutive_study_days,
-        evening_distractions=evening_distractions,
-        boundary_score=boundary_score
-    )
-    return question, response
-
-def get_book_recommendation():
-    recommendations = random.sample(book_recommendations, 3)#(0, len())
-    return recommendations
-
-while video_capture.isOpened():
-    ret, frame = video_capture.read()
-    if not ret:
-        break
-
-    current_time = time.time()
-    original_height, original_width = frame.shape[:2]
-    window_rect = cv2.getWindowImageRect("Study Focus Monitor")
-    if window_rect[2] > 0 and window_rect[3] > 0:
-        display_width, display_height = window_rect[2], window_rect[3]
-    else:
-        display_width, display_height = original_width, original_height
-
-    display_frame = cv2.resize(frame, (display_width, display_height), interpolation=cv2.INTER_LINEAR)
-    results = model(frame)
-    phone_detected = False
-    person_detected = False
-
-    # Object detection loop
-    for result in results:
-        for box in result.boxes:
-            conf = box.conf[0].item()
-            cls = int(box.cls[0].item())
-            if conf < 0.5:
-                continue
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            scaled_x1 = int(x1 * display_width / original_width)
-            scaled_y1 = int(y1 * display_height / original_height)
-            scaled_x2 = int(x2 * display_width / original_width)
-            scaled_y2 = int(y2 * display_height / original_height)
-
-            object_type = model.names[cls]
-            label = f"{object_type} {conf:.2f}"
-            box_color = UI_GREEN
-
-            if object_type.lower() == "cell phone":
-                phone_detected = True
-                last_phone_detection_time = current_time
-                box_color = UI_RED
-            elif object_type.lower() == "person":
-                person_detected = True
-                last_person_detection_time = current_time
-
-            cv2.rectangle(display_frame, (scaled_x1, scaled_y1),
-                          (scaled_x2, scaled_y2), box_color, 2)
-            text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
-            cv2.rectangle(display_frame, (scaled_x1, scaled_y1 - 25),
-                          (scaled_x1 + text_size[0] + 10, scaled_y1), box_color, -1)
-            cv2.putText(display_frame, label, (scaled_x1 + 5, scaled_y1 - 8),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 2)
-
-    # Flicker tolerance for phone
-    if not phone_detected and last_phone_detection_time:
-        if current_time - last_phone_detection_time < flicker_tolerance:
-            phone_detected = True
-        else:
-            last_phone_detection_time = None
-
-    # Person absent detection
-    person_absent = not person_detected and (
-        last_person_detection_time is None or current_time - last_person_detection_time >= flicker_tolerance
-    )
-
-    # Title bar
-    cv2.rectangle(display_frame, (0, 0), (display_width, 30), UI_BLUE, -1)
+distraction_engine = DistractionEngine(phone_detect_threshold, person_absent_threshold,
+                                       flicker_tolerance, time.time())
+distraction_logs = distraction_engine.logs
+session_stats = distraction_engine.stats
+
+# -------------------- DISTRACTION STATE --------------------
+def update_focus_stats(current_time):
+    global total_study_time, focus_time, focus_percentage
+    total_study_time, focus_time, focus_percentage = distraction_engine.focus_stats(current_time)
+
+def emit_event(event):
+    # Headless output: one JSON object per line for whatever reads stdout
+    print(json.dumps(event), flush=True)
+
+def stats_event(current_time):
+    return {
+        "event": "stats",
+        "time": current_time,
+        "total_study_time": round(total_study_time, 1),
+        "focus_time": round(focus_time, 1),
+        "focus_percentage": round(focus_percentage, 1),
+        "distractions": session_stats.count
+    }
+
+distraction_warnings = {
+    "phone": ("Phone detected! Stay focused on your study!", UI_RED),
+    "absent": ("You left your desk! Return to continue studying!", UI_ORANGE),
+}
+
+# -------------------- UI WIDGETS --------------------
+# Every panel keeps its pixels in a cached layer and is only redrawn when the
+# state it shows changes; the mouse callback just queues clicks, which are
+# dispatched to the widget under the cursor from the main loop.
+ui_layers = LayerCache()
+ui = WidgetTree()
+
+button_width = 160
+button_height = 25
+mental_bot_btn_x = 10
+mental_bot_btn_y = 5
+study_bot_btn_x = mental_bot_btn_x + button_width + 10
+study_bot_btn_y = 5
+refresh_btn_width = 80
+log_panel_width = 430
+log_start_y = 40
+line_spacing = 25
+
+def draw_title_bar(canvas, state):
+    show_mental_bot, show_study_bot, metrics_text = state
+    display_width = canvas.shape[1]
+    cv2.rectangle(canvas, (0, 0), (display_width, 30), UI_BLUE, -1)
     title_text = "Study Focus Monitor"
-    title_size = cv2.getTextSize(title_text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)[0]
+    title_size = text_size(title_text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)[0]
     title_x = (display_width - title_size[0]) // 3
-    cv2.putText(display_frame, title_text, (title_x, 22), cv2.FONT_HERSHEY_SIMPLEX, 0.7, UI_WHITE, 2)
+    cv2.putText(canvas, title_text, (title_x, 22), cv2.FONT_HERSHEY_SIMPLEX, 0.7, UI_WHITE, 2)
 
-    instructions = "Press 'q' to exit | 'r' to reset | 's'/'m' for bots | 'n' for new advice | 'b' for book recs"
-    instr_size = cv2.getTextSize(instructions, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
+    # The metrics readout takes the place of the key help while it is on
+    instructions = metrics_text or "Press 'q' to exit | 'r' to reset | 's'/'m' for bots | 'n' for new advice | 'b' for book recs | 'f' for FPS"
+    instr_size = text_size(instructions, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
     instr_x = display_width - instr_size[0] - 10
-    cv2.putText(display_frame, instructions, (instr_x, 22),
+    cv2.putText(canvas, instructions, (instr_x, 22),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_YELLOW if metrics_text else UI_WHITE, 1)
+
+    # Mental Bot toggle
+    cv2.rectangle(
+        canvas,
+        (mental_bot_btn_x, mental_bot_btn_y),
+        (mental_bot_btn_x + button_width, mental_bot_btn_y + button_height),
+        UI_DARK_GREEN if not show_mental_bot else UI_RED, -1
+    )
+    cv2.putText(canvas,
+                "Show Mental Bot" if not show_mental_bot else "Hide Mental Bot",
+                (mental_bot_btn_x + 10, mental_bot_btn_y + 18),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
 
-    # --------------------------- PHONE DETECTION LOGIC ---------------------------
-    if not person_absent and phone_detected:
-        if phone_detected_start_time is None:
-            phone_detected_start_time = current_time
-            distraction_start_time = current_time
-            current_time_str = datetime.now().strftime("%H:%M:%S")
-            current_distraction_session = {
-                "type": "Cell Phone",
-                "start_time_12h": format_12hour_time(current_time_str),
-                "duration": 0
-            }
-        elapsed_time = current_time - phone_detected_start_time
-        if elapsed_time >= phone_detect_threshold:
-            warning_text = "Phone detected! Stay focused on your study!"
-            text_size = cv2.getTextSize(warning_text, cv2.FONT_HERSHEY_SIMPLEX, 0.9, 2)[0]
-            text_x = (display_width - text_size[0]) // 2
-            overlay = display_frame.copy()
-            cv2.rectangle(overlay, (0, 35), (display_width, 95), UI_RED, -1)
-            cv2.addWeighted(overlay, 0.7, display_frame, 0.3, 0, display_frame)
-            cv2.putText(display_frame, warning_text, (text_x, 75),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, UI_WHITE, 2)
-    elif not phone_detected:
-        phone_detected_start_time = None
-
-    # --------------------------- PERSON ABSENT LOGIC ---------------------------
-    if person_absent:
-        if person_absent_start_time is None:
-            person_absent_start_time = current_time
-        elapsed_absence_time = current_time - person_absent_start_time
-        if elapsed_absence_time >= person_absent_threshold:
-            if distraction_start_time is None:
-                distraction_start_time = person_absent_start_time
-                current_time_str = datetime.fromtimestamp(person_absent_start_time).strftime("%H:%M:%S")
-                current_distraction_session = {
-                    "type": "Left Desk",
-                    "start_time_12h": format_12hour_time(current_time_str),
-                    "duration": 0
-                }
-            warning_text = "You left your desk! Return to continue studying!"
-            text_size = cv2.getTextSize(warning_text, cv2.FONT_HERSHEY_SIMPLEX, 0.9, 2)[0]
-            text_x = (display_width - text_size[0]) // 2
-            overlay = display_frame.copy()
-            cv2.rectangle(overlay, (0, 35), (display_width, 95), UI_ORANGE, -1)
-            cv2.addWeighted(overlay, 0.7, display_frame, 0.3, 0, display_frame)
-            cv2.putText(display_frame, warning_text, (text_x, 75),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, UI_WHITE, 2)
-    else:
-        if person_absent_start_time is not None:
-            absence_duration = current_time - person_absent_start_time
-            if absence_duration >= person_absent_threshold and distraction_start_time is not None:
-                distraction_duration = current_time - distraction_start_time
-                total_distraction_time += distraction_duration
-                if current_distraction_session and current_distraction_session["type"] == "Left Desk":
-                    end_time_str = datetime.now().strftime("%H:%M:%S")
-                    end_time_12h = format_12hour_time(end_time_str)
-                    distraction_logs.append({
-                        "type": "Left Desk",
-                        "start_time_12h": current_distraction_session["start_time_12h"],
-                        "end_time_12h": end_time_12h,
-                        "duration": int(distraction_duration)
-                    })
-                distraction_start_time = None
-                current_distraction_session = None
-            person_absent_start_time = None
-
-    # Ending phone distraction
-    if (not phone_detected and not person_absent and
-        distraction_start_time is not None and
-        current_distraction_session and current_distraction_session["type"] == "Cell Phone"):
-        distraction_duration = current_time - distraction_start_time
-        if distraction_duration >= phone_detect_threshold:
-            total_distraction_time += distraction_duration
-            end_time_str = datetime.now().strftime("%H:%M:%S")
-            end_time_12h = format_12hour_time(end_time_str)
-            distraction_logs.append({
-                "type": "Cell Phone",
-                "start_time_12h": current_distraction_session["start_time_12h"],
-                "end_time_12h": end_time_12h,
-                "duration": int(distraction_duration)
-            })
-            distraction_start_time = None
-            current_distraction_session = None
-
-    # Calculate study/focus times
-    total_study_time = current_time - focus_start_time
-    current_distraction_time = total_distraction_time
-    if distraction_start_time is not None:
-        current_distraction_time += (current_time - distraction_start_time)
-    focus_time = total_study_time - current_distraction_time
-
-    if total_study_time > 0:
-        focus_percentage = (focus_time / total_study_time) * 100
-    else:
-        focus_percentage = 100
-
-    # Bottom bar for stats
-    cv2.rectangle(display_frame, (0, display_height - 60),
-                  (display_width, display_height), UI_BLACK, -1)
-    study_time_text = f"Total Study Time: {format_time(total_study_time)}"
-    focus_time_text = f"Focus Time: {format_time(focus_time)}"
-    percentage_text = f"Focus: {focus_percentage:.1f}%"
-    cv2.putText(display_frame, study_time_text, (10, display_height - 35),
+    # Study Bot toggle
+    cv2.rectangle(
+        canvas,
+        (study_bot_btn_x, study_bot_btn_y),
+        (study_bot_btn_x + button_width, study_bot_btn_y + button_height),
+        UI_DARK_GREEN if not show_study_bot else UI_RED, -1
+    )
+    cv2.putText(canvas,
+                "Show Study Bot" if not show_study_bot else "Hide Study Bot",
+                (study_bot_btn_x + 10, study_bot_btn_y + 18),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
+
+def draw_stats_bar(canvas, state):
+    study_seconds, focus_seconds, percentage, streak_seconds = state
+    display_width = canvas.shape[1]
+    cv2.putText(canvas, f"Total Study Time: {format_time(study_seconds)}", (10, 25),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 2)
+    cv2.putText(canvas, f"Focus Time: {format_time(focus_seconds)}", (10, 50),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 2)
-    cv2.putText(display_frame, focus_time_text, (10, display_height - 10),
+    cv2.putText(canvas, f"Focus: {percentage:.1f}%", (display_width - 250, 25),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 2)
-    cv2.putText(display_frame, percentage_text,
-                (display_width - 200, display_height - 20),
+    cv2.putText(canvas, f"Best Streak: {format_time(streak_seconds)}", (display_width - 250, 50),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 2)
 
-    # Distraction log panel
-    log_panel_width = 430
-    log_start_y = 40
-    overlay = display_frame.copy()
-    cv2.rectangle(overlay, (0, log_start_y),
-                  (log_panel_width, display_height - 60), UI_GRAY, -1)
-    cv2.addWeighted(overlay, 0.7, display_frame, 0.3, 0, display_frame)
-    cv2.putText(display_frame, "Distraction Log", (10, log_start_y + 25),
+def draw_log_panel(canvas, state):
+    # The panel runs from log_start_y down to the stats bar; display_bottom is
+    # the bottom of the window in panel coordinates.
+    display_bottom = canvas.shape[0] + 59
+    cv2.putText(canvas, "Distraction Log", (10, 25),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, UI_WHITE, 2)
-    cv2.line(display_frame, (10, log_start_y + 35),
-             (log_panel_width - 10, log_start_y + 35), UI_WHITE, 1)
-    cv2.putText(display_frame, "Type", (10, log_start_y + 55),
+    cv2.line(canvas, (10, 35), (log_panel_width - 10, 35), UI_WHITE, 1)
+    cv2.putText(canvas, "Type", (10, 55),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_YELLOW, 1)
-    cv2.putText(display_frame, "Start", (130, log_start_y + 55),
+    cv2.putText(canvas, "Start", (130, 55),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_YELLOW, 1)
-    cv2.putText(display_frame, "End", (240, log_start_y + 55),
+    cv2.putText(canvas, "End", (240, 55),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_YELLOW, 1)
-    cv2.putText(display_frame, "Duration", (350, log_start_y + 55),
+    cv2.putText(canvas, "Duration", (350, 55),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_YELLOW, 1)
 
+    # Newest first; only the rows that fit get their clock labels formatted
     max_logs = 12
-    logs_to_display = distraction_logs[-max_logs:] if len(distraction_logs) > max_logs else distraction_logs.copy()
-    for i, log_entry in enumerate(reversed(logs_to_display)):
-        y_pos = log_start_y + 80 + i * 25
-        if y_pos > display_height - 70:
+    for i in range(min(max_logs, len(distraction_logs))):
+        y_pos = 80 + i * 25
+        if y_pos > display_bottom - 70:
             break
-        cv2.putText(display_frame, log_entry["type"], (10, y_pos),
+        log_entry = distraction_logs.entry(-1 - i)
+        cv2.putText(canvas, log_entry["type"], (10, y_pos),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
-        cv2.putText(display_frame, log_entry["start_time_12h"], (130, y_pos),
+        cv2.putText(canvas, log_entry["start_time_12h"], (130, y_pos),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
-        end_time = log_entry.get("end_time_12h", "ongoing")
-        cv2.putText(display_frame, end_time, (240, y_pos),
+        cv2.putText(canvas, log_entry["end_time_12h"], (240, y_pos),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
         duration_text = f"{log_entry['duration']}s"
-        cv2.putText(display_frame, duration_text, (350, y_pos),
+        cv2.putText(canvas, duration_text, (350, y_pos),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
 
-    if not logs_to_display:
-        cv2.putText(display_frame, "No distractions detected", (10, log_start_y + 80),
+    if not distraction_logs:
+        cv2.putText(canvas, "No distractions detected", (10, 80),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
 
     if distraction_logs:
         log_count_text = f"Total: {len(distraction_logs)} session(s)"
-        cv2.putText(display_frame, log_count_text, (10, display_height - 80),
+        cv2.putText(canvas, log_count_text, (10, display_bottom - 80),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
 
-    if current_time - last_bot_update_time > bot_update_interval:
-        sq, sr = get_study_recommendation(focus_percentage, distraction_logs, focus_time, total_study_time)
-        current_study_recommendation = f"Q: {sq}\nA: {sr}"
+def draw_panel_header(canvas, title, color, close_color, refresh_color):
+    # Header strip of a bot panel: title, "Refresh" and close buttons
+    panel_width = canvas.shape[1] - 1
+    cv2.rectangle(canvas, (0, 0), (panel_width, 30), color, -1)
+    cv2.putText(canvas, title, (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 2)
 
-        mq, mr = get_mental_health_recommendation(total_study_time, distraction_logs, focus_time)
-        current_mental_recommendation = f"Q: {mq}\nA: {mr}"
+    cv2.rectangle(canvas, (panel_width - 30, 0), (panel_width, 30), close_color, -1)
+    cv2.putText(canvas, "X", (panel_width - 20, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 2)
 
-        last_bot_update_time = current_time
+    cv2.rectangle(canvas, (panel_width - refresh_btn_width - 30, 0), (panel_width - 30, 30), refresh_color, -1)
+    cv2.putText(canvas, "Refresh", (panel_width - refresh_btn_width - 25, 20),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
 
-    # -------------------- STUDY BOT PANEL --------------------
-    if show_study_bot:
-        study_panel_width = 400
-        study_panel_height = 260
-        study_panel_x = display_width - study_panel_width - 20
-        study_panel_y = 40
-
-        overlay = display_frame.copy()
-        cv2.rectangle(overlay, (study_panel_x, study_panel_y),
-                      (study_panel_x + study_panel_width, study_panel_y + study_panel_height),
-                      UI_BLUE, -1)
-        cv2.addWeighted(overlay, 0.8, display_frame, 0.2, 0, display_frame)
-
-        # Header
-        cv2.rectangle(display_frame, (study_panel_x, study_panel_y),
-                      (study_panel_x + study_panel_width, study_panel_y + 30),
-                      UI_BLUE, -1)
-        cv2.putText(display_frame, "Study Q&A Bot",
-                    (study_panel_x + 10, study_panel_y + 20),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 2)
+def draw_wrapped_text(canvas, text, x, y, max_width):
+    # Word-wrap each line of text to max_width pixels (layout is cached per text)
+    for line, row in wrap_text(text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1, max_width):
+        cv2.putText(canvas, line, (x, y + row * line_spacing),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
 
-        # Close button
-        cv2.rectangle(display_frame,
-                      (study_panel_x + study_panel_width - 30, study_panel_y),
-                      (study_panel_x + study_panel_width, study_panel_y + 30),
-                      (0, 0, 150), -1)
-        cv2.putText(display_frame, "X",
-                    (study_panel_x + study_panel_width - 20, study_panel_y + 20),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 2)
+def draw_study_panel(canvas, state):
+    recommendation, input_active, user_question, cursor_visible = state
+    draw_panel_header(canvas[:31], "Study Q&A Bot", UI_BLUE, (0, 0, 150), (0, 150, 200))
+    if recommendation:
+        draw_wrapped_text(canvas, recommendation, 10, 50, study_panel_width - 20)
 
-        # "Refresh" button
-        refresh_btn_width = 80
-        cv2.rectangle(display_frame,
-                      (study_panel_x + study_panel_width - refresh_btn_width - 30, study_panel_y),
-                      (study_panel_x + study_panel_width - 30, study_panel_y + 30),
-                      (0, 150, 200), -1)
-        cv2.putText(display_frame, "Refresh",
-                    (study_panel_x + study_panel_width - refresh_btn_width - 25, study_panel_y + 20),
+    # Input field
+    study_input_field_y = study_panel_height - 35
+    cv2.rectangle(canvas, (10, study_input_field_y),
+                  (study_panel_width - 50, study_input_field_y + 25), UI_BLACK, -1)
+    if input_active:
+        display_text = user_question
+        if cursor_visible:
+            display_text += "|"
+        cv2.putText(canvas, display_text, (15, study_input_field_y + 18),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
+    else:
+        cv2.putText(canvas, "Type your question here...", (15, study_input_field_y + 18),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
 
-        line_spacing = 25
-        if current_study_recommendation:
-            lines = current_study_recommendation.split('\n')
-            text_y = study_panel_y + 50
-            for i, line in enumerate(lines):
-                words = line.split()
-                current_line = ""
-                line_num = 0
-                for word in words:
-                    test_line = (current_line + " " + word).strip() if current_line else word
-                    text_size = cv2.getTextSize(test_line, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
-                    if text_size[0] < study_panel_width - 20:
-                        current_line = test_line
-                    else:
-                        # Draw the existing line
-                        cv2.putText(display_frame, current_line,
-                                    (study_panel_x + 10, text_y + (i + line_num) * line_spacing),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
-                        line_num += 1
-                        current_line = word
-
-                if current_line:
-                    cv2.putText(display_frame, current_line,
-                                (study_panel_x + 10, text_y + (i + line_num) * line_spacing),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
-
-        # Input field
-        study_input_field_y = study_panel_y + study_panel_height - 35
-        cv2.rectangle(display_frame, (study_panel_x + 10, study_input_field_y),
-                      (study_panel_x + study_panel_width - 50, study_input_field_y + 25),
-                      UI_BLACK, -1)
-        if input_active:
-            display_text = user_question
-            if cursor_visible:
-                display_text += "|"
-            cv2.putText(display_frame, display_text,
-                        (study_panel_x + 15, study_input_field_y + 18),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
-        else:
-            cv2.putText(display_frame, "Type your question here...",
-                        (study_panel_x + 15, study_input_field_y + 18),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
-
-        # "Ask" button
-        cv2.rectangle(display_frame,
-                      (study_panel_x + study_panel_width - 45, study_input_field_y),
-                      (study_panel_x + study_panel_width - 10, study_input_field_y + 25),
-                      (0, 120, 255), -1)
-        cv2.putText(display_frame, "Ask",
-                    (study_panel_x + study_panel_width - 40, study_input_field_y + 18),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
+    # "Ask" button
+    cv2.rectangle(canvas, (study_panel_width - 45, study_input_field_y),
+                  (study_panel_width - 10, study_input_field_y + 25), (0, 120, 255), -1)
+    cv2.putText(canvas, "Ask", (study_panel_width - 40, study_input_field_y + 18),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
 
-    # -------------------- MENTAL HEALTH BOT PANEL --------------------
-    if show_mental_bot:
-        mental_panel_width = 400
-        mental_panel_height = 200
-        mental_panel_x = display_width - mental_panel_width - 20
-        mental_panel_y = 310 if show_study_bot else 40
-
-        overlay = display_frame.copy()
-        cv2.rectangle(overlay, (mental_panel_x, mental_panel_y),
-                      (mental_panel_x + mental_panel_width, mental_panel_y + mental_panel_height),
-                      UI_GREEN, -1)
-        cv2.addWeighted(overlay, 0.8, display_frame, 0.2, 0, display_frame)
-
-        # Header
-        cv2.rectangle(display_frame, (mental_panel_x, mental_panel_y),
-                      (mental_panel_x + mental_panel_width, mental_panel_y + 30),
-                      UI_GREEN, -1)
-        cv2.putText(display_frame, "Mental Health Assistant",
-                    (mental_panel_x + 10, mental_panel_y + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 2)
-
-        # Close button
-        cv2.rectangle(display_frame,
-                      (mental_panel_x + mental_panel_width - 30, mental_panel_y),
-                      (mental_panel_x + mental_panel_width, mental_panel_y + 30),
-                      (0, 100, 0), -1)
-        cv2.putText(display_frame, "X",
-                    (mental_panel_x + mental_panel_width - 20, mental_panel_y + 20),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 2)
+def draw_mental_panel(canvas, state):
+    recommendation, = state
+    draw_panel_header(canvas[:31], "Mental Health Assistant", UI_GREEN, (0, 100, 0), (0, 150, 0))
+    draw_wrapped_text(canvas, recommendation, 10, 50, mental_panel_width - 20)
+
+def draw_book_recs(canvas, state):
+    recommendations = state
+    cv2.rectangle(canvas, (0, 0), (book_recs_width, book_recs_height), UI_DARK_GREEN, -1)
+    cv2.putText(canvas, "Need a break?", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, UI_WHITE, 2)
+    cv2.putText(canvas, "Based on your study logs,", (20, 70), cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 1)
+    cv2.putText(canvas, "we recommend:", (20, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 1)
+
+    book_start_y = 140
+    book_spacing = 35
+    for i, (title, rating) in enumerate(recommendations):
+        cv2.putText(canvas, f"{title} ({rating}/5)", (20, book_start_y + i * book_spacing),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 1)
+
+    # "Take me to Shelved™" button
+    button_y = book_recs_height - 40
+    cv2.rectangle(canvas, (50, button_y), (book_recs_width - 50, button_y + 30), UI_WHITE, -1)
+    cv2.putText(canvas, "Take me to Shelved!", (60, button_y + 20),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_BLACK, 1)
+
+def draw_book_close(canvas, state):
+    # The close button sits under the translucent recommendation box
+    button = np.zeros_like(canvas)
+    cv2.rectangle(button, (0, 0), (30, 30), (100, 0, 0), -1)
+    cv2.putText(button, "X", (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 2)
+    box = np.full_like(canvas, UI_DARK_GREEN)
+    cv2.addWeighted(box, 0.75, button, 0.25, 0, canvas)
+
+# -------------------- UI ACTIONS --------------------
+def toggle_study_bot():
+    global show_study_bot, current_study_recommendation, input_active, user_question
+    show_study_bot = not show_study_bot
+    if show_study_bot:
+        current_study_recommendation = "Ask me a question about studying or focus techniques!"
+        input_active = False
+        user_question = ""
 
-        # "Refresh" button
-        refresh_btn_width = 80
-        cv2.rectangle(display_frame,
-                      (mental_panel_x + mental_panel_width - refresh_btn_width - 30, mental_panel_y),
-                      (mental_panel_x + mental_panel_width - 30, mental_panel_y + 30),
-                      (0, 150, 0), -1)
-        cv2.putText(display_frame, "Refresh",
-                    (mental_panel_x + mental_panel_width - refresh_btn_width - 25, mental_panel_y + 20),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
+def toggle_mental_bot():
+    global show_mental_bot
+    show_mental_bot = not show_mental_bot
+    if show_mental_bot:
+        new_mental_recommendation()
 
-        # Increase line spacing to reduce overlap
-        line_spacing = 25
-        lines = current_mental_recommendation.split('\n')
-        for i, line in enumerate(lines):
-            words = line.split()
-            current_line = ""
-            line_num = 0
-            for word in words:
-                test_line = (current_line + " " + word).strip() if current_line else word
-                text_size = cv2.getTextSize(test_line, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)[0]
-                if text_size[0] < mental_panel_width - 20:
-                    current_line = test_line
-                else:
-                    cv2.putText(display_frame, current_line,
-                                (mental_panel_x + 10, mental_panel_y + 50 + (i + line_num) * line_spacing),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
-                    line_num += 1
-                    current_line = word
-            if current_line:
-                cv2.putText(display_frame, current_line,
-                            (mental_panel_x + 10, mental_panel_y + 50 + (i + line_num) * line_spacing),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
-                
-    
+def toggle_book_recs():
+    global show_book_recs, current_book_recommendations
+    show_book_recs = not show_book_recs
     if show_book_recs:
-        overlay = display_frame.copy()
-        book_recs_width = 400
-        book_recs_height = 300
-        alpha = 0.75  # Transparency for overlay
-        rec_x = int((display_width - book_recs_width)/2)
-        rec_y = int((display_height - book_recs_height)/2)
-
-        # Draw main break recommendation box
-        cv2.rectangle(overlay, (rec_x, rec_y), (rec_x + book_recs_width, rec_y + book_recs_height), UI_DARK_GREEN, -1)
-        cv2.putText(overlay, "Need a break?", (rec_x + 20, rec_y + 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, UI_WHITE, 2)
-        cv2.putText(overlay, "Based on your study logs,", (rec_x + 20, rec_y + 70), cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 1)
-        cv2.putText(overlay, "we recommend:", (rec_x + 20, rec_y + 90), cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 1)
-
-         # Close button
-        cv2.rectangle(display_frame,
-                      (rec_x + book_recs_width - 30, rec_y),
-                      (rec_x + book_recs_width, rec_y + 30),
-                      (100, 0, 0), -1)
-        cv2.putText(display_frame, "X",
-                    (rec_x + book_recs_width - 20, rec_y + 20),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 2)
+        current_book_recommendations = get_book_recommendation()
+
+def new_mental_recommendation():
+    global current_mental_recommendation
+    mq, mr = get_mental_health_recommendation(total_study_time, session_stats, focus_time,
+                                              analytics.wellbeing(current_time))
+    current_mental_recommendation = f"Q: {mq}\nA: {mr}"
+
+def close_study_bot():
+    global show_study_bot
+    show_study_bot = False
+
+def refresh_study_bot():
+    global current_study_recommendation, last_bot_update_time
+    current_study_recommendation = "Ask me a specific question about studying!"
+    last_bot_update_time = current_time
+
+def activate_input():
+    global input_active
+    input_active = True
+
+def ask_question():
+    global current_study_recommendation, user_question
+    if user_question.strip():
+        response = process_user_question(user_question)
+        current_study_recommendation = f"Q: {user_question}\nA: {response}"
+        user_question = ""
+
+def close_mental_bot():
+    global show_mental_bot
+    show_mental_bot = False
+
+def refresh_mental_bot():
+    global last_bot_update_time
+    new_mental_recommendation()
+    last_bot_update_time = current_time
+
+def close_book_recs():
+    global show_book_recs
+    show_book_recs = False
+
+title_bar = ui.add(Panel(0, 0, 1, 31, draw_title_bar, opaque=True))
+title_bar.add(Widget(mental_bot_btn_x, mental_bot_btn_y, button_width + 1, button_height + 1, toggle_mental_bot))
+title_bar.add(Widget(study_bot_btn_x, study_bot_btn_y, button_width + 1, button_height + 1, toggle_study_bot))
+
+stats_bar = ui.add(Panel(0, 0, 1, 60, draw_stats_bar, opaque=True))
+log_panel = ui.add(Panel(0, log_start_y, log_panel_width + 1, 1, draw_log_panel,
+                         background=UI_GRAY, background_alpha=0.7))
+
+study_panel = ui.add(Panel(0, 40, study_panel_width + 1, study_panel_height + 1, draw_study_panel,
+                           background=UI_BLUE, background_alpha=0.8))
+study_input_field_y = study_panel_height - 35
+study_panel.add(Widget(study_panel_width - 30, 0, 31, 31, close_study_bot))
+study_panel.add(Widget(study_panel_width - refresh_btn_width - 30, 0, refresh_btn_width + 1, 31, refresh_study_bot))
+study_panel.add(Widget(10, study_input_field_y, study_panel_width - 59, 26, activate_input))
+study_panel.add(Widget(study_panel_width - 45, study_input_field_y, 36, 26, ask_question))
+
+mental_panel = ui.add(Panel(0, 40, mental_panel_width + 1, mental_panel_height + 1, draw_mental_panel,
+                            background=UI_GREEN, background_alpha=0.8))
+mental_panel.add(Widget(mental_panel_width - 30, 0, 31, 31, close_mental_bot))
+mental_panel.add(Widget(mental_panel_width - refresh_btn_width - 30, 0, refresh_btn_width + 1, 31, refresh_mental_bot))
+
+book_panel = ui.add(Panel(0, 0, book_recs_width + 1, book_recs_height + 1, draw_book_recs,
+                          opaque=True, layer_alpha=0.75))
+book_panel.add(Panel(book_recs_width - 30, 0, 31, 31, draw_book_close, opaque=True, on_click=close_book_recs))
+
+def layout_widgets(display_width, display_height):
+    title_bar.set_rect(0, 0, display_width)
+    stats_bar.set_rect(0, display_height - 60, display_width)
+    log_panel.set_rect(0, log_start_y, height=max(display_height - 60 - log_start_y + 1, 1))
+    study_panel.set_rect(display_width - study_panel_width - 20, 40)
+    study_panel.set_visible(show_study_bot)
+    mental_panel.set_rect(display_width - mental_panel_width - 20, 310 if show_study_bot else 40)
+    mental_panel.set_visible(show_mental_bot)
+    book_panel.set_rect(int((display_width - book_recs_width)/2), int((display_height - book_recs_height)/2))
+    book_panel.set_visible(show_book_recs)
+
+if not args.headless:
+    cv2.setMouseCallback("Study Focus Monitor", ui.mouse_callback)
+
+# Stage timings: the capture and inference threads record their own stages,
+# the render loop records a lap at each stage boundary
+stage_metrics = StageMetrics()
+show_metrics = args.show_metrics
+metrics_text = None
+metrics_text_time = 0.0
+metrics_text_interval = 0.5  # seconds between readout refreshes, so the title bar isn't redrawn every frame
+metrics_export_interval = 5.0
+last_metrics_export = time.time()
+metrics_server = serve_metrics(stage_metrics, args.metrics_port) if args.metrics_port else None
+
+# Dashboard feed: events as they happen, stats once a second; the server
+# coalesces and sends from its own thread
+event_server = EventServer(args.events_port, origins=args.events_origin).start() if args.events_port else None
+event_stats_interval = 1.0
+last_event_stats_time = 0.0
+# History that outlives the session: the store writes from its own thread and
+# keeps one of the stats it is given per minute
+event_store = EventStore(args.store) if args.store else None
+# Hourly rollups behind the mental-health bot's questions about past days;
+# replays stay out of the real history unless a directory is given
+if args.no_analytics:
+    analytics_dir = None
+else:
+    analytics_dir = args.analytics or (None if args.replay else DEFAULT_ANALYTICS_DIR)
+analytics = Analytics(analytics_dir)
+
+def publish_event(event, final=False):
+    # final: the session's last stats, which the store keeps whatever its interval
+    if event["event"] == "stats":
+        analytics.record_stats(event)
+    else:
+        analytics.record_event(event)
+    if event_server is not None:
+        event_server.publish(event)
+    if event_store is not None:
+        if event["event"] == "stats":
+            event_store.record_stats(event, force=final)
+        else:
+            event_store.record_event(event)
+
+def metrics_readout():
+    draw_p95 = sum(stage_metrics.percentile(stage, 95) for stage in ("resize", "boxes", "overlays", "imshow"))
+    return (f"{stage_metrics.rate('frame'):.1f} fps | camera {stage_metrics.percentile('capture', 95) * 1000:.0f} ms"
+            f" | model {stage_metrics.percentile('inference', 95) * 1000:.0f} ms ({stage_metrics.rate('inference'):.1f}/s)"
+            f" | draw {draw_p95 * 1000:.0f} ms | waitKey {stage_metrics.percentile('waitkey', 95) * 1000:.0f} ms (p95)")
+
+def report_startup(current_time):
+    startup = {name: round(seconds, 3) for name, seconds in stage_metrics.marks.items()}
+    if args.headless:
+        emit_event(dict(event="startup", time=current_time, **startup))
+    else:
+        print("Startup: " + ", ".join(f"{name.replace('_', ' ')} {seconds:.2f} s"
+                                      for name, seconds in startup.items()), flush=True)
+
+def start_detection(current_time):
+    # The first detections are in: take the classes from the model and start
+    # the session clock now rather than while the model was still loading
+    global detection_started, class_names, person_class_id, phone_class_id
+    detection_started = True
+    class_names = model_loader.names
+    person_class_id = class_id(class_names, "person")
+    phone_class_id = class_id(class_names, "cell phone")
+    if trace_recorder is not None:
+        trace_recorder.open(TraceWriter(args.record, class_names,
+                                        int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                        int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))))
+    distraction_engine.reset(current_time)
+    stage_metrics.mark("model_load", model_loader.load_seconds)
+    stage_metrics.mark("time_to_first_detection", time.perf_counter() - app_started)
+    report_startup(current_time)
+
+# Capture and inference run on their own threads; this loop only renders, so the
+# display keeps up with the camera while the model works on the newest frame.
+# A recording takes every result where inference hands it over, not only the
+# ones this loop gets to before newer ones replace them.
+trace_recorder = TraceRecorder(LatestQueue()) if args.record else None
+if args.replay:
+    stop_event = threading.Event()
+    pipeline_threads = []
+    replay_frames = trace.frames()
+    replay_canvas = np.zeros((trace.height, trace.width, 3), dtype=np.uint8)
+    current_time = float(trace.timestamps()[0]) if len(trace) else time.time()
+    replay_started, replay_start_time = time.time(), current_time
+    # Session clocks follow the trace, not the wall clock
+    distraction_engine.reset(current_time)
+    last_bot_update_time = current_time
+    detection_started = True
+else:
+    # Negotiated camera mode, for diagnosing slow or low-resolution capture
+    if args.headless:
+        emit_event(dict(event="camera", time=time.time(), **(video_capture.mode or {})))
+    else:
+        print(f"Camera: {video_capture.describe()}", flush=True)
+    if args.multiprocess:
+        # The worker builds the same gate and tracker; model_loader becomes the
+        # worker, which has the same ready / error / names
+        worker_config = {
+            "weights": "yolov8n.pt", "backend": args.backend, "int8": args.int8, "mode": inference_mode,
+            "roi_person_imgsz": roi_person_imgsz, "roi_phone_imgsz": roi_phone_imgsz,
+            "motion_gate": [motion_sensitivity, motion_max_staleness] if motion_gate_enabled else None,
+            "tracker": [tracker_keyframe_interval, tracker_min_score] if tracker_enabled else None,
+        }
+        frame_queue, results_queue, stop_event, pipeline_threads, model_loader = start_process_pipeline(
+            video_capture, worker_config, display=not args.headless, metrics=stage_metrics,
+            results=trace_recorder)
+    else:
+        motion_gate = MotionGate(motion_sensitivity, motion_max_staleness) if motion_gate_enabled else None
+        box_tracker = BoxTracker(tracker_keyframe_interval, tracker_min_score) if tracker_enabled else None
+        # The inference thread holds off until the model has loaded and warmed up
+        frame_queue, results_queue, stop_event, pipeline_threads = start_pipeline(
+            video_capture, model_loader, motion_gate, box_tracker, display=not args.headless,
+            metrics=stage_metrics, ready=model_loader.ready, results=trace_recorder)
+    current_time = time.time()
+    detection_started = False
+detections = NO_DETECTIONS
+first_frame = True
+
+if args.headless:
+    # Kiosks are stopped with SIGTERM; let the loop exit and release the camera
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    last_stats_time = time.time()
+
+if args.replay and args.headless:
+    # Nothing to draw or pace, so the whole trace goes through the engine's
+    # vectorized replay in one call
+    timestamps, phone_present, person_present = trace.presence(phone_class_id, person_class_id)
+    for event in distraction_engine.replay(timestamps, phone_present, person_present):
+        emit_event(event)
+        publish_event(event)
+    if len(timestamps):
+        current_time = float(timestamps[-1])
+    stop_event.set()
+
+while not stop_event.is_set():
+    if model_loader is not None and model_loader.error is not None:
+        break
+    if args.replay:
+        new_results = next(replay_frames, None)
+        if new_results is None:
+            break
+        frame = replay_canvas
+        # Play back at the recorded speed
+        delay = (new_results[1] - replay_start_time) - (time.time() - replay_started)
+        if delay > 0:
+            time.sleep(delay)
+    elif args.headless:
+        # Nothing to draw, so wake up on new detections instead of new frames
+        new_results = results_queue.get(timeout=0.5)
+        if new_results is None:
+            continue
+    else:
+        packet = frame_queue.get(timeout=0.5)
+        if packet is None:
+            # No frame yet; keep the window responsive while the camera starts
+            cv2.waitKey(1)
+            continue
+        _, capture_time, frame = packet
+        if first_frame:
+            # Size the window to what the camera actually delivers
+            cv2.resizeWindow("Study Focus Monitor", frame.shape[1], frame.shape[0])
+        new_results = results_queue.get_nowait()
+
+    stage_metrics.start_frame()
+    if args.metrics_file and time.time() - last_metrics_export >= metrics_export_interval:
+        stage_metrics.write(args.metrics_file)
+        last_metrics_export = time.time()
+
+    current_time = new_results[1] if args.replay else time.time()
+    if not detection_started and new_results is not None:
+        start_detection(current_time)
+    results_capture_time = None
+    if new_results is not None:
+        _, results_capture_time, detections = new_results
+    phone_mask = class_mask(detections, phone_class_id)
+    person_mask = class_mask(detections, person_class_id)
+    if detection_started:
+        warning, distraction_events = distraction_engine.update(
+            current_time, bool(phone_mask.any()), bool(person_mask.any()), results_capture_time)
+        update_focus_stats(current_time)
+    else:
+        # Nothing is known about the desk yet, so the session clock stays at zero
+        warning, distraction_events = None, []
+        update_focus_stats(distraction_engine.focus_start_time)
+    for event in distraction_events:
+        publish_event(event)
+    if detection_started and current_time - last_event_stats_time >= event_stats_interval:
+        publish_event(stats_event(current_time))
+        last_event_stats_time = current_time
+    stage_metrics.lap("state")
+
+    if args.headless:
+        for event in distraction_events:
+            emit_event(event)
+        if current_time - last_stats_time >= args.stats_interval:
+            emit_event(stats_event(current_time))
+            last_stats_time = current_time
+        continue
 
-        # Draw book recommendations
-        book_start_y = rec_y + 140
-        book_spacing = 35
-        for i, (title, rating) in enumerate(current_book_recommendations):
-            cv2.putText(overlay, f"{title} ({rating}/5)", (rec_x + 20, book_start_y + i * book_spacing),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 1)
+    original_height, original_width = frame.shape[:2]
+    window_rect = cv2.getWindowImageRect("Study Focus Monitor")
+    if window_rect[2] > 0 and window_rect[3] > 0:
+        display_width, display_height = window_rect[2], window_rect[3]
+    else:
+        display_width, display_height = original_width, original_height
 
-        # Draw "Take me to Shelved™" button
-        button_y = rec_y + book_recs_height - 40
-        cv2.rectangle(overlay, (rec_x + 50, button_y), (rec_x + book_recs_width - 50, button_y + 30), UI_WHITE, -1)
-        cv2.putText(overlay, "Take me to Shelved!", (rec_x + 60, button_y + 20),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_BLACK, 1)
+    display_frame = cv2.resize(frame, (display_width, display_height), interpolation=cv2.INTER_LINEAR)
+    ui_layers.set_size(display_width, display_height)
+    stage_metrics.lap("resize")
+
+    # Object detection overlay
+    scaled_boxes = scale_boxes(detections, display_width / original_width, display_height / original_height)
+    for (scaled_x1, scaled_y1, scaled_x2, scaled_y2), conf, cls, is_phone in zip(
+            scaled_boxes.tolist(), detections[:, 4].tolist(), detections[:, 5].tolist(), phone_mask.tolist()):
+        label = f"{class_names[int(cls)]} {conf:.2f}"
+        box_color = UI_RED if is_phone else UI_GREEN
+
+        cv2.rectangle(display_frame, (scaled_x1, scaled_y1),
+                      (scaled_x2, scaled_y2), box_color, 2)
+        label_size = text_size(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
+        cv2.rectangle(display_frame, (scaled_x1, scaled_y1 - 25),
+                      (scaled_x1 + label_size[0] + 10, scaled_y1), box_color, -1)
+        cv2.putText(display_frame, label, (scaled_x1 + 5, scaled_y1 - 8),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, UI_WHITE, 2)
+    stage_metrics.lap("boxes")
+
+    banner = distraction_warnings[warning] if warning is not None else None
+    if not detection_started:
+        banner = ("Loading the detection model...", UI_BLUE)
+    if banner is not None:
+        warning_text, warning_color = banner
+        warning_size = text_size(warning_text, cv2.FONT_HERSHEY_SIMPLEX, 0.9, 2)[0]
+        text_x = (display_width - warning_size[0]) // 2
+        ui_layers.blend_rect(display_frame, 0, 35, display_width, 95, warning_color, 0.7)
+        cv2.putText(display_frame, warning_text, (text_x, 75),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, UI_WHITE, 2)
 
-        cv2.addWeighted(overlay, alpha, display_frame, 1 - alpha, 0, display_frame)
+    if current_time - last_bot_update_time > bot_update_interval:
+        sq, sr = get_study_recommendation(focus_percentage, session_stats, focus_time, total_study_time)
+        current_study_recommendation = f"Q: {sq}\nA: {sr}"
 
-    # -------------------- TOGGLE BUTTONS --------------------
-    button_width = 160
-    button_height = 25
+        mq, mr = get_mental_health_recommendation(total_study_time, session_stats, focus_time,
+                                                  analytics.wellbeing(current_time))
+        current_mental_recommendation = f"Q: {mq}\nA: {mr}"
 
-    # Mental Bot toggle
-    mental_bot_btn_x = 10
-    mental_bot_btn_y = 5
-    cv2.rectangle(
-        display_frame,
-        (mental_bot_btn_x, mental_bot_btn_y),
-        (mental_bot_btn_x + button_width, mental_bot_btn_y + button_height),
-        UI_DARK_GREEN if not show_mental_bot else UI_RED, -1
-    )
-    cv2.putText(display_frame,
-                "Show Mental Bot" if not show_mental_bot else "Hide Mental Bot",
-                (mental_bot_btn_x + 10, mental_bot_btn_y + 18),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
+        last_bot_update_time = current_time
 
-    # Study Bot toggle
-    study_bot_btn_x = mental_bot_btn_x + button_width + 10
-    study_bot_btn_y = 5
-    cv2.rectangle(
-        display_frame,
-        (study_bot_btn_x, study_bot_btn_y),
-        (study_bot_btn_x + button_width, study_bot_btn_y + button_height),
-        UI_DARK_GREEN if not show_study_bot else UI_RED, -1
-    )
-    cv2.putText(display_frame,
-                "Show Study Bot" if not show_study_bot else "Hide Study Bot",
-                (study_bot_btn_x + 10, study_bot_btn_y + 18),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.5, UI_WHITE, 1)
+    # -------------------- PANELS --------------------
+    layout_widgets(display_width, display_height)
+    if not show_metrics:
+        metrics_text = None
+    elif metrics_text is None or time.time() - metrics_text_time >= metrics_text_interval:
+        metrics_text = metrics_readout()
+        metrics_text_time = time.time()
+    title_bar.update((show_mental_bot, show_study_bot, metrics_text))
+    # Whole seconds, so the bar is only redrawn when a number it shows changes
+    if distraction_engine.distraction_start_time is not None:
+        streak_until = distraction_engine.distraction_start_time
+    else:
+        streak_until = current_time if detection_started else distraction_engine.focus_start_time
+    stats_bar.update((int(total_study_time), int(focus_time), round(focus_percentage, 1),
+                      int(session_stats.longest_focus_streak(streak_until))))
+    log_panel.update(len(distraction_logs))
+    study_panel.update((current_study_recommendation, input_active, user_question,
+                        input_active and cursor_visible))
+    mental_panel.update((current_mental_recommendation,))
+    book_panel.update(tuple(current_book_recommendations))
+    ui.draw(display_frame, ui_layers)
+    stage_metrics.lap("overlays")
 
     # Blinking cursor
     if time.time() - cursor_blink_time > cursor_blink_interval:
@@ -707,16 +795,18 @@ while video_capture.isOpened():
         cursor_blink_time = time.time()
 
     cv2.imshow("Study Focus Monitor", display_frame)
+    stage_metrics.lap("imshow")
+    if first_frame:
+        stage_metrics.mark("time_to_first_frame", time.perf_counter() - app_started)
+        first_frame = False
 
     # -------------------- KEYBOARD HANDLING --------------------
     key = cv2.waitKey(1) & 0xFF
+    stage_metrics.lap("waitkey")
 
     if input_active:
         if key == 13:  # Enter
-            if user_question.strip():
-                response = process_user_question(user_question)
-                current_study_recommendation = f"Q: {user_question}\nA: {response}"
-                user_question = ""
+            ask_question()
         elif key == 8:  # Backspace
             if user_question:
                 user_question = user_question[:-1]
@@ -732,111 +822,54 @@ while video_capture.isOpened():
             break
         elif key == ord('r'):
             # Reset everything
-            focus_start_time = time.time()
-            total_distraction_time = 0
-            distraction_start_time = None
-            phone_detected_start_time = None
-            distraction_logs.clear()
-            current_distraction_session = None
+            distraction_engine.reset(current_time)
             show_study_bot = False
             show_mental_bot = False
             current_study_recommendation = ""
             current_mental_recommendation = ""
             current_book_recommendations = []
-            last_bot_update_time = time.time()
+            last_bot_update_time = current_time
         elif key == ord('s'):
-            show_study_bot = not show_study_bot
-            if show_study_bot:
-                current_study_recommendation = "Ask me a question about studying or focus techniques!"
-                input_active = False
-                user_question = ""
+            toggle_study_bot()
         elif key == ord('m'):
-            show_mental_bot = not show_mental_bot
-            if show_mental_bot:
-                mq, mr = get_mental_health_recommendation(total_study_time, distraction_logs, focus_time)
-                current_mental_recommendation = f"Q: {mq}\nA: {mr}"
+            toggle_mental_bot()
         elif key == ord('n'):  # new mental health advice
             if show_mental_bot:
-                mq, mr = get_mental_health_recommendation(total_study_time, distraction_logs, focus_time)
-                current_mental_recommendation = f"Q: {mq}\nA: {mr}"
+                new_mental_recommendation()
                 last_bot_update_time = current_time
         elif key == ord('b'):
-            show_book_recs = not show_book_recs
-            if show_book_recs:
-                current_book_recommendations = get_book_recommendation()
+            toggle_book_recs()
+        elif key == ord('f'):
+            show_metrics = not show_metrics
 
     # -------------------- MOUSE HANDLING --------------------
-    if cv2.getWindowProperty("Study Focus Monitor", cv2.WND_PROP_VISIBLE) >= 1:
-        def mouse_callback(event, x, y, flags, param):
-            global show_study_bot, show_mental_bot, show_book_recs, current_study_recommendation, current_mental_recommendation
-            global last_bot_update_time, input_active, user_question
-
-            if event == cv2.EVENT_LBUTTONDOWN:
-                # Study Bot toggle
-                if (study_bot_btn_x <= x <= study_bot_btn_x + button_width and
-                    study_bot_btn_y <= y <= study_bot_btn_y + button_height):
-                    show_study_bot = not show_study_bot
-                    if show_study_bot:
-                        current_study_recommendation = "Ask me a question about studying or focus techniques!"
-                        input_active = False
-                        user_question = ""
-
-                # Mental Bot toggle
-                elif (mental_bot_btn_x <= x <= mental_bot_btn_x + button_width and
-                      mental_bot_btn_y <= y <= mental_bot_btn_y + button_height):
-                    show_mental_bot = not show_mental_bot
-                    if show_mental_bot:
-                        mq, mr = get_mental_health_recommendation(total_study_time, distraction_logs, focus_time)
-                        current_mental_recommendation = f"Q: {mq}\nA: {mr}"
-
-                # ---------------- Study Bot Buttons ----------------
-                refresh_btn_width = 80
-                if show_study_bot:
-                    # Study bot close button
-                    if (study_panel_x + study_panel_width - 30 <= x <= study_panel_x + study_panel_width and
-                        study_panel_y <= y <= study_panel_y + 30):
-                        show_study_bot = False
-
-                    # Study bot "Refresh" button
-                    if (study_panel_x + study_panel_width - refresh_btn_width - 30 <= x <= study_panel_x + study_panel_width - 30 and
-                        study_panel_y <= y <= study_panel_y + 30):
-                        current_study_recommendation = "Ask me a specific question about studying!"
-                        last_bot_update_time = time.time()
-
-                    # Study bot input field
-                    study_input_field_y = study_panel_y + study_panel_height - 35
-                    if (study_panel_x + 10 <= x <= study_panel_x + study_panel_width - 50 and
-                        study_input_field_y <= y <= study_input_field_y + 25):
-                        input_active = True
-                    elif (study_panel_x + study_panel_width - 45 <= x <= study_panel_x + study_panel_width - 10 and
-                          study_input_field_y <= y <= study_input_field_y + 25):
-                        # "Ask" button
-                        if user_question.strip():
-                            response = process_user_question(user_question)
-                            current_study_recommendation = f"Q: {user_question}\nA: {response}"
-                            user_question = ""
-
-                # ---------------- Mental Bot Buttons ----------------
-                if show_mental_bot:
-                    # close button (X)
-                    if (mental_panel_x + mental_panel_width - 30 <= x <= mental_panel_x + mental_panel_width and
-                        mental_panel_y <= y <= mental_panel_y + 30):
-                        show_mental_bot = False
-
-                    # refresh button
-                    if (mental_panel_x + mental_panel_width - refresh_btn_width - 30 <= x <= mental_panel_x + mental_panel_width - 30 and
-                        mental_panel_y <= y <= mental_panel_y + 30):
-                        mq, mr = get_mental_health_recommendation(total_study_time, distraction_logs, focus_time)
-                        current_mental_recommendation = f"Q: {mq}\nA: {mr}"
-                        last_bot_update_time = time.time()
-                
-                # ---------------- Book Rec Buttons ----------------
-                if show_book_recs:
-                    if (rec_x + book_recs_width - 30 <= x <= rec_x + book_recs_width and rec_y <= y <= rec_y + 30):
-                        print("HERE!!!!!!!!")
-                        show_book_recs = False
-
-        cv2.setMouseCallback("Study Focus Monitor", mouse_callback)
-
-video_capture.release()
-cv2.destroyAllWindows()
+    ui.dispatch_events()
+
+stop_pipeline(stop_event, pipeline_threads)
+if video_capture is not None:
+    video_capture.release()
+if trace_recorder is not None:
+    trace_recorder.close()
+if args.metrics_file:
+    stage_metrics.write(args.metrics_file)
+if metrics_server is not None:
+    metrics_server.shutdown()
+if not args.replay:
+    current_time = time.time()
+update_focus_stats(current_time if detection_started else distraction_engine.focus_start_time)
+final_stats = stats_event(current_time)
+if detection_started:
+    # The session's last stats (and its last partial second of study) reach
+    # the dashboards, the store and the rollups before they shut down
+    publish_event(final_stats, final=True)
+if event_server is not None:
+    event_server.stop()
+if event_store is not None:
+    event_store.close()
+analytics.close()
+if args.headless:
+    emit_event(final_stats)
+else:
+    cv2.destroyAllWindows()
+if model_loader is not None and model_loader.error is not None:
+    raise model_loader.error
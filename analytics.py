@@ -0,0 +1,183 @@
+"""
+Hourly rollups of study time and distractions, kept across sessions so the
+mental-health bot can talk about the past days and not just this session.
+Each column lives in its own flat binary file (hour.bin, study_seconds.bin,
+cell_phone_distractions.bin, ...); a row is one local hour, appended when
+the hour is over, so a year is under 9000 rows and a query is a few numpy
+reductions over whole columns.
+"""
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from distraction_engine import DISTRACTION_TYPES
+
+DEFAULT_ANALYTICS_DIR = os.path.join(os.path.expanduser("~"), ".focus_monitor", "analytics")
+EVENING_HOURS = (18, 24)
+LATE_HOURS = (22, 6)
+
+
+def type_slug(kind):
+    return DISTRACTION_TYPES[kind].lower().replace(" ", "_")
+
+
+# hour is the epoch time the row's local hour starts at
+COLUMNS = [("hour", np.int64), ("day", np.int32), ("hour_of_day", np.uint8),
+           ("study_seconds", np.float32), ("focus_seconds", np.float32)] + [
+    (f"{type_slug(kind)}_{field}", dtype) for kind in range(len(DISTRACTION_TYPES))
+    for field, dtype in (("distractions", np.int32), ("seconds", np.float32))]
+DISTRACTION_COLUMNS = [f"{type_slug(kind)}_distractions" for kind in range(len(DISTRACTION_TYPES))]
+
+
+def local_day(timestamp):
+    return datetime.fromtimestamp(timestamp).toordinal()
+
+
+class Analytics:
+    """
+    Takes the same events and stats as EventStore and adds them to the row
+    of the current hour: study and focus seconds (from the change in the
+    session's totals), and the count and seconds of each distraction type.
+    With path None nothing is written and the history is this run's only.
+    A crash loses at most the open hour; columns left uneven by one are cut
+    back to the shortest when loading.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.size = 0
+        self.data = {name: np.empty(0, dtype) for name, dtype in COLUMNS}
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self.load()
+        self.row = None
+        self.row_end = None
+        self.last_totals = {}
+
+    def column_file(self, name):
+        return os.path.join(self.path, name + ".bin")
+
+    def load(self):
+        stored = {}
+        for name, dtype in COLUMNS:
+            file = self.column_file(name)
+            stored[name] = np.fromfile(file, dtype) if os.path.exists(file) else np.empty(0, dtype)
+        self.size = min(len(column) for column in stored.values())
+        for name, dtype in COLUMNS:
+            if len(stored[name]) > self.size:
+                os.truncate(self.column_file(name), self.size * np.dtype(dtype).itemsize)
+            self.data[name] = stored[name][:self.size].copy()
+
+    def record_event(self, event):
+        if event["event"] != "distraction_end":
+            return
+        slug = type_slug(DISTRACTION_TYPES.index(event["type"]))
+        row = self.open_row(event["time"])
+        row[f"{slug}_distractions"] += 1
+        row[f"{slug}_seconds"] += event["duration"]
+
+    def record_stats(self, stats):
+        row = self.open_row(stats["time"])
+        stream = stats.get("stream", "")
+        last_total, last_focus = self.last_totals.get(stream, (0.0, 0.0))
+        if stats["total_study_time"] < last_total:
+            # The session was reset
+            last_total = last_focus = 0.0
+        row["study_seconds"] += stats["total_study_time"] - last_total
+        row["focus_seconds"] += stats["focus_time"] - last_focus
+        self.last_totals[stream] = (stats["total_study_time"], stats["focus_time"])
+
+    def open_row(self, timestamp):
+        # The row of the local hour timestamp falls in (so half-hour time
+        # zones get whole local hours too); anything from an earlier hour
+        # than the open one goes into the open one
+        if self.row is not None and timestamp < self.row_end:
+            return self.row
+        self.close_row()
+        start = datetime.fromtimestamp(timestamp).replace(minute=0, second=0, microsecond=0)
+        self.row = {name: 0 for name, _ in COLUMNS}
+        self.row.update(hour=int(start.timestamp()), day=start.toordinal(), hour_of_day=start.hour)
+        self.row_end = (start + timedelta(hours=1)).timestamp()
+        return self.row
+
+    def close_row(self):
+        if self.row is None:
+            return
+        if self.size == len(self.data["hour"]):
+            capacity = max(2 * self.size, 256)
+            for name, column in self.data.items():
+                grown = np.empty(capacity, column.dtype)
+                grown[:self.size] = column[:self.size]
+                self.data[name] = grown
+        for name, column in self.data.items():
+            column[self.size] = self.row[name]
+        if self.path is not None:
+            for name, column in self.data.items():
+                with open(self.column_file(name), "ab") as file:
+                    file.write(column[self.size:self.size + 1].tobytes())
+        self.size += 1
+        self.row = None
+
+    def close(self):
+        # Writes the open hour; a later run in the same hour adds a second row for it
+        self.close_row()
+
+    def table(self, now, days):
+        # Columns of the rows from the last `days` local days, the open hour included
+        columns = {name: column[:self.size] for name, column in self.data.items()}
+        if self.row is not None:
+            columns = {name: np.append(column, np.asarray(self.row[name], column.dtype))
+                       for name, column in columns.items()}
+        age = local_day(now) - columns["day"]
+        keep = (age >= 0) & (age < days)
+        columns = {name: column[keep] for name, column in columns.items()}
+        columns["age"] = age[keep]
+        return columns
+
+    def daily_study_seconds(self, now, days=7):
+        # Study seconds on each of the last `days` days, today first
+        table = self.table(now, days)
+        return np.bincount(table["age"], weights=table["study_seconds"], minlength=days)
+
+    def distractions_by_hour(self, now, days=7):
+        # Distractions of every type per hour of the day over the last `days` days
+        table = self.table(now, days)
+        counts = sum(table[name] for name in DISTRACTION_COLUMNS)
+        return np.bincount(table["hour_of_day"], weights=counts, minlength=24)
+
+    def consecutive_study_days(self, now, min_study_seconds=600, max_days=366):
+        # Days in a row with study, counting today as soon as it has any
+        daily = self.daily_study_seconds(now, max_days)
+        studied = daily >= min_study_seconds
+        if daily[0] > 0:
+            studied[0] = True
+        else:
+            # Nothing yet today; the streak may still run up to yesterday
+            studied = studied[1:]
+        return len(studied) if studied.all() else int(np.argmin(studied))
+
+    def evening_distractions(self, now, days=7):
+        return int(self.distractions_by_hour(now, days)[EVENING_HOURS[0]:EVENING_HOURS[1]].sum())
+
+    def boundary_score(self, now, days=14):
+        """
+        0-10 work-life boundary score: up to 6 points off for the share of
+        study done late at night (22:00-06:00) over the last `days` days and
+        a point off for every day past six in a row without a rest day.
+        """
+        table = self.table(now, days)
+        study = table["study_seconds"].astype(np.float64)
+        hour = table["hour_of_day"]
+        late = (hour >= LATE_HOURS[0]) | (hour < LATE_HOURS[1])
+        late_share = study[late].sum() / study.sum() if study.sum() > 0 else 0.0
+        overrun = min(max(self.consecutive_study_days(now) - 6, 0), 4)
+        return int(round(min(max(10 - 6 * late_share - overrun, 0), 10)))
+
+    def wellbeing(self, now):
+        # What the mental-health bot asks about the past days
+        return {
+            "consecutive_study_days": self.consecutive_study_days(now),
+            "evening_distractions": self.evening_distractions(now),
+            "boundary_score": self.boundary_score(now),
+        }
@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+
+from detections import class_id, class_mask, detections_from_results
+from distraction_engine import DistractionEngine
+from inference_backends import BACKENDS, load_model
+
+
+def decode_loop(video_capture, batch_size, output):
+    # Decodes on its own thread so the model never waits for the codec, and
+    # hands over (timestamps, frames) batches stamped with the file's own
+    # presentation times. None marks the end of the file.
+    fps = video_capture.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_index = 0
+    last_timestamp = -1.0
+    timestamps, frames = [], []
+    while True:
+        ret, frame = video_capture.read()
+        if not ret:
+            break
+        timestamp = video_capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if timestamp <= last_timestamp:
+            # Backend without usable timestamps: assume a constant frame rate
+            timestamp = frame_index / fps
+        timestamps.append(timestamp)
+        frames.append(frame)
+        last_timestamp = timestamp
+        frame_index += 1
+        if len(frames) == batch_size:
+            output.put((timestamps, frames))
+            timestamps, frames = [], []
+    if frames:
+        output.put((timestamps, frames))
+    output.put(None)
+    video_capture.release()
+
+
+def analyze_video(model, path, batch_size=16, conf_threshold=0.5, imgsz=640,
+                  phone_detect_threshold=3, person_absent_threshold=5, flicker_tolerance=2.0):
+    """
+    Run one video file through the model and the distraction engine. Returns
+    a summary dict with the file's distraction_logs and the throughput.
+    """
+    video_capture = cv2.VideoCapture(path)
+    if not video_capture.isOpened():
+        raise IOError(f"cannot open {path}")
+    fps = video_capture.get(cv2.CAP_PROP_FPS) or 30.0
+    duration = video_capture.get(cv2.CAP_PROP_FRAME_COUNT) / fps
+    # The file is written as the recording ends, so its mtime minus its
+    # length gives the wall-clock start used for the log's 12-hour labels
+    recording_start = os.path.getmtime(path) - duration
+
+    person_class_id = class_id(model.names, "person")
+    phone_class_id = class_id(model.names, "cell phone")
+    engine = DistractionEngine(phone_detect_threshold, person_absent_threshold,
+                               flicker_tolerance, recording_start)
+
+    batches = queue.Queue(maxsize=4)
+    started = time.perf_counter()
+    decoder = threading.Thread(target=decode_loop, args=(video_capture, batch_size, batches),
+                               name="decode", daemon=True)
+    decoder.start()
+
+    frame_count = 0
+    video_seconds = 0.0
+    while True:
+        batch = batches.get()
+        if batch is None:
+            break
+        timestamps, frames = batch
+        results = model(frames, imgsz=imgsz, classes=[person_class_id, phone_class_id], verbose=False)
+        for timestamp, result in zip(timestamps, results):
+            detections = detections_from_results([result], conf_threshold)
+            frame_time = recording_start + timestamp
+            engine.update(frame_time, bool(class_mask(detections, phone_class_id).any()),
+                          bool(class_mask(detections, person_class_id).any()), frame_time)
+        frame_count += len(frames)
+        video_seconds = timestamps[-1] + 1 / fps
+    decoder.join()
+    wall_seconds = time.perf_counter() - started
+
+    total_study_time, focus_time, focus_percentage = engine.focus_stats(recording_start + video_seconds)
+    return {
+        "file": path,
+        "frames": frame_count,
+        "video_seconds": round(video_seconds, 2),
+        "wall_seconds": round(wall_seconds, 2),
+        "speed": round(video_seconds / wall_seconds, 2) if wall_seconds > 0 else None,
+        "focus_time": round(focus_time, 1),
+        "focus_percentage": round(focus_percentage, 1),
+        "distraction_logs": [
+            dict(log, start_offset=round(log["start_time"] - recording_start, 2),
+                 end_offset=round(log["end_time"] - recording_start, 2))
+            for log in engine.logs.entries()
+        ]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Analyze recorded study sessions faster than real time. "
+                    "Prints one JSON summary per file on stdout.")
+    parser.add_argument("videos", nargs="+", help="video files to analyze")
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch",
+                        help="inference backend; onnx / openvino export the weights once and cache them")
+    parser.add_argument("--int8", action="store_true", help="use an INT8-quantized export")
+    parser.add_argument("--batch-size", type=int, default=16, help="frames per model call")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--conf", type=float, default=0.5, help="detection confidence threshold")
+    parser.add_argument("--phone-threshold", type=float, default=3, help="seconds of phone use that count as a distraction")
+    parser.add_argument("--absent-threshold", type=float, default=5, help="seconds away from the desk that count as a distraction")
+    parser.add_argument("--flicker-tolerance", type=float, default=2.0)
+    args = parser.parse_args()
+
+    # Batches need a dynamic batch axis in exported models
+    model = load_model(args.model, args.backend, args.imgsz, args.int8, dynamic=True)
+    total_video_seconds = 0.0
+    started = time.perf_counter()
+    for path in args.videos:
+        try:
+            summary = analyze_video(model, path, args.batch_size, args.conf, args.imgsz,
+                                    args.phone_threshold, args.absent_threshold, args.flicker_tolerance)
+        except IOError as e:
+            print(f"{path}: {e}", file=sys.stderr)
+            continue
+        print(json.dumps(summary), flush=True)
+        print(f"{path}: {summary['video_seconds']:.1f} s of video in {summary['wall_seconds']:.1f} s "
+              f"({summary['speed']}x real time), {len(summary['distraction_logs'])} distraction(s)",
+              file=sys.stderr)
+        total_video_seconds += summary["video_seconds"]
+
+    wall_seconds = time.perf_counter() - started
+    if len(args.videos) > 1 and wall_seconds > 0:
+        print(f"total: {total_video_seconds:.1f} s of video in {wall_seconds:.1f} s "
+              f"({total_video_seconds / wall_seconds:.2f}x real time)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
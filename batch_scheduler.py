@@ -0,0 +1,104 @@
+import threading
+import time
+
+from detections import class_id, detections_from_results
+
+
+def build_batch_detector(model):
+    # detect(frames) -> one detections array per frame, from a single model call
+    def detect(frames):
+        return [detections_from_results([result]) for result in model(frames, verbose=False)]
+    return detect
+
+
+class BatchScheduler:
+    """
+    Collects the newest frame of every stream into one batched model call.
+    A batch goes out as soon as every running stream that is free and due
+    has a frame waiting (or max_batch of them do), or when the oldest
+    waiting frame has been held for latency_budget seconds, whichever comes
+    first. As with StreamScheduler, no stream is served more than max_rate
+    times a second, and under overload the streams whose turn is oldest go
+    first.
+    """
+
+    def __init__(self, max_batch=8, latency_budget=0.03, max_rate=10.0):
+        self.condition = threading.Condition()
+        self.streams = []
+        self.max_batch = max_batch
+        self.latency_budget = latency_budget
+        self.interval = 1.0 / max_rate
+        self.batches = 0
+        self.batched_frames = 0
+
+    def next_batch(self, stop_event):
+        # [(stream, packet), ...] for the next batch, or None once stop_event is set
+        with self.condition:
+            while not stop_event.is_set():
+                now = time.perf_counter()
+                free = [s for s in self.streams
+                        if not s.busy and not s.stop_event.is_set() and s.next_due <= now]
+                waiting = [s for s in free if s.packet is not None]
+                timeout = 0.1
+                if waiting:
+                    oldest = min(s.packet_time for s in waiting)
+                    if (len(waiting) >= min(len(free), self.max_batch) or
+                            now - oldest >= self.latency_budget):
+                        chosen = sorted(waiting, key=lambda s: s.next_due)[:self.max_batch]
+                        batch = []
+                        for stream in chosen:
+                            batch.append((stream, stream.packet))
+                            stream.packet = None
+                            stream.busy = True
+                            stream.next_due = now + self.interval
+                        self.batches += 1
+                        self.batched_frames += len(batch)
+                        return batch
+                    timeout = oldest + self.latency_budget - now
+                not_due = [s.next_due for s in self.streams if not s.busy and s.next_due > now]
+                if not_due:
+                    timeout = min(timeout, min(not_due) - now)
+                self.condition.wait(min(max(timeout, 0.001), 0.1))
+        return None
+
+    def done(self, streams):
+        with self.condition:
+            for stream in streams:
+                stream.busy = False
+            self.condition.notify()
+
+    def mean_batch_size(self):
+        return self.batched_frames / self.batches if self.batches else 0.0
+
+
+def batch_worker(loader, scheduler, stop_event):
+    """
+    Runs batches from scheduler on loader (a ModelLoader built with
+    build_batch_detector) and fans the detections back out to each stream's
+    distraction engine. Streams whose motion gate says nothing changed keep
+    their previous detections and stay out of the model call.
+    """
+    while not loader.ready.wait(0.1):
+        if stop_event.is_set() or loader.error is not None:
+            return
+    person_class_id = class_id(loader.names, "person")
+    phone_class_id = class_id(loader.names, "cell phone")
+    while True:
+        batch = scheduler.next_batch(stop_event)
+        if batch is None:
+            return
+        try:
+            pending = [(stream, frame) for stream, (_, capture_time, frame) in batch
+                       if stream.needs_inference(frame, capture_time)]
+            if pending:
+                started = time.perf_counter()
+                results = loader([frame for _, frame in pending])
+                # Every frame in the batch waited for the whole call
+                elapsed = time.perf_counter() - started
+                for (stream, _), detections in zip(pending, results):
+                    stream.detections = detections
+                    stream.metrics.record("inference", elapsed)
+            for stream, (_, capture_time, _) in batch:
+                stream.update(capture_time, person_class_id, phone_class_id)
+        finally:
+            scheduler.done([stream for stream, _ in batch])
@@ -0,0 +1,80 @@
+"""
+Runs YOLOv8App.py end to end on FakeVideoCapture and StubModel with the
+HighGUI calls stubbed out, then prints the frame rates it reached as one
+JSON line. Used by benchmarks.run; extra arguments are passed to the app.
+"""
+import argparse
+import contextlib
+import json
+import os
+import runpy
+import sys
+import time
+import types
+
+import cv2
+
+import capture_device
+from benchmarks.fakes import FakeVideoCapture, StubModel
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "YOLOv8App.py")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the app on fake camera and model")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--camera-fps", type=float, default=None, help="pace the fake camera (default: as fast as possible)")
+    parser.add_argument("--model-latency", type=float, default=0.0)
+    parser.add_argument("--headless", action="store_true")
+    args, app_args = parser.parse_known_args()
+
+    captures, models = [], []
+    shown = [0]
+
+    def video_capture(*_, **__):
+        captures.append(FakeVideoCapture(args.width, args.height, args.frames, args.camera_fps))
+        return captures[-1]
+
+    def yolo(*_, **__):
+        models.append(StubModel(args.model_latency))
+        return models[-1]
+
+    def imshow(name, frame):
+        shown[0] += 1
+
+    ultralytics = types.ModuleType("ultralytics")
+    ultralytics.YOLO = yolo
+    sys.modules["ultralytics"] = ultralytics
+    cv2.VideoCapture = video_capture
+    cv2.namedWindow = cv2.resizeWindow = cv2.setMouseCallback = lambda *_, **__: None
+    cv2.destroyAllWindows = lambda: None
+    cv2.getWindowImageRect = lambda name: (0, 0, args.width, args.height)
+    cv2.imshow = imshow
+    cv2.waitKey = lambda delay=0: 255
+    # The fake camera's mode must not end up in the user's camera cache
+    capture_device.DEFAULT_MODE_CACHE = None
+
+    # Stub-model sessions must not land in the user's study history
+    sys.argv = [APP_PATH, "--no-analytics"] + (["--headless"] if args.headless else []) + app_args
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        runpy.run_path(APP_PATH, run_name="__main__")
+    elapsed = time.perf_counter() - started
+
+    frames_read = sum(capture.frames_read for capture in captures)
+    model_calls = sum(model.calls for model in models)
+    result = {
+        "frames": frames_read,
+        "seconds": round(elapsed, 3),
+        "capture_fps": round(frames_read / elapsed, 1),
+        "inference_fps": round(model_calls / elapsed, 1),
+    }
+    if not args.headless:
+        result["render_fps"] = round(shown[0] / elapsed, 1)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
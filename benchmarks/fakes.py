@@ -0,0 +1,163 @@
+import time
+
+import cv2
+import numpy as np
+
+# Kept before anything patches cv2.VideoCapture, for reading real files
+_VideoCapture = cv2.VideoCapture
+
+COCO_NAMES = {0: "person", 56: "chair", 67: "cell phone"}
+
+
+class FakeVideoCapture:
+    """
+    Stand-in for cv2.VideoCapture. Serves synthetic frames (a bar sweeping
+    across a gray background, so the motion gate sees change) or loops a
+    video file, optionally paced at fps, and reports end of stream after
+    `frames` reads.
+    """
+
+    def __init__(self, width=1280, height=720, frames=300, fps=None, source=None):
+        self.width = width
+        self.height = height
+        self.frames = frames
+        self.fps = fps
+        self.frames_read = 0
+        self.file = None
+        if source is not None:
+            self.file = _VideoCapture(source)
+            self.width = int(self.file.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(self.file.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.background = np.full((self.height, self.width, 3), 60, dtype=np.uint8)
+        self.started = None
+        self.grabbed = None
+
+    def isOpened(self):
+        return self.frames_read < self.frames
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def grab(self):
+        self.grabbed = None
+        if self.frames_read >= self.frames:
+            return False
+        if self.fps:
+            if self.started is None:
+                self.started = time.perf_counter()
+            delay = self.started + self.frames_read / self.fps - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        if self.file is not None:
+            ret, frame = self.file.read()
+            if not ret:
+                self.file.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = self.file.read()
+            if not ret:
+                return False
+        else:
+            frame = self.background.copy()
+            bar = self.width // 16
+            x = (self.frames_read * bar // 4) % (self.width - bar)
+            frame[:, x:x + bar] = 200
+        self.frames_read += 1
+        self.grabbed = frame
+        return True
+
+    def retrieve(self):
+        return self.grabbed is not None, self.grabbed
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps or 30.0
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.frames
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return max(self.frames_read - 1, 0) * 1000.0 / (self.fps or 30.0)
+        return 0.0
+
+    def getBackendName(self):
+        return "FAKE"
+
+    def release(self):
+        if self.file is not None:
+            self.file.release()
+
+
+class CannedTensor:
+    # Just enough of a torch tensor for detections_from_results
+    def __init__(self, array):
+        self.array = array
+
+    def __len__(self):
+        return len(self.array)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class CannedBoxes:
+    def __init__(self, data):
+        self.data = CannedTensor(data)
+
+
+class CannedResult:
+    def __init__(self, data, shape):
+        self.boxes = CannedBoxes(data)
+        self.orig_shape = shape
+
+
+def canned_boxes(width, height, phone=True, extra=1):
+    """
+    (N, 6) rows for a seated person, optionally a phone in their hands, and
+    `extra` low-confidence chairs, scaled to the frame size.
+    """
+    rows = [[0.3, 0.2, 0.7, 0.95, 0.91, 0]]
+    if phone:
+        rows.append([0.45, 0.5, 0.52, 0.62, 0.78, 67])
+    for i in range(extra):
+        rows.append([0.05 * (i % 10), 0.7, 0.05 * (i % 10) + 0.1, 0.99, 0.3, 56])
+    data = np.array(rows, dtype=np.float32)
+    data[:, [0, 2]] *= width
+    data[:, [1, 3]] *= height
+    return data
+
+
+class StubModel:
+    """
+    Replaces YOLO("yolov8n.pt"): returns canned boxes after an optional fixed
+    latency. The phone shows up for phone_period calls, then disappears for
+    as many, so the distraction logic has something to do.
+    """
+
+    names = COCO_NAMES
+
+    def __init__(self, latency=0.0, phone_period=90, extra=1):
+        self.latency = latency
+        self.phone_period = phone_period
+        self.extra = extra
+        self.calls = 0
+        self.overrides = {}
+
+    def __call__(self, source, **kwargs):
+        frames = source if isinstance(source, list) else [source]
+        if self.latency:
+            time.sleep(self.latency)
+        phone = (self.calls // self.phone_period) % 2 == 1
+        self.calls += 1
+        return [CannedResult(canned_boxes(frame.shape[1], frame.shape[0], phone, self.extra), frame.shape[:2])
+                for frame in frames]
+
+    predict = __call__
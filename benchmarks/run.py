@@ -0,0 +1,286 @@
+"""
+Benchmarks for the monitor's hot loop. Run from the repository root:
+
+    python -m benchmarks.run [--only NAME ...] [--output results.json] [--compare old.json]
+
+Every benchmark uses FakeVideoCapture and StubModel, so no camera, GPU or
+model weights are needed. Results are printed as JSON (per-call latency
+percentiles and calls per second) and summarized on stderr.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.fakes import FakeVideoCapture, StubModel
+from detections import class_mask, detections_from_results, scale_boxes
+from analytics import Analytics
+from distraction_engine import DistractionEngine
+from session_stats import SessionStats
+from overlays import LayerCache
+from study_bots import (format_time, get_book_recommendation, get_mental_health_recommendation,
+                        get_study_recommendation)
+from text_layout import text_size, wrap_text
+from widgets import Panel, WidgetTree
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+
+
+def summarize(samples):
+    # samples are per-call durations in seconds
+    ms = np.asarray(samples) * 1000.0
+    return {
+        "n": len(ms),
+        "mean_ms": round(float(ms.mean()), 6),
+        "p50_ms": round(float(np.percentile(ms, 50)), 6),
+        "p95_ms": round(float(np.percentile(ms, 95)), 6),
+        "p99_ms": round(float(np.percentile(ms, 99)), 6),
+        "per_sec": round(1000.0 / float(ms.mean()), 1) if ms.mean() > 0 else None,
+    }
+
+
+def time_calls(fn, count, warmup=10):
+    # fn(i) is called with consecutive i, the warmup calls first
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(warmup, warmup + count):
+        started = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def bench_postprocess(count):
+    # Model output to the detection flags and display boxes the render loop uses
+    model = StubModel(phone_period=1)
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    results = {}
+    for extra in (1, 50):
+        model.extra = extra
+        canned = model(frame)
+
+        def step(i):
+            detections = detections_from_results(canned)
+            class_mask(detections, 67).any()
+            class_mask(detections, 0).any()
+            scale_boxes(detections, 1280 / 1920, 720 / 1080)
+
+        results[f"postprocess_{extra + 2}_boxes"] = time_calls(step, count)
+    return results
+
+
+def text_panel(color):
+    def render(canvas, lines):
+        cv2.rectangle(canvas, (0, 0), (canvas.shape[1], 30), color, -1)
+        for row, line in enumerate(lines):
+            cv2.putText(canvas, line, (10, 25 + row * 25), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+    return render
+
+
+def wrapped_panel(canvas, text):
+    cv2.rectangle(canvas, (0, 0), (canvas.shape[1], 30), (255, 180, 50), -1)
+    for line, row in wrap_text(text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1, canvas.shape[1] - 20):
+        cv2.putText(canvas, line, (10, 60 + row * 25), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+
+def bench_render(name, count):
+    """
+    One display frame as the app draws it: resize the camera frame, draw the
+    detection boxes and the warning banner, then composite a widget tree laid
+    out like the app's (title and stats bars, translucent log and bot panels,
+    book panel). The stats text changes once a second at 30 fps.
+    """
+    width, height = RESOLUTIONS[name]
+    capture = FakeVideoCapture(1920, 1080, frames=1)
+    _, camera_frame = capture.read()
+    detections = detections_from_results(StubModel(phone_period=1)(camera_frame))
+
+    layers = LayerCache()
+    ui = WidgetTree()
+    title_bar = ui.add(Panel(0, 0, width, 31, text_panel((255, 180, 50)), opaque=True))
+    stats_bar = ui.add(Panel(0, height - 60, width, 60, text_panel((70, 70, 70)), opaque=True))
+    log_panel = ui.add(Panel(0, 100, 501, height - 160, text_panel((70, 70, 70)),
+                             background=(70, 70, 70), background_alpha=0.7))
+    study_panel = ui.add(Panel(width - 420, 40, 401, 261, wrapped_panel,
+                               background=(255, 180, 50), background_alpha=0.8))
+    mental_panel = ui.add(Panel(width - 420, 310, 401, 201, wrapped_panel,
+                                background=(0, 200, 0), background_alpha=0.8))
+    book_panel = ui.add(Panel((width - 400) // 2, (height - 300) // 2, 401, 301,
+                              text_panel((0, 100, 0)), opaque=True, layer_alpha=0.75))
+    title_bar.update(("Study Focus Monitor",))
+    log_panel.update(tuple(f"Cell Phone  09:{i:02d} AM  09:{i + 1:02d} AM  42s" for i in range(12)))
+    study_panel.update("Q: How can I study more efficiently?\nA: You've had 7 distractions today. "
+                       "Try a quieter environment and put the phone in another room.")
+    mental_panel.update("Q: How can I manage study stress?\nA: Your sessions are relatively steady. "
+                        "Take breaks and try a 5-min meditation.")
+    book_panel.update(("Deep Work 4.7", "Atomic Habits 4.8", "Digital Minimalism 4.6"))
+    warning = "Phone detected! Stay focused on your study!"
+
+    def step(i):
+        display_frame = cv2.resize(camera_frame, (width, height), interpolation=cv2.INTER_LINEAR)
+        layers.set_size(width, height)
+        boxes = scale_boxes(detections, width / 1920, height / 1080)
+        for (x1, y1, x2, y2), conf in zip(boxes.tolist(), detections[:, 4].tolist()):
+            label = f"object {conf:.2f}"
+            cv2.rectangle(display_frame, (x1, y1), (x2, y2), (0, 200, 0), 2)
+            label_size = text_size(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
+            cv2.rectangle(display_frame, (x1, y1 - 25), (x1 + label_size[0] + 10, y1), (0, 200, 0), -1)
+            cv2.putText(display_frame, label, (x1 + 5, y1 - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+        warning_size = text_size(warning, cv2.FONT_HERSHEY_SIMPLEX, 0.9, 2)[0]
+        layers.blend_rect(display_frame, 0, 35, width, 95, (0, 0, 255), 0.7)
+        cv2.putText(display_frame, warning, ((width - warning_size[0]) // 2, 75),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (255, 255, 255), 2)
+        seconds = i // 30
+        stats_bar.update((f"Total Study Time: {format_time(seconds)}",
+                          f"Focus Time: {format_time(seconds * 0.8)}", "Focus: 80.0%"))
+        ui.draw(display_frame, layers)
+
+    return {f"render_{name}": time_calls(step, count)}
+
+
+def synthetic_presence(frames, seed=0):
+    # 30 fps trace: the phone comes and goes in runs of a few seconds,
+    # the person is away now and then
+    rng = np.random.default_rng(seed)
+    timestamps = 1.7e9 + np.arange(frames) / 30.0
+    phone = np.repeat(rng.random(frames // 120 + 1) < 0.3, 120)[:frames]
+    person = np.repeat(rng.random(frames // 300 + 1) < 0.9, 300)[:frames] | phone
+    return timestamps, phone, person
+
+
+def bench_state_machine(frames):
+    results = {}
+    timestamps, phone, person = synthetic_presence(frames)
+    engine = DistractionEngine(start_time=timestamps[0])
+    frame_inputs = list(zip(timestamps.tolist(), phone.tolist(), person.tolist()))
+    results["state_machine_update"] = time_calls(
+        lambda i: engine.update(frame_inputs[i][0], frame_inputs[i][1], frame_inputs[i][2], frame_inputs[i][0]),
+        len(frame_inputs) - 10, warmup=10)
+
+    timestamps, phone, person = synthetic_presence(frames * 30, seed=1)
+    samples = []
+    for _ in range(3):
+        engine = DistractionEngine(start_time=timestamps[0])
+        started = time.perf_counter()
+        engine.replay(timestamps, phone, person)
+        samples.append((time.perf_counter() - started) / len(timestamps))
+    results["state_machine_replay"] = summarize(samples)
+    return results
+
+
+def synthetic_history(days, start_time=1700000000):
+    # In-memory rollups of `days` days with a few study hours and distractions each day
+    analytics = Analytics()
+    total = focus = 0.0
+    for hour in range(days * 24):
+        t = start_time + hour * 3600
+        if random.random() < 0.3:
+            total += 3600
+            focus += random.uniform(2400, 3600)
+            for _ in range(random.randint(0, 4)):
+                analytics.record_event({"event": "distraction_end", "time": t + 1800,
+                                        "type": random.choice(["Cell Phone", "Left Desk"]),
+                                        "duration": random.randint(5, 600)})
+        analytics.record_stats({"time": t + 3599, "total_study_time": total, "focus_time": focus})
+    return analytics, start_time + days * 86400
+
+
+def bench_bot_helpers(count):
+    random.seed(0)
+    session_stats = SessionStats(2, start_time=1700000000)
+    for i in range(200):
+        session_stats.add(random.randrange(2), 1700000000 + i * 600, 1700000300 + i * 600, random.randint(5, 600))
+    analytics, now = synthetic_history(180)
+    return {
+        "bot_study_recommendation": time_calls(
+            lambda i: get_study_recommendation(81.5, session_stats, 5400, 7200), count),
+        "bot_mental_health_recommendation": time_calls(
+            lambda i: get_mental_health_recommendation(7200, session_stats, 5400, analytics.wellbeing(now)), count),
+        "analytics_wellbeing_180_days": time_calls(lambda i: analytics.wellbeing(now), count),
+        "bot_book_recommendation": time_calls(lambda i: get_book_recommendation(), count),
+        "bot_format_time": time_calls(lambda i: format_time(i * 7.5), count),
+    }
+
+
+def bench_app(frames, headless, model_latency):
+    # Whole app in a child process, so its cv2 / ultralytics patches stay there
+    command = [sys.executable, "-m", "benchmarks.app_harness", "--frames", str(frames),
+               "--model-latency", str(model_latency)]
+    if headless:
+        command.append("--headless")
+    output = subprocess.run(command, capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return {"app_headless" if headless else "app_window": json.loads(output.stdout.splitlines()[-1])}
+
+
+BENCHMARKS = ["postprocess", "render", "state_machine", "bot_helpers", "app"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the monitor's hot loop")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="run only these benchmarks")
+    parser.add_argument("--count", type=int, default=300, help="frames / calls per benchmark")
+    parser.add_argument("--app-frames", type=int, default=600, help="frames for the end-to-end app runs")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="stub model seconds per call")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--compare", help="earlier results file to compare mean latencies against")
+    args = parser.parse_args()
+    selected = args.only or BENCHMARKS
+
+    results = {}
+    if "postprocess" in selected:
+        results.update(bench_postprocess(args.count * 10))
+    if "render" in selected:
+        for name in RESOLUTIONS:
+            results.update(bench_render(name, args.count))
+    if "state_machine" in selected:
+        results.update(bench_state_machine(args.count * 100))
+    if "bot_helpers" in selected:
+        results.update(bench_bot_helpers(args.count * 10))
+    if "app" in selected:
+        results.update(bench_app(args.app_frames, True, args.model_latency))
+        results.update(bench_app(args.app_frames, False, args.model_latency))
+
+    report = {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+    for name, result in results.items():
+        line = f"{name:34s}"
+        if "mean_ms" in result:
+            line += f" mean {result['mean_ms']:10.4f} ms  p95 {result['p95_ms']:10.4f} ms  {result['per_sec']:>12} /s"
+            if "mean_ms" in baseline.get(name, {}):
+                change = result["mean_ms"] / baseline[name]["mean_ms"] - 1
+                line += f"  {change:+.1%} vs baseline"
+        else:
+            line += "  " + "  ".join(f"{key} {value}" for key, value in result.items())
+        print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import numpy as np
+
+from detections import NO_DETECTIONS
+
+
+def iou_matrix(boxes_a, boxes_b):
+    # Pairwise intersection-over-union between two (N, 4) and (M, 4) xyxy arrays
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class Track:
+    def __init__(self, track_id, box, conf, cls):
+        self.track_id = track_id
+        self.box = np.asarray(box, dtype=np.float64)
+        self.measured_box = self.box.copy()
+        self.velocity = np.zeros(4)
+        self.conf = conf
+        self.cls = cls
+        self.score = conf
+        self.frames_since_update = 0
+        self.misses = 0
+
+
+class BoxTracker:
+    """
+    IoU tracker with constant-velocity box prediction. The model only runs on
+    keyframes: every keyframe_interval frames, or sooner when a track's score
+    (its detection confidence, decayed on every predicted frame) falls below
+    min_score. In between, predict() carries every box forward along its
+    estimated velocity so the overlay and the phone/person logic see stable
+    boxes with persistent ids.
+    """
+
+    def __init__(self, keyframe_interval=6, min_score=0.35, decay=0.92,
+                 iou_threshold=0.3, max_misses=2, smoothing=0.5):
+        self.keyframe_interval = keyframe_interval
+        self.min_score = min_score
+        self.decay = decay
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.smoothing = smoothing
+        self.tracks = []
+        self.next_id = 1
+        self.frames_since_keyframe = None
+
+    def needs_detection(self):
+        if self.frames_since_keyframe is None:
+            return True
+        if self.frames_since_keyframe >= self.keyframe_interval - 1:
+            return True
+        return any(track.misses == 0 and track.score < self.min_score for track in self.tracks)
+
+    def predict(self):
+        for track in self.tracks:
+            track.box = track.box + track.velocity
+            track.score *= self.decay
+            track.frames_since_update += 1
+        self.frames_since_keyframe += 1
+        return self.detections()
+
+    def update(self, detections):
+        """Associate a fresh (N, 6) detections array with the tracks."""
+        for track in self.tracks:
+            track.box = track.box + track.velocity
+            track.frames_since_update += 1
+        self.frames_since_keyframe = 0
+
+        det_boxes = detections[:, :4].astype(np.float64)
+        det_classes = detections[:, 5].astype(np.int64)
+        unmatched = set(range(len(detections)))
+        matched_tracks = set()
+
+        if self.tracks and len(detections):
+            track_boxes = np.array([track.box for track in self.tracks])
+            track_classes = np.array([track.cls for track in self.tracks])
+            scores = iou_matrix(track_boxes, det_boxes)
+            scores[track_classes[:, None] != det_classes[None, :]] = 0.0
+            # Greedy association: take the best remaining pair until nothing overlaps enough
+            while True:
+                t, d = np.unravel_index(np.argmax(scores), scores.shape)
+                if scores[t, d] < self.iou_threshold:
+                    break
+                self._correct(self.tracks[t], detections[d])
+                matched_tracks.add(t)
+                unmatched.discard(d)
+                scores[t, :] = 0.0
+                scores[:, d] = 0.0
+
+        survivors = []
+        for i, track in enumerate(self.tracks):
+            if i not in matched_tracks:
+                # Hold the box where it was last seen so a detector flicker
+                # doesn't drop it, but give up after max_misses keyframes
+                track.misses += 1
+                track.velocity[:] = 0.0
+                if track.misses > self.max_misses:
+                    continue
+            survivors.append(track)
+        self.tracks = survivors
+
+        for d in sorted(unmatched):
+            self.tracks.append(Track(self.next_id, det_boxes[d], float(detections[d, 4]), int(det_classes[d])))
+            self.next_id += 1
+        return self.detections()
+
+    def _correct(self, track, detection):
+        measured = np.asarray(detection[:4], dtype=np.float64)
+        frames = max(track.frames_since_update, 1)
+        observed_velocity = (measured - track.measured_box) / frames
+        track.velocity = self.smoothing * observed_velocity + (1 - self.smoothing) * track.velocity
+        track.box = measured
+        track.measured_box = measured
+        track.conf = float(detection[4])
+        track.score = track.conf
+        track.frames_since_update = 0
+        track.misses = 0
+
+    def detections(self):
+        if not self.tracks:
+            return NO_DETECTIONS
+        return np.array([(*t.box, t.conf, t.cls) for t in self.tracks], dtype=np.float32)
+
+    def reset(self):
+        self.tracks = []
+        self.frames_since_keyframe = None
@@ -0,0 +1,210 @@
+import json
+import os
+import sys
+import time
+
+import cv2
+
+# Candidate modes, largest first; at each size the compressed format comes
+# first, since raw YUYV 1080p over USB 2 only manages ~5 fps
+CAPTURE_SIZES = ((1920, 1080), (1280, 720), (640, 480))
+CAPTURE_FORMATS = ("MJPG", "YUYV")
+# Negotiated modes per camera, so later starts skip the probe
+DEFAULT_MODE_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "focus-monitor", "camera_modes.json")
+
+
+def platform_backends():
+    # Native backends first, CAP_ANY lets OpenCV pick if none of them opens
+    if sys.platform.startswith("linux"):
+        return [cv2.CAP_V4L2, cv2.CAP_ANY]
+    if sys.platform == "win32":
+        return [cv2.CAP_MSMF, cv2.CAP_DSHOW, cv2.CAP_ANY]
+    if sys.platform == "darwin":
+        return [cv2.CAP_AVFOUNDATION, cv2.CAP_ANY]
+    return [cv2.CAP_ANY]
+
+
+def fourcc_name(code):
+    code = int(code)
+    return "".join(chr((code >> 8 * i) & 0xFF) for i in range(4)) if code > 0 else ""
+
+
+class CaptureDevice:
+    """
+    A camera opened in the fastest mode that still covers min_width x
+    min_height. The candidate modes (FOURCC and size, no larger than
+    max_width x max_height) are probed by timing a few reads: the first one
+    that reaches target_fps wins, otherwise the one with the best measured
+    frame rate. The driver queue is kept at one frame so reads return the
+    newest frame; where the backend ignores CAP_PROP_BUFFERSIZE, frames that
+    were already queued are skipped on read instead.
+
+    With mode_cache (a JSON file path) the negotiated mode is remembered per
+    backend, device and size limits. The next start applies it and only
+    checks that the driver takes it and delivers a frame; the full probe
+    runs again if not.
+
+    Otherwise behaves like cv2.VideoCapture. frame_time is the wall-clock
+    time the last frame was grabbed (before decoding), and mode describes
+    what was negotiated.
+    """
+
+    def __init__(self, index=0, max_width=1920, max_height=1080, min_width=640, min_height=360,
+                 target_fps=30, backends=None, probe_frames=6, max_queued=4, mode_cache=None):
+        self.capture = None
+        self.backend = None
+        for backend in backends or platform_backends():
+            capture = cv2.VideoCapture(index, backend)
+            if capture.isOpened():
+                self.capture, self.backend = capture, backend
+                break
+            capture.release()
+        if self.capture is None:
+            # Nothing opened; isOpened() reports it like a plain VideoCapture
+            self.capture = cv2.VideoCapture()
+        self.target_fps = target_fps
+        self.max_queued = max_queued
+        self.frame_time = None
+        self.stale_dropped = 0
+        self.buffer_limited = False
+        self.mode = None
+        if self.capture.isOpened():
+            self.buffer_limited = (self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                                   and self.capture.get(cv2.CAP_PROP_BUFFERSIZE) == 1)
+            started = time.perf_counter()
+            cache_key = (f"{self.capture.getBackendName()}:{index}:{max_width}x{max_height}:"
+                         f"{min_width}x{min_height}@{target_fps}")
+            negotiated = self.cached_mode(mode_cache, cache_key)
+            cached = negotiated is not None
+            if not cached:
+                negotiated = self.negotiate(max_width, max_height, min_width, min_height, probe_frames)
+                if mode_cache:
+                    save_mode(mode_cache, cache_key, negotiated)
+            _, (fourcc, width, height), fps = negotiated
+            self.mode = {
+                "backend": self.capture.getBackendName(),
+                "fourcc": fourcc,
+                "width": width,
+                "height": height,
+                "fps": round(fps, 1),
+                "buffer_size_1": bool(self.buffer_limited),
+                "probe_seconds": round(time.perf_counter() - started, 2),
+                "cached": cached,
+            }
+        # Reads faster than this came out of the driver queue
+        self.stale_threshold = 0.5 / self.mode["fps"] if self.mode and self.mode["fps"] > 0 else 0.0
+
+    def apply(self, fourcc, width, height):
+        # FOURCC before the size: some drivers only list a size under its format
+        self.capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.capture.set(cv2.CAP_PROP_FPS, self.target_fps)
+        return (fourcc_name(self.capture.get(cv2.CAP_PROP_FOURCC)),
+                int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    def measure_fps(self, frames):
+        # The first reads after a mode switch include the stream restart
+        for _ in range(2):
+            if not self.capture.read()[0]:
+                return 0.0
+        started = time.perf_counter()
+        for _ in range(frames):
+            if not self.capture.read()[0]:
+                return 0.0
+        return frames / max(time.perf_counter() - started, 1e-9)
+
+    def cached_mode(self, mode_cache, cache_key):
+        # The cached (requested, actual, fps) if the camera still takes it, else None
+        if not mode_cache:
+            return None
+        try:
+            with open(mode_cache) as file:
+                requested, actual, fps = json.load(file)[cache_key]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        requested, actual = tuple(requested), tuple(actual)
+        if self.apply(*requested) != actual or not self.capture.read()[0]:
+            return None
+        return requested, actual, fps
+
+    def negotiate(self, max_width, max_height, min_width, min_height, probe_frames):
+        # (requested, actual, fps) of the chosen mode; it is left applied
+        measured = {}
+        chosen = None
+        applied = None
+        for width, height in CAPTURE_SIZES:
+            if width > max_width or height > max_height or width < min_width or height < min_height:
+                continue
+            for fourcc in CAPTURE_FORMATS:
+                applied = (fourcc, width, height)
+                actual = self.apply(*applied)
+                if actual in measured:
+                    # The driver snapped to a mode that was already timed
+                    continue
+                fps = measured[actual] = self.measure_fps(probe_frames)
+                if actual[1] < min_width or actual[2] < min_height:
+                    continue
+                if chosen is None or fps > chosen[2]:
+                    chosen = (applied, actual, fps)
+                if fps >= 0.9 * self.target_fps:
+                    break
+            if chosen is not None and chosen[2] >= 0.9 * self.target_fps:
+                break
+        if chosen is None:
+            # No mode covers the minimum; keep whatever the camera gives
+            requested = (CAPTURE_FORMATS[0], max_width, max_height)
+            actual = self.apply(*requested)
+            return requested, actual, measured.get(actual) or self.measure_fps(probe_frames)
+        requested, actual, fps = chosen
+        if requested != applied:
+            # Later probes switched the mode away again
+            actual = self.apply(*requested)
+        return requested, actual, fps
+
+    def read(self):
+        grab_start = time.perf_counter()
+        if not self.capture.grab():
+            return False, None
+        if not self.buffer_limited:
+            # A grab that returns well inside one frame interval was served
+            # from the driver queue; skip ahead until one waits for the camera
+            for _ in range(self.max_queued):
+                if time.perf_counter() - grab_start >= self.stale_threshold:
+                    break
+                grab_start = time.perf_counter()
+                if not self.capture.grab():
+                    return False, None
+                self.stale_dropped += 1
+        self.frame_time = time.time()
+        return self.capture.retrieve()
+
+    def describe(self):
+        if self.mode is None:
+            return "no camera"
+        return (f"{self.mode['fourcc'] or '?'} {self.mode['width']}x{self.mode['height']} @ {self.mode['fps']} fps"
+                f" ({self.mode['backend']}, buffer {'1 frame' if self.mode['buffer_size_1'] else 'driver default'})")
+
+    def __getattr__(self, name):
+        # The rest of the VideoCapture API (get, set, isOpened, release, ...)
+        return getattr(self.capture, name)
+
+
+def save_mode(mode_cache, cache_key, negotiated):
+    # Rewritten through a temporary file, so a crash never leaves half a cache
+    try:
+        with open(mode_cache) as file:
+            modes = json.load(file)
+    except (OSError, ValueError):
+        modes = {}
+    if not isinstance(modes, dict):
+        modes = {}
+    modes[cache_key] = negotiated
+    try:
+        os.makedirs(os.path.dirname(mode_cache), exist_ok=True)
+        with open(mode_cache + ".tmp", "w") as file:
+            json.dump(modes, file)
+        os.replace(mode_cache + ".tmp", mode_cache)
+    except OSError:
+        pass  # no cache this time; the next start probes again
@@ -0,0 +1,170 @@
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+from detections import NO_DETECTIONS
+
+# A trace file is TRACE_MAGIC, a little-endian uint32 header length, a JSON
+# header (class names and frame size) and then fixed-size TRACE_DTYPE rows,
+# one per detection. A frame without detections is written as a single row
+# with cls NO_CLASS so its timestamp is still recorded.
+TRACE_MAGIC = b"PMTRACE1"
+TRACE_DTYPE = np.dtype([
+    ("frame", "<u4"),
+    ("time", "<f8"),
+    ("cls", "<i2"),
+    ("conf", "<f4"),
+    ("box", "<f4", (4,)),
+])
+NO_CLASS = -1
+
+
+def read_header(file):
+    if file.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+        raise ValueError(f"{file.name} is not a detection trace")
+    (length,) = struct.unpack("<I", file.read(4))
+    header = json.loads(file.read(length))
+    header["names"] = {int(cls): name for cls, name in header["names"].items()}
+    return header, len(TRACE_MAGIC) + 4 + length
+
+
+class TraceWriter:
+    """
+    Appends every frame's detections to a trace file. Rows are only ever
+    appended, so a crash costs at most the row being written; an existing
+    trace is extended rather than overwritten.
+    """
+
+    def __init__(self, path, names, width, height):
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, "rb") as file:
+                read_header(file)
+        self.file = open(path, "ab")
+        if not exists:
+            header = json.dumps({"names": names, "width": width, "height": height}).encode()
+            self.file.write(TRACE_MAGIC + struct.pack("<I", len(header)) + header)
+
+    def write(self, frame_index, timestamp, detections):
+        rows = np.zeros(max(len(detections), 1), dtype=TRACE_DTYPE)
+        rows["frame"] = frame_index
+        rows["time"] = timestamp
+        if len(detections):
+            rows["box"] = detections[:, :4]
+            rows["conf"] = detections[:, 4]
+            rows["cls"] = detections[:, 5]
+        else:
+            rows["cls"] = NO_CLASS
+        self.file.write(rows.tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+class TraceRecorder:
+    """
+    Stands in for the pipeline's results queue and writes every result to
+    the trace as the inference side puts it, so results the render loop
+    never gets to (a newer one replaced them first) are recorded too.
+    Results that arrive before open() are held back and written then: the
+    class names for the header are only known once the model has loaded.
+    """
+
+    def __init__(self, results):
+        self.results = results
+        self.lock = threading.Lock()
+        self.writer = None
+        self.pending = []
+        self.closed = False
+
+    def put(self, item):
+        with self.lock:
+            if self.writer is not None:
+                self.writer.write(*item)
+            elif not self.closed:
+                self.pending.append(item)
+        self.results.put(item)
+
+    def get(self, timeout=None):
+        return self.results.get(timeout)
+
+    def get_nowait(self):
+        return self.results.get_nowait()
+
+    def open(self, writer):
+        with self.lock:
+            for item in self.pending:
+                writer.write(*item)
+            self.pending = []
+            self.writer = writer
+
+    def close(self):
+        with self.lock:
+            if self.writer is not None:
+                self.writer.close()
+            self.writer = None
+            self.pending = []
+            self.closed = True
+
+
+class DetectionTrace:
+    """
+    Read-only view of a trace file. Rows are memory-mapped, so opening a
+    day-long trace is instant and replay only touches the pages it reads.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            header, offset = read_header(file)
+        self.names = header["names"]
+        self.width = header["width"]
+        self.height = header["height"]
+        # Ignore a partial last row left by a crash mid-write
+        count = (os.path.getsize(path) - offset) // TRACE_DTYPE.itemsize
+        if count:
+            self.records = np.memmap(path, dtype=TRACE_DTYPE, mode="r", offset=offset, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=TRACE_DTYPE)
+        # Frame boundaries; the time is compared too because frame indexes
+        # restart when a later run appends to the same file
+        frame = self.records["frame"]
+        times = self.records["time"]
+        changed = (frame[1:] != frame[:-1]) | (times[1:] != times[:-1])
+        self.starts = np.concatenate(([0], np.flatnonzero(changed) + 1)) if count else np.zeros(0, dtype=np.int64)
+        self.ends = np.append(self.starts[1:], count)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def timestamps(self):
+        return np.asarray(self.records["time"][self.starts])
+
+    def frames(self):
+        # Yields (frame_index, timestamp, detections) in recorded order
+        for start, end in zip(self.starts.tolist(), self.ends.tolist()):
+            rows = self.records[start:end]
+            if rows["cls"][0] == NO_CLASS:
+                detections = NO_DETECTIONS
+            else:
+                detections = np.empty((end - start, 6), dtype=np.float32)
+                detections[:, :4] = rows["box"]
+                detections[:, 4] = rows["conf"]
+                detections[:, 5] = rows["cls"]
+            yield int(rows["frame"][0]), float(rows["time"][0]), detections
+
+    def presence(self, *class_ids):
+        """
+        Per-frame presence flags for each class id, ready for
+        DistractionEngine.replay(): returns (timestamps, flags, flags...).
+        """
+        frame_of_row = np.repeat(np.arange(len(self.starts)), self.ends - self.starts)
+        classes = np.asarray(self.records["cls"])
+        flags = []
+        for cls in class_ids:
+            present = np.zeros(len(self.starts), dtype=bool)
+            present[frame_of_row[classes == cls]] = True
+            flags.append(present)
+        return (self.timestamps(), *flags)
@@ -0,0 +1,48 @@
+import numpy as np
+
+# Detections travel through the app as one (N, 6) float32 array per frame with
+# columns x1, y1, x2, y2, conf, cls in frame coordinates.
+NO_DETECTIONS = np.zeros((0, 6), dtype=np.float32)
+
+
+def detections_from_results(results, conf_threshold=0.5):
+    """
+    Convert ultralytics results into a detections array in one bulk copy per
+    result, keeping only boxes at or above conf_threshold.
+    """
+    arrays = []
+    for result in results:
+        data = result.boxes.data
+        if len(data) == 0:
+            continue
+        data = data.cpu().numpy()
+        # boxes.data is (x1, y1, x2, y2, [track id,] conf, cls)
+        arrays.append(np.concatenate([data[:, :4], data[:, -2:]], axis=1))
+    if not arrays:
+        return NO_DETECTIONS
+    detections = np.concatenate(arrays).astype(np.float32, copy=False)
+    return detections[detections[:, 4] >= conf_threshold]
+
+
+def class_id(names, label):
+    # Look up the model class id for a label such as "cell phone"
+    for cls, name in names.items():
+        if name.lower() == label:
+            return cls
+    return None
+
+
+def class_mask(detections, cls):
+    return detections[:, 5] == cls
+
+
+def offset_detections(detections, dx, dy):
+    shifted = detections.copy()
+    shifted[:, [0, 2]] += dx
+    shifted[:, [1, 3]] += dy
+    return shifted
+
+
+def scale_boxes(detections, scale_x, scale_y):
+    # Map frame-space boxes to integer display-space corners
+    return (detections[:, :4] * np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)).astype(np.int32)
@@ -0,0 +1,296 @@
+from datetime import datetime
+
+import numpy as np
+
+from session_stats import SessionStats
+
+
+def clock_time(timestamp):
+    # "09:41 AM" style label used in the distraction log
+    return datetime.fromtimestamp(timestamp).strftime("%I:%M %p")
+
+
+# Distraction type codes in DistractionLog.kind
+DISTRACTION_TYPES = ("Cell Phone", "Left Desk")
+PHONE, LEFT_DESK = range(len(DISTRACTION_TYPES))
+
+
+class DistractionLog:
+    """
+    Finished distractions as columns: type code (an index into
+    DISTRACTION_TYPES), start and end timestamps and whole-second duration.
+    Rows go into numpy arrays that double in size when full, so a row costs
+    21 bytes and no objects of its own. Clock labels are only made by
+    entry(), for the rows that are shown or exported.
+    """
+
+    def __init__(self, capacity=64):
+        self.size = 0
+        self.kinds = np.empty(capacity, np.uint8)
+        self.start_times = np.empty(capacity, np.float64)
+        self.end_times = np.empty(capacity, np.float64)
+        self.durations = np.empty(capacity, np.int32)
+
+    def __len__(self):
+        return self.size
+
+    def append(self, kind, start_time, end_time, duration):
+        if self.size == len(self.kinds):
+            capacity = 2 * self.size
+            for name in ("kinds", "start_times", "end_times", "durations"):
+                column = getattr(self, name)
+                grown = np.empty(capacity, column.dtype)
+                grown[:self.size] = column
+                setattr(self, name, grown)
+        i = self.size
+        self.kinds[i] = kind
+        self.start_times[i] = start_time
+        self.end_times[i] = end_time
+        self.durations[i] = duration
+        self.size += 1
+
+    def clear(self):
+        self.size = 0
+
+    # Column views over the filled rows
+    @property
+    def kind(self):
+        return self.kinds[:self.size]
+
+    @property
+    def start_time(self):
+        return self.start_times[:self.size]
+
+    @property
+    def end_time(self):
+        return self.end_times[:self.size]
+
+    @property
+    def duration(self):
+        return self.durations[:self.size]
+
+    def entry(self, index):
+        # One row as a dict with its clock labels; negative indexes count from the end
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("distraction log index out of range")
+        start_time, end_time = float(self.start_times[index]), float(self.end_times[index])
+        return {
+            "type": DISTRACTION_TYPES[self.kinds[index]],
+            "start_time_12h": clock_time(start_time),
+            "end_time_12h": clock_time(end_time),
+            "duration": int(self.durations[index]),
+            "start_time": start_time,
+            "end_time": end_time
+        }
+
+    def entries(self):
+        return [self.entry(i) for i in range(self.size)]
+
+
+class DistractionEngine:
+    """
+    Phone / left-desk state machine. Every call is told what time it is, so
+    the same logic runs on the live camera (time.time()), on recorded video
+    (frame timestamps) or on a saved trace. A phone in view for
+    phone_detect_threshold seconds, or nobody at the desk for
+    person_absent_threshold seconds, is a distraction; detector dropouts
+    shorter than flicker_tolerance are ignored. Finished distractions are
+    appended to logs, a DistractionLog, and counted in stats, a
+    SessionStats.
+    """
+
+    def __init__(self, phone_detect_threshold=3, person_absent_threshold=5,
+                 flicker_tolerance=2.0, start_time=0.0):
+        self.phone_detect_threshold = phone_detect_threshold
+        self.person_absent_threshold = person_absent_threshold
+        self.flicker_tolerance = flicker_tolerance
+        self.logs = DistractionLog()
+        self.stats = SessionStats(len(DISTRACTION_TYPES))
+        self.person_absent_start_time = None
+        self.last_phone_detection_time = None
+        self.last_person_detection_time = None
+        self.reset(start_time)
+
+    def reset(self, start_time):
+        # New study session; the detection history carries over
+        self.focus_start_time = start_time
+        self.total_distraction_time = 0
+        self.distraction_start_time = None
+        self.phone_detected_start_time = None
+        self.current_distraction_type = None
+        self.distraction_announced = False
+        self.logs.clear()
+        self.stats.reset(start_time)
+
+    def update(self, current_time, phone_detected, person_detected, detection_time=None):
+        """
+        Advance the state to current_time. detection_time is when the
+        detections were captured, or None when they are the same ones as on
+        the previous call. Returns the warning to show ("phone", "absent" or
+        None) and the distraction_start / distraction_end events for this call.
+        """
+        if detection_time is not None:
+            if phone_detected:
+                self.last_phone_detection_time = detection_time
+            if person_detected:
+                self.last_person_detection_time = detection_time
+
+        # Flicker tolerance for phone
+        if not phone_detected and self.last_phone_detection_time is not None:
+            if current_time - self.last_phone_detection_time < self.flicker_tolerance:
+                phone_detected = True
+            else:
+                self.last_phone_detection_time = None
+
+        # Person absent detection
+        person_absent = not person_detected and (
+            self.last_person_detection_time is None or
+            current_time - self.last_person_detection_time >= self.flicker_tolerance
+        )
+        return self.step(current_time, phone_detected, person_absent)
+
+    def step(self, current_time, phone_detected, person_absent):
+        # The state machine proper, on flicker-filtered inputs
+        warning = None
+        events = []
+
+        # --------------------------- PHONE DETECTION LOGIC ---------------------------
+        if not person_absent and phone_detected:
+            if self.phone_detected_start_time is None:
+                self.phone_detected_start_time = current_time
+                self.distraction_start_time = current_time
+                self.current_distraction_type = PHONE
+                self.distraction_announced = False
+            elapsed_time = current_time - self.phone_detected_start_time
+            if elapsed_time >= self.phone_detect_threshold:
+                warning = "phone"
+                if self.current_distraction_type is not None and not self.distraction_announced:
+                    self.distraction_announced = True
+                    events.append(self._start_event())
+        elif not phone_detected:
+            self.phone_detected_start_time = None
+
+        # --------------------------- PERSON ABSENT LOGIC ---------------------------
+        if person_absent:
+            if self.person_absent_start_time is None:
+                self.person_absent_start_time = current_time
+            elapsed_absence_time = current_time - self.person_absent_start_time
+            if elapsed_absence_time >= self.person_absent_threshold:
+                if self.distraction_start_time is None:
+                    self.distraction_start_time = self.person_absent_start_time
+                    self.current_distraction_type = LEFT_DESK
+                    self.distraction_announced = True
+                    events.append(self._start_event())
+                warning = "absent"
+        else:
+            if self.person_absent_start_time is not None:
+                absence_duration = current_time - self.person_absent_start_time
+                if absence_duration >= self.person_absent_threshold and self.distraction_start_time is not None:
+                    distraction_duration = current_time - self.distraction_start_time
+                    self.total_distraction_time += distraction_duration
+                    if self.current_distraction_type == LEFT_DESK:
+                        events.append(self._close(current_time, distraction_duration))
+                    self.distraction_start_time = None
+                    self.current_distraction_type = None
+                self.person_absent_start_time = None
+
+        # Ending phone distraction
+        if (not phone_detected and not person_absent and
+            self.distraction_start_time is not None and
+            self.current_distraction_type == PHONE):
+            distraction_duration = current_time - self.distraction_start_time
+            if distraction_duration >= self.phone_detect_threshold:
+                self.total_distraction_time += distraction_duration
+                events.append(self._close(current_time, distraction_duration))
+                self.distraction_start_time = None
+                self.current_distraction_type = None
+
+        return warning, events
+
+    def replay(self, timestamps, phone_detected, person_detected):
+        """
+        Feed a trace of per-frame detections (sorted timestamps plus phone and
+        person presence flags, each frame a fresh detection) through the
+        engine and return the events. Same result as calling update() on
+        every frame, but the flicker filter is vectorized and step() only runs
+        where its inputs change or a timer can fire, so long traces replay
+        at millions of frames per second.
+        """
+        t = np.asarray(timestamps, dtype=np.float64)
+        if len(t) == 0:
+            return []
+        phone = np.asarray(phone_detected, dtype=bool)
+        person = np.asarray(person_detected, dtype=bool)
+
+        # Time of the latest detection at or before each frame (-inf if none)
+        last_phone = np.maximum.accumulate(np.where(phone, t, -np.inf))
+        last_person = np.maximum.accumulate(np.where(person, t, -np.inf))
+        if self.last_phone_detection_time is not None:
+            last_phone = np.maximum(last_phone, self.last_phone_detection_time)
+        if self.last_person_detection_time is not None:
+            last_person = np.maximum(last_person, self.last_person_detection_time)
+        phone_active = phone | (t - last_phone < self.flicker_tolerance)
+        person_absent = ~person & (t - last_person >= self.flicker_tolerance)
+        self.last_phone_detection_time = float(last_phone[-1]) if np.isfinite(last_phone[-1]) else None
+        self.last_person_detection_time = float(last_person[-1]) if np.isfinite(last_person[-1]) else None
+
+        # Runs of frames with the same (phone, absent) inputs
+        inputs = phone_active.astype(np.int8) * 2 + person_absent
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(inputs)) + 1)).tolist()
+        ends = starts[1:] + [len(t)]
+
+        events = []
+        for start, end in zip(starts, ends):
+            active, absent = bool(phone_active[start]), bool(person_absent[start])
+            i = start
+            while i < end:
+                events += self.step(float(t[i]), active, absent)[1]
+                i = self._next_deadline(t, i, end)
+        return events
+
+    def _next_deadline(self, t, i, end):
+        # With unchanged inputs a frame can only change the state once one of
+        # the running timers reaches its threshold, so every frame before the
+        # first such crossing (or the end of the run) is skipped
+        now = t[i]
+        deadline = end
+        for origin, threshold in ((self.phone_detected_start_time, self.phone_detect_threshold),
+                                  (self.person_absent_start_time, self.person_absent_threshold),
+                                  (self.distraction_start_time, self.phone_detect_threshold)):
+            if origin is None or now - origin >= threshold:
+                continue
+            # Search slightly early and step forward with the exact comparison
+            # step() uses, so float rounding can never skip the crossing frame
+            j = max(int(np.searchsorted(t, origin + threshold - 1e-6)), i + 1)
+            while j < deadline and t[j] - origin < threshold:
+                j += 1
+            deadline = min(deadline, j)
+        return deadline
+
+    def _start_event(self):
+        return {"event": "distraction_start", "time": self.distraction_start_time,
+                "type": DISTRACTION_TYPES[self.current_distraction_type],
+                "start_time_12h": clock_time(self.distraction_start_time)}
+
+    def _close(self, current_time, distraction_duration):
+        self.logs.append(self.current_distraction_type, self.distraction_start_time, current_time,
+                         int(distraction_duration))
+        self.stats.add(self.current_distraction_type, self.distraction_start_time, current_time,
+                       int(distraction_duration))
+        return {"event": "distraction_end", "time": current_time, **self.logs.entry(-1)}
+
+    def focus_stats(self, current_time):
+        # (total study time, focus time, focus percentage) as of current_time
+        total_study_time = current_time - self.focus_start_time
+        current_distraction_time = self.total_distraction_time
+        if self.distraction_start_time is not None:
+            current_distraction_time += (current_time - self.distraction_start_time)
+        focus_time = total_study_time - current_distraction_time
+
+        if total_study_time > 0:
+            focus_percentage = (focus_time / total_study_time) * 100
+        else:
+            focus_percentage = 100
+        return total_study_time, focus_time, focus_percentage
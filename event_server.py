@@ -0,0 +1,273 @@
+import asyncio
+import base64
+import collections
+import hashlib
+import json
+import struct
+import threading
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+# Events that only matter as the latest value; newer ones replace older ones
+# that have not been sent yet
+COALESCED_EVENTS = ("stats", "batching")
+MAX_CLIENT_FRAME = 1 << 16
+
+
+def coalesce_key(event):
+    if event.get("event") in COALESCED_EVENTS:
+        return event["event"], event.get("stream")
+    return None
+
+
+def websocket_frame(payload, opcode=0x1):
+    # Unmasked server-to-client frame, FIN set
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+class EventServer:
+    """
+    Pushes the monitor's events to dashboard clients over WebSocket
+    (ws://host:port/events) and serves the current state over HTTP (/stats,
+    /events/recent). publish() only appends to a list under a lock, so the
+    frame loop never waits on the network. The server's own thread flushes
+    every flush_interval: stats superseded within the interval are dropped
+    and the rest go out as one JSON array per flush, encoded once for all
+    clients. New clients first get the recent events and the latest stats.
+    A client that falls max_backlog flushes behind is disconnected; it gets
+    the current state again when it reconnects. stop() sends what was
+    published before it and closes the subscribers' connections.
+
+    Browsers let any page open a WebSocket to localhost, so upgrades must
+    carry an Origin header naming the server itself or one of `origins`
+    (e.g. "http://localhost:8081" for a dashboard served elsewhere); HTTP
+    requests from other origins are refused too.
+    """
+
+    def __init__(self, port, host="127.0.0.1", flush_interval=0.1, max_backlog=50, recent=100, origins=()):
+        self.port = port
+        self.host = host
+        self.origins = {origin.lower().rstrip("/") for origin in origins}
+        self.flush_interval = flush_interval
+        self.max_backlog = max_backlog
+        self.lock = threading.Lock()
+        self.pending = []
+        self.pending_latest = {}
+        self.recent = collections.deque(maxlen=recent)
+        self.latest = {}
+        self.clients = {}
+        self.connections = set()
+        self.handlers = set()
+        self.subscribers = set()
+        self.started = threading.Event()
+        self.error = None
+        self.loop = None
+        self.stopping = None
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=asyncio.run, args=(self.serve(),), name="event-server", daemon=True)
+        self.thread.start()
+        self.started.wait()
+        if self.error is not None:
+            raise self.error
+        return self
+
+    def stop(self):
+        if self.loop is not None and self.stopping is not None:
+            self.loop.call_soon_threadsafe(self.stopping.set)
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+
+    def publish(self, event):
+        # Safe from any thread
+        key = coalesce_key(event)
+        with self.lock:
+            if key is None:
+                self.pending.append(event)
+            else:
+                self.pending_latest[key] = event
+
+    def allowed_origin(self, origin):
+        if origin is None:
+            return False
+        origin = origin.lower()
+        return origin in self.origins or origin in (
+            f"http://{host}:{self.port}" for host in ("127.0.0.1", "localhost", self.host))
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        try:
+            server = await asyncio.start_server(self.handle, self.host, self.port)
+        except OSError as e:
+            self.error = e
+            self.started.set()
+            return
+        # With port 0 the system picks one
+        self.port = server.sockets[0].getsockname()[1]
+        self.started.set()
+        flusher = asyncio.create_task(self.flush_loop())
+        await self.stopping.wait()
+        flusher.cancel()
+        # Send what was published before stop() and give the subscribers a
+        # moment to take it, then drop every connection still open. All of
+        # that comes before closing the server: from Python 3.12.1
+        # wait_closed() waits for the connections.
+        self.flush()
+        for queue in list(self.clients):
+            queue.put_nowait(None)
+        subscribers = set(self.subscribers)
+        if subscribers:
+            await asyncio.wait(subscribers, timeout=1.0)
+        handlers = set(self.handlers)
+        for writer in list(self.connections):
+            writer.transport.abort()
+        if handlers:
+            await asyncio.wait(handlers, timeout=1.0)
+        server.close()
+        await server.wait_closed()
+
+    async def flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            events = self.pending + list(self.pending_latest.values())
+            self.pending = []
+            self.pending_latest = {}
+        if not events:
+            return
+        for event in events:
+            key = coalesce_key(event)
+            if key is None:
+                self.recent.append(event)
+            else:
+                self.latest[key] = event
+        if not self.clients:
+            return
+        frame = websocket_frame(json.dumps(events).encode())
+        for queue, writer in list(self.clients.items()):
+            if queue.qsize() >= self.max_backlog:
+                # Too slow to keep up: drop the connection and let it reconnect
+                del self.clients[queue]
+                writer.transport.abort()
+                queue.put_nowait(None)
+            else:
+                queue.put_nowait(frame)
+
+    async def handle(self, reader, writer):
+        if self.stopping.is_set():
+            writer.transport.abort()
+            return
+        self.connections.add(writer)
+        self.handlers.add(asyncio.current_task())
+        try:
+            await self.route(reader, writer)
+        finally:
+            self.connections.discard(writer)
+            self.handlers.discard(asyncio.current_task())
+
+    async def route(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5.0)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        lines = request.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ")
+        path = parts[1].split("?")[0] if len(parts) > 1 else ""
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        # Plain HTTP clients (curl, scripts) send no Origin; browsers always
+        # do on upgrades and cross-origin requests
+        origin = headers.get("origin")
+        upgrade = headers.get("upgrade", "").lower() == "websocket"
+        if (upgrade or origin is not None) and not self.allowed_origin(origin):
+            await self.respond(writer, "403 Forbidden", {"error": "origin not allowed"})
+        elif path == "/events" and upgrade:
+            await self.websocket(reader, writer, headers)
+        elif path == "/stats":
+            await self.respond(writer, "200 OK", list(self.latest.values()), origin)
+        elif path == "/events/recent":
+            await self.respond(writer, "200 OK", list(self.recent), origin)
+        else:
+            await self.respond(writer, "404 Not Found", {"error": "not found"})
+
+    async def respond(self, writer, status, body, origin=None):
+        data = json.dumps(body).encode()
+        cors = f"Access-Control-Allow-Origin: {origin}\r\nVary: Origin\r\n" if origin is not None else ""
+        writer.write((f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                      f"Content-Length: {len(data)}\r\n{cors}"
+                      "Connection: close\r\n\r\n").encode() + data)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def websocket(self, reader, writer, headers):
+        accept = base64.b64encode(hashlib.sha1((headers.get("sec-websocket-key", "") + WEBSOCKET_GUID)
+                                               .encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        queue = asyncio.Queue()
+        # Snapshot and subscription happen without an await in between, so
+        # the client neither misses nor repeats a flush
+        snapshot = list(self.recent) + list(self.latest.values())
+        if snapshot:
+            queue.put_nowait(websocket_frame(json.dumps(snapshot).encode()))
+        self.clients[queue] = writer
+        self.subscribers.add(asyncio.current_task())
+        control = asyncio.create_task(self.read_client(reader, queue))
+        try:
+            while True:
+                frame = await queue.get()
+                if frame is None:
+                    break
+                writer.write(frame)
+                await writer.drain()
+            writer.write(websocket_frame(b"", 0x8))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.pop(queue, None)
+            self.subscribers.discard(asyncio.current_task())
+            control.cancel()
+            writer.close()
+
+    async def read_client(self, reader, queue):
+        # Dashboards only listen; answer pings and stop on close
+        try:
+            while True:
+                first, second = await reader.readexactly(2)
+                opcode, length = first & 0x0F, second & 0x7F
+                if length == 126:
+                    length = struct.unpack("!H", await reader.readexactly(2))[0]
+                elif length == 127:
+                    length = struct.unpack("!Q", await reader.readexactly(8))[0]
+                if length > MAX_CLIENT_FRAME:
+                    break
+                mask = await reader.readexactly(4) if second & 0x80 else None
+                payload = await reader.readexactly(length)
+                if mask:
+                    payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+                if opcode == 0x8:
+                    break
+                if opcode == 0x9:
+                    queue.put_nowait(websocket_frame(payload, 0xA))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        queue.put_nowait(None)
@@ -0,0 +1,162 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    stream TEXT NOT NULL DEFAULT '',
+    event TEXT NOT NULL,
+    type TEXT,
+    duration REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_time ON events (time);
+CREATE INDEX IF NOT EXISTS events_event_time ON events (event, time);
+CREATE INDEX IF NOT EXISTS events_type_time ON events (type, time);
+CREATE TABLE IF NOT EXISTS focus_samples (
+    time REAL NOT NULL,
+    stream TEXT NOT NULL DEFAULT '',
+    total_study_time REAL NOT NULL,
+    focus_time REAL NOT NULL,
+    focus_percentage REAL NOT NULL,
+    distractions INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS focus_samples_stream_time ON focus_samples (stream, time);
+"""
+
+SAMPLE_FIELDS = ("total_study_time", "focus_time", "focus_percentage", "distractions")
+
+
+class EventStore:
+    """
+    Append-only history of distraction events and focus samples in an SQLite
+    database (WAL mode, so queries never wait for the writer). The record_*
+    calls only append to a list under a lock; a background thread writes
+    everything recorded in the last flush_interval in one transaction.
+    Focus stats are kept at most once per sample_interval per stream, so
+    callers can pass them as often as they like. Queries see what has been
+    flushed.
+    """
+
+    def __init__(self, path, flush_interval=1.0, sample_interval=60.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.sample_interval = sample_interval
+        self.lock = threading.Lock()
+        self.pending_events = []
+        self.pending_samples = []
+        self.last_sample_time = {}
+        self.closing = threading.Event()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        connection = self.connect()
+        connection.executescript(SCHEMA)
+        connection.close()
+        self.thread = threading.Thread(target=self.write_loop, name="event-store", daemon=True)
+        self.thread.start()
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=10.0)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # WAL with NORMAL only fsyncs at checkpoints; a power cut can lose the
+        # last flush but never corrupts the database
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def record_event(self, event):
+        with self.lock:
+            self.pending_events.append(event)
+
+    def record_stats(self, stats, force=False):
+        # Returns whether the sample was kept; force keeps it regardless of
+        # the interval (a session's last stats)
+        stream = stats.get("stream", "")
+        last = self.last_sample_time.get(stream)
+        if not force and last is not None and stats["time"] - last < self.sample_interval:
+            return False
+        self.last_sample_time[stream] = stats["time"]
+        with self.lock:
+            self.pending_samples.append(stats)
+        return True
+
+    def write_loop(self):
+        connection = self.connect()
+        while True:
+            closing = self.closing.wait(self.flush_interval)
+            with self.lock:
+                events, self.pending_events = self.pending_events, []
+                samples, self.pending_samples = self.pending_samples, []
+            if events or samples:
+                with connection:
+                    connection.executemany(
+                        "INSERT INTO events (time, stream, event, type, duration, data) VALUES (?, ?, ?, ?, ?, ?)",
+                        [(event.get("time", time.time()), event.get("stream", ""), event["event"], event.get("type"),
+                          event.get("duration"), json.dumps(event)) for event in events])
+                    connection.executemany(
+                        "INSERT INTO focus_samples VALUES (?, ?, ?, ?, ?, ?)",
+                        [(sample["time"], sample.get("stream", ""), *(sample[field] for field in SAMPLE_FIELDS))
+                         for sample in samples])
+            if closing:
+                break
+        connection.close()
+
+    def close(self):
+        # Writes whatever is still pending, then stops the writer
+        self.closing.set()
+        self.thread.join(timeout=10.0)
+
+    def query(self, sql, params):
+        connection = self.connect()
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def events(self, start=None, end=None, event=None, type=None, stream=None, limit=None):
+        """
+        Recorded events with start <= time < end, oldest first, optionally
+        only one event name ("distraction_end"), distraction type ("Cell
+        Phone") or stream.
+        """
+        conditions, params = time_range(start, end)
+        for column, value in (("event", event), ("type", type), ("stream", stream)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT data FROM events" + where(conditions) + " ORDER BY time"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [json.loads(data) for data, in self.query(sql, params)]
+
+    def distraction_logs(self, start=None, end=None, stream=None):
+        # Finished distractions, with the same fields as DistractionLog.entry()
+        return self.events(start, end, event="distraction_end", stream=stream)
+
+    def samples(self, start=None, end=None, stream=None):
+        conditions, params = time_range(start, end)
+        if stream is not None:
+            conditions.append("stream = ?")
+            params.append(stream)
+        rows = self.query("SELECT time, stream, " + ", ".join(SAMPLE_FIELDS) + " FROM focus_samples" +
+                          where(conditions) + " ORDER BY time", params)
+        return [dict(zip(("time", "stream") + SAMPLE_FIELDS, row)) for row in rows]
+
+
+def time_range(start, end):
+    conditions, params = [], []
+    if start is not None:
+        conditions.append("time >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("time < ?")
+        params.append(end)
+    return conditions, params
+
+
+def where(conditions):
+    return " WHERE " + " AND ".join(conditions) if conditions else ""
@@ -0,0 +1,126 @@
+import queue
+import threading
+import time
+
+
+class LatestQueue:
+    """
+    Bounded queue that never blocks the producer: when it is full the
+    oldest item is dropped so consumers always see the newest one.
+    """
+
+    def __init__(self, maxsize=1):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, item):
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_nowait(self):
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+
+def capture_loop(video_capture, outputs, stop_event, metrics=None):
+    # Reads frames as fast as the camera delivers them and fans each one out
+    # as (frame_index, capture_time, frame) to every output queue. Devices
+    # that stamp their frames (CaptureDevice.frame_time) give the grab time,
+    # before decoding.
+    timestamped = hasattr(video_capture, "frame_time")
+    frame_index = 0
+    while not stop_event.is_set() and video_capture.isOpened():
+        read_start = time.perf_counter()
+        ret, frame = video_capture.read()
+        if not ret:
+            break
+        if metrics is not None:
+            metrics.record("capture", time.perf_counter() - read_start)
+        capture_time = video_capture.frame_time if timestamped else time.time()
+        for output in outputs:
+            output.put((frame_index, capture_time, frame))
+        frame_index += 1
+    stop_event.set()
+
+
+def inference_loop(detect, inputs, output, stop_event, gate=None, tracker=None, metrics=None, ready=None):
+    # Runs the model on the newest frame only; anything that arrived while the
+    # previous inference was running has already been dropped by the queue.
+    # With a motion gate, unchanged frames re-publish the previous detections
+    # under the new timestamp so the detection timers keep advancing. With a
+    # tracker, the model only runs on keyframes and boxes are propagated in
+    # between. With a ready event, nothing is detected until it is set; the
+    # input queue keeps dropping frames meanwhile.
+    if ready is not None:
+        while not ready.wait(0.1):
+            if stop_event.is_set():
+                return
+    detections = None
+    while not stop_event.is_set():
+        packet = inputs.get(timeout=0.1)
+        if packet is None:
+            continue
+        frame_index, capture_time, frame = packet
+        if tracker is not None and detections is not None and not tracker.needs_detection():
+            detections = tracker.predict()
+        elif gate is None or gate.should_infer(frame, capture_time) or detections is None:
+            detect_start = time.perf_counter()
+            detections = detect(frame)
+            if metrics is not None:
+                metrics.record("inference", time.perf_counter() - detect_start)
+            if tracker is not None:
+                detections = tracker.update(detections)
+        output.put((frame_index, capture_time, detections))
+
+
+def start_pipeline(video_capture, detect, gate=None, tracker=None, display=True, metrics=None, ready=None,
+                   results=None):
+    """
+    Start the capture and inference threads. detect(frame) must return a list
+    of (x1, y1, x2, y2, conf, cls) rows in frame coordinates. Returns the queue the render loop
+    reads frames from, the queue it reads detections from, the shared stop
+    event and the worker threads. With display=False frames only go to
+    inference and the frame queue is None. metrics, a StageMetrics, gets the
+    "capture" and "inference" stage timings. ready, an Event, holds off
+    detection (e.g. while the model loads) without holding up the frames.
+    results replaces the results queue (e.g. a TraceRecorder around one).
+    """
+    stop_event = threading.Event()
+    frame_queue = LatestQueue() if display else None
+    inference_queue = LatestQueue()
+    results_queue = results if results is not None else LatestQueue()
+    outputs = [frame_queue, inference_queue] if display else [inference_queue]
+
+    capture_thread = threading.Thread(
+        target=capture_loop,
+        args=(video_capture, outputs, stop_event, metrics),
+        name="capture", daemon=True)
+    inference_thread = threading.Thread(
+        target=inference_loop,
+        args=(detect, inference_queue, results_queue, stop_event, gate, tracker, metrics, ready),
+        name="inference", daemon=True)
+    capture_thread.start()
+    inference_thread.start()
+    return frame_queue, results_queue, stop_event, [capture_thread, inference_thread]
+
+
+def stop_pipeline(stop_event, threads, timeout=2.0):
+    stop_event.set()
+    for thread in threads:
+        thread.join(timeout=timeout)
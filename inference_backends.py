@@ -0,0 +1,135 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+
+from detections import detections_from_results
+from roi_inference import RoiDetector
+
+BACKENDS = ("torch", "onnx", "openvino")
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "focus-monitor", "models")
+
+
+def weights_digest(path):
+    # Short content hash, so replacing the weights invalidates the cached exports
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def artifact_path(weights_path, backend, imgsz, int8, dynamic, cache_dir):
+    stem = os.path.splitext(os.path.basename(weights_path))[0]
+    name = f"{stem}-{weights_digest(weights_path)}-{imgsz}{'-dynamic' if dynamic else ''}{'-int8' if int8 else ''}"
+    if backend == "onnx":
+        return os.path.join(cache_dir, name + ".onnx")
+    # OpenVINO IR is a directory (xml, bin and metadata)
+    return os.path.join(cache_dir, name + "_openvino_model")
+
+
+def export_model(torch_model, backend, artifact, imgsz, int8, dynamic):
+    """
+    Export once and move the result into the cache under its final name.
+    The move happens last, so an interrupted export never leaves a broken
+    artifact behind.
+    """
+    if backend == "openvino":
+        # OpenVINO quantizes during export (NNCF, calibrated on ultralytics' sample data)
+        exported = torch_model.export(format="openvino", imgsz=imgsz, int8=int8, dynamic=dynamic)
+    else:
+        exported = torch_model.export(format="onnx", imgsz=imgsz, dynamic=dynamic, simplify=True)
+        if int8:
+            # ONNX export has no INT8 option; quantize the weights afterwards
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantized = os.path.splitext(exported)[0] + "-int8.onnx"
+            quantize_dynamic(exported, quantized, weight_type=QuantType.QUInt8)
+            os.remove(exported)
+            exported = quantized
+    os.makedirs(os.path.dirname(artifact), exist_ok=True)
+    staging = artifact + ".partial"
+    if os.path.isdir(staging):
+        shutil.rmtree(staging)
+    shutil.move(exported, staging)
+    os.replace(staging, artifact)
+
+
+def load_model(weights="yolov8n.pt", backend="torch", imgsz=640, int8=False, dynamic=False,
+               cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Return an ultralytics YOLO model for the chosen backend. "onnx" and
+    "openvino" export the weights on first use and load the cached artifact
+    afterwards; the returned model is called the same way and yields the
+    same Results objects as the PyTorch one. dynamic exports accept any
+    imgsz and batch size (needed by the ROI mode and batched analysis).
+    """
+    from ultralytics import YOLO
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    if backend == "torch":
+        return YOLO(weights)
+
+    torch_model = None
+    weights_path = weights
+    if not os.path.exists(weights_path):
+        # Not downloaded yet; ultralytics fetches the official weights
+        torch_model = YOLO(weights)
+        weights_path = torch_model.ckpt_path or weights
+    artifact = artifact_path(weights_path, backend, imgsz, int8, dynamic, cache_dir)
+    if not os.path.exists(artifact):
+        if torch_model is None:
+            torch_model = YOLO(weights_path)
+        export_model(torch_model, backend, artifact, imgsz, int8, dynamic)
+    return YOLO(artifact, task="detect")
+
+
+def build_detector(model, mode="full", roi_person_imgsz=320, roi_phone_imgsz=640):
+    # detect(frame) for the inference thread: the whole frame, or the
+    # two-stage person-then-phone search
+    if mode == "roi":
+        return RoiDetector(model, roi_person_imgsz, roi_phone_imgsz)
+    return lambda frame: detections_from_results(model(frame))
+
+
+class ModelLoader:
+    """
+    Loads the model on a background thread so the window and the camera come
+    up straight away. load() returns the model and build(model) the detect
+    function the pipeline calls; one detection on warmup_frame pays the
+    first-call cost (lazy initialization, kernel selection, allocations)
+    before real frames arrive. ready is set once the loader can be called
+    like the detect function. If loading fails, error holds the exception
+    and ready is never set.
+    """
+
+    def __init__(self, load, build, warmup_frame=None):
+        self.model = None
+        self.detect = None
+        self.error = None
+        self.load_seconds = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(load, build, warmup_frame),
+                                       name="model-load", daemon=True)
+        self.thread.start()
+
+    def _run(self, load, build, warmup_frame):
+        started = time.perf_counter()
+        try:
+            model = load()
+            detect = build(model)
+            if warmup_frame is not None:
+                detect(warmup_frame)
+        except Exception as e:
+            self.error = e
+            return
+        self.model, self.detect = model, detect
+        self.load_seconds = time.perf_counter() - started
+        self.ready.set()
+
+    @property
+    def names(self):
+        return self.model.names
+
+    def __call__(self, frame):
+        return self.detect(frame)
@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap change detector that decides whether a frame is worth sending to the
+    model. Frames are shrunk to a small grayscale thumbnail and compared with
+    the thumbnail of the last frame that was actually inferred; if only a tiny
+    fraction of pixels moved, the previous detections are reused instead.
+
+    sensitivity   - fraction of thumbnail pixels that must change to re-run the model
+    max_staleness - seconds after which the model runs regardless of motion
+    pixel_delta   - per-pixel gray level difference that counts as a change
+    """
+
+    def __init__(self, sensitivity=0.02, max_staleness=1.0, pixel_delta=25, size=(64, 36)):
+        self.sensitivity = sensitivity
+        self.max_staleness = max_staleness
+        self.pixel_delta = pixel_delta
+        self.size = size
+        self.reference = None
+        self.reference_time = None
+        self.inferred = 0
+        self.skipped = 0
+
+    def thumbnail(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def should_infer(self, frame, timestamp):
+        small = self.thumbnail(frame)
+        if (self.reference is None or
+                timestamp - self.reference_time >= self.max_staleness or
+                self.changed_fraction(small) >= self.sensitivity):
+            self.reference = small
+            self.reference_time = timestamp
+            self.inferred += 1
+            return True
+        self.skipped += 1
+        return False
+
+    def changed_fraction(self, small):
+        diff = cv2.absdiff(small, self.reference)
+        return np.count_nonzero(diff > self.pixel_delta) / diff.size
+
+    def reset(self):
+        self.reference = None
+        self.reference_time = None
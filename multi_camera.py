@@ -0,0 +1,338 @@
+"""
+Watch several students from one host. Each camera has its own distraction
+engine, logs and metrics; a pool of inference workers (one per two cores by
+default) serves all cameras, and when the pool cannot keep up every stream's
+detection rate drops evenly instead of one camera starving. Runs headless
+and prints the same JSON lines as YOLOv8App.py --headless, tagged with the
+stream name:
+
+    python multi_camera.py --camera child1=0 --camera child2=1 --camera child3=desk.mp4
+
+A video file plays at its own frame rate, as a camera would deliver it;
+batch_analysis.py is the tool for going through recordings faster.
+
+With --batch the newest frames of all cameras go through one batched model
+call instead of one call per frame, which gets far more frames per core out
+of a CPU.
+"""
+import argparse
+import json
+import os
+import signal
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from capture_device import DEFAULT_MODE_CACHE, CaptureDevice
+from detections import class_id, class_mask
+from event_server import EventServer
+from event_store import EventStore
+from distraction_engine import DistractionEngine
+from batch_scheduler import BatchScheduler, batch_worker, build_batch_detector
+from frame_pipeline import capture_loop
+from inference_backends import BACKENDS, ModelLoader, build_detector, load_model
+from motion_gate import MotionGate
+from stage_metrics import StageMetrics
+
+output_lock = threading.Lock()
+event_server = None
+event_store = None
+
+
+def emit_event(event, final=False):
+    # final: a stream's last stats, which the store keeps whatever its interval
+    with output_lock:
+        print(json.dumps(event), flush=True)
+    if event_server is not None:
+        event_server.publish(event)
+    if event_store is not None:
+        if event["event"] == "stats":
+            event_store.record_stats(event, force=final)
+        elif event["event"] != "batching":
+            event_store.record_event(event)
+
+
+class CameraStream:
+    """
+    One camera and everything that belongs to it. The capture thread leaves
+    only the newest frame in `packet` (older ones count as dropped); at most
+    one worker processes the stream at a time, so its engine sees frames in
+    order.
+    """
+
+    def __init__(self, name, video_capture, scheduler, motion_gate=True):
+        self.name = name
+        self.video_capture = video_capture
+        self.scheduler = scheduler
+        self.gate = MotionGate() if motion_gate else None
+        self.metrics = StageMetrics()
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.engine = None
+        self.detections = None
+        self.packet = None
+        self.packet_time = None
+        self.busy = False
+        self.next_due = 0.0
+        self.dropped = 0
+
+    def put(self, packet):
+        # capture_loop output
+        with self.scheduler.condition:
+            if self.packet is not None:
+                self.dropped += 1
+            self.packet = packet
+            self.packet_time = time.perf_counter()
+            self.scheduler.condition.notify()
+
+    def needs_inference(self, frame, capture_time):
+        # False when the motion gate lets the previous detections stand
+        return self.gate is None or self.detections is None or self.gate.should_infer(frame, capture_time)
+
+    def process(self, detect, frame_index, capture_time, frame, person_class_id, phone_class_id):
+        if self.needs_inference(frame, capture_time):
+            started = time.perf_counter()
+            self.detections = detect(frame)
+            self.metrics.record("inference", time.perf_counter() - started)
+        self.update(capture_time, person_class_id, phone_class_id)
+
+    def update(self, capture_time, person_class_id, phone_class_id):
+        # Run the distraction engine on self.detections
+        with self.lock:
+            if self.engine is None:
+                # The session starts with the stream's first detections
+                self.engine = DistractionEngine(start_time=capture_time)
+            _, events = self.engine.update(
+                time.time(), bool(class_mask(self.detections, phone_class_id).any()),
+                bool(class_mask(self.detections, person_class_id).any()), capture_time)
+        for event in events:
+            emit_event(dict(event, stream=self.name))
+
+    def stats_event(self, current_time):
+        with self.lock:
+            if self.engine is None:
+                total_study_time = focus_time = focus_percentage = 0.0
+                distractions = 0
+            else:
+                total_study_time, focus_time, focus_percentage = self.engine.focus_stats(current_time)
+                distractions = len(self.engine.logs)
+        return {
+            "event": "stats",
+            "stream": self.name,
+            "time": current_time,
+            "total_study_time": round(total_study_time, 1),
+            "focus_time": round(focus_time, 1),
+            "focus_percentage": round(focus_percentage, 1),
+            "distractions": distractions,
+            "capture_fps": round(self.metrics.rate("capture"), 1),
+            "inference_fps": round(self.metrics.rate("inference"), 1),
+            "inference_p95_ms": round(self.metrics.percentile("inference", 95) * 1000, 1),
+            "dropped": self.dropped,
+        }
+
+
+class StreamScheduler:
+    """
+    Hands frames to idle workers. Of the streams with a new frame and no
+    worker on them, the one whose turn is oldest goes first, and no stream
+    is served more than max_rate times a second. Under overload every
+    stream is overdue, so they are served round robin and each gets an
+    even share of the pool.
+    """
+
+    def __init__(self, max_rate=10.0):
+        self.condition = threading.Condition()
+        self.streams = []
+        self.interval = 1.0 / max_rate
+
+    def next(self, stop_event):
+        # (stream, packet) for the next job, or None once stop_event is set
+        with self.condition:
+            while not stop_event.is_set():
+                now = time.perf_counter()
+                waiting = [s for s in self.streams if s.packet is not None and not s.busy]
+                due = [s for s in waiting if s.next_due <= now]
+                if due:
+                    stream = min(due, key=lambda s: s.next_due)
+                    packet, stream.packet = stream.packet, None
+                    stream.busy = True
+                    stream.next_due = now + self.interval
+                    return stream, packet
+                timeout = min((s.next_due for s in waiting), default=now + 0.1) - now
+                self.condition.wait(min(max(timeout, 0.001), 0.1))
+        return None
+
+    def done(self, stream):
+        with self.condition:
+            stream.busy = False
+            self.condition.notify()
+
+
+def inference_worker(loader, scheduler, stop_event):
+    while not loader.ready.wait(0.1):
+        if stop_event.is_set() or loader.error is not None:
+            return
+    person_class_id = class_id(loader.names, "person")
+    phone_class_id = class_id(loader.names, "cell phone")
+    while True:
+        job = scheduler.next(stop_event)
+        if job is None:
+            return
+        stream, (frame_index, capture_time, frame) = job
+        try:
+            stream.process(loader, frame_index, capture_time, frame, person_class_id, phone_class_id)
+        finally:
+            scheduler.done(stream)
+
+
+class PacedFile:
+    """
+    A video file played back at its own frame rate. The engines run on the
+    wall clock, so a file decoded as fast as possible would squeeze minutes
+    of recording into seconds and no threshold would ever be reached.
+    """
+
+    def __init__(self, path):
+        self.capture = cv2.VideoCapture(path)
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        self.interval = 1.0 / fps if fps > 0 else 1.0 / 30
+        self.next_time = None
+        self.frame_time = None
+
+    def read(self):
+        now = time.perf_counter()
+        if self.next_time is None or now - self.next_time > self.interval:
+            # First frame, or decoding fell behind: carry on from now, no catch-up burst
+            self.next_time = now
+        elif self.next_time > now:
+            time.sleep(self.next_time - now)
+        self.next_time += self.interval
+        ret, frame = self.capture.read()
+        self.frame_time = time.time()
+        return ret, frame
+
+    def __getattr__(self, name):
+        return getattr(self.capture, name)
+
+
+def open_source(source):
+    # Camera index -> negotiated CaptureDevice; a URL is a live stream; a file
+    # plays at its frame rate
+    if source.isdigit():
+        return CaptureDevice(int(source), mode_cache=DEFAULT_MODE_CACHE)
+    if "://" in source:
+        return cv2.VideoCapture(source)
+    return PacedFile(source)
+
+
+def main():
+    global event_server, event_store
+    parser = argparse.ArgumentParser(description="Run the focus monitor on several cameras at once")
+    parser.add_argument("--camera", action="append", required=True, metavar="NAME=SOURCE",
+                        help="stream name and camera index, video file (played in real time) or URL; "
+                             "repeat per camera")
+    parser.add_argument("--workers", type=int,
+                        help="inference workers (default: one per two cores, at most one per camera)")
+    parser.add_argument("--max-rate", type=float, default=10.0,
+                        help="most detections per second for any one camera")
+    parser.add_argument("--model", default="yolov8n.pt")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--no-motion-gate", action="store_true", help="run the model on every scheduled frame")
+    parser.add_argument("--batch", action="store_true", help="run the cameras' frames through batched model calls")
+    parser.add_argument("--max-batch", type=int, help="most frames per batched call (default: one per camera)")
+    parser.add_argument("--latency-budget", type=float, default=30.0,
+                        help="milliseconds a frame may wait for the rest of its batch")
+    parser.add_argument("--stats-interval", type=float, default=5.0)
+    parser.add_argument("--events-port", type=int, metavar="PORT",
+                        help="also push the events to dashboards on ws://127.0.0.1:PORT/events")
+    parser.add_argument("--events-origin", action="append", default=[], metavar="ORIGIN",
+                        help="also let the dashboard served from ORIGIN connect; repeatable")
+    parser.add_argument("--store", metavar="PATH",
+                        help="keep every stream's distractions and a focus sample a minute in this SQLite database")
+    args = parser.parse_args()
+
+    if args.batch:
+        scheduler = BatchScheduler(args.max_batch or len(args.camera), args.latency_budget / 1000.0, args.max_rate)
+    else:
+        scheduler = StreamScheduler(args.max_rate)
+    for spec in args.camera:
+        name, _, source = spec.partition("=")
+        if not source:
+            parser.error(f"--camera {spec}: expected NAME=SOURCE")
+        video_capture = open_source(source)
+        if not video_capture.isOpened():
+            parser.error(f"--camera {spec}: cannot open {source}")
+        scheduler.streams.append(CameraStream(name, video_capture, scheduler, not args.no_motion_gate))
+
+    jobs_at_once = -(-len(scheduler.streams) // scheduler.max_batch) if args.batch else len(scheduler.streams)
+    worker_count = args.workers or max(1, min(jobs_at_once, (os.cpu_count() or 1) // 2))
+    if args.events_port:
+        event_server = EventServer(args.events_port, origins=args.events_origin).start()
+    if args.store:
+        event_store = EventStore(args.store)
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+
+    # One model per worker: an ultralytics model must not be called from two
+    # threads at once. Exports come from the shared cache, and the models load
+    # in parallel while the cameras already run.
+    warmup_frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    if args.batch:
+        # Batches need a dynamic batch axis in exported models; warm up at full batch size
+        loaders = [ModelLoader(lambda: load_model(args.model, args.backend, int8=args.int8, dynamic=True),
+                               build_batch_detector, [warmup_frame] * scheduler.max_batch)
+                   for _ in range(worker_count)]
+        worker = batch_worker
+    else:
+        loaders = [ModelLoader(lambda: load_model(args.model, args.backend, int8=args.int8), build_detector,
+                               warmup_frame) for _ in range(worker_count)]
+        worker = inference_worker
+    threads = []
+    for stream in scheduler.streams:
+        threads.append(threading.Thread(
+            target=capture_loop, args=(stream.video_capture, [stream], stream.stop_event, stream.metrics),
+            name=f"capture-{stream.name}", daemon=True))
+    for index, loader in enumerate(loaders):
+        threads.append(threading.Thread(target=worker, args=(loader, scheduler, stop_event),
+                                        name=f"inference-{index}", daemon=True))
+    for thread in threads:
+        thread.start()
+
+    last_stats_time = time.time()
+    while not stop_event.is_set():
+        if any(loader.error is not None for loader in loaders):
+            break
+        if all(stream.stop_event.is_set() for stream in scheduler.streams):
+            break
+        stop_event.wait(0.2)
+        if time.time() - last_stats_time >= args.stats_interval:
+            last_stats_time = time.time()
+            for stream in scheduler.streams:
+                emit_event(stream.stats_event(last_stats_time))
+            if args.batch:
+                emit_event({"event": "batching", "time": last_stats_time, "batches": scheduler.batches,
+                            "mean_batch_size": round(scheduler.mean_batch_size(), 2)})
+
+    stop_event.set()
+    for stream in scheduler.streams:
+        stream.stop_event.set()
+    for thread in threads:
+        thread.join(timeout=2.0)
+    for stream in scheduler.streams:
+        stream.video_capture.release()
+        emit_event(stream.stats_event(time.time()), final=True)
+    if event_server is not None:
+        event_server.stop()
+    if event_store is not None:
+        event_store.close()
+    for loader in loaders:
+        if loader.error is not None:
+            raise loader.error
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import cv2
+import numpy as np
+
+
+class Layer:
+    """
+    A pre-rendered image plus, for non-opaque layers, its transmittance: how
+    much of the frame underneath shows through each pixel (0 where the layer
+    fully covers the frame, 1 where it left the pixel untouched, in between on
+    anti-aliased text edges).
+    """
+
+    def __init__(self, image, transmittance=None):
+        self.image = image
+        self.transmittance = transmittance
+        self.mask = None
+        if transmittance is not None and np.all((transmittance == 0) | (transmittance == 1)):
+            # Hard edges only, so a masked copy is exact and much cheaper
+            self.mask = transmittance[..., 0] == 0
+
+    def clip(self, frame, x, y):
+        # Returns the frame region and the matching layer slices, clipped to the frame
+        frame_height, frame_width = frame.shape[:2]
+        height, width = self.image.shape[:2]
+        x1, y1 = max(x, 0), max(y, 0)
+        x2, y2 = min(x + width, frame_width), min(y + height, frame_height)
+        if x2 <= x1 or y2 <= y1:
+            return None, None
+        return frame[y1:y2, x1:x2], (slice(y1 - y, y2 - y), slice(x1 - x, x2 - x))
+
+    def draw(self, frame, x, y):
+        roi, src = self.clip(frame, x, y)
+        if roi is None:
+            return
+        if self.transmittance is None:
+            roi[:] = self.image[src]
+        elif self.mask is not None:
+            np.copyto(roi, self.image[src], where=self.mask[src][..., None])
+        else:
+            # image was rendered on black, so it already holds color * coverage
+            roi[:] = np.clip(roi * self.transmittance[src] + self.image[src] + 0.5, 0, 255).astype(np.uint8)
+
+    def blend(self, frame, x, y, alpha):
+        # Equivalent to drawing the layer on a copy of the frame and
+        # cv2.addWeighted-ing the copy back, but only touches the layer's rectangle
+        roi, src = self.clip(frame, x, y)
+        if roi is None:
+            return
+        cv2.addWeighted(self.image[src], alpha, roi, 1 - alpha, 0, roi)
+
+
+def render_layer(width, height, render, opaque=False):
+    """
+    Draw a layer by calling render(canvas). Transparent layers are rendered
+    once on black and once on white; the difference gives each pixel's coverage.
+    """
+    on_black = np.zeros((height, width, 3), dtype=np.uint8)
+    render(on_black)
+    if opaque:
+        return Layer(on_black)
+    on_white = np.full((height, width, 3), 255, dtype=np.uint8)
+    render(on_white)
+    transmittance = (on_white.astype(np.float32) - on_black) / 255.0
+    return Layer(on_black, transmittance)
+
+
+class LayerCache:
+    """
+    Solid-color fill buffers for translucent rectangles, so a blend never
+    allocates a full-frame copy. The buffers are thrown away whenever the
+    window size changes. Static chrome itself lives in the widgets' layers.
+    """
+
+    def __init__(self):
+        self.size = None
+        self.fills = {}
+
+    def set_size(self, width, height):
+        if self.size != (width, height):
+            self.size = (width, height)
+            self.fills.clear()
+
+    def fill(self, height, width, color):
+        key = (height, width, color)
+        fill = self.fills.get(key)
+        if fill is None:
+            fill = np.empty((height, width, 3), dtype=np.uint8)
+            fill[:] = color
+            self.fills[key] = fill
+        return fill
+
+    def blend_rect(self, frame, x1, y1, x2, y2, color, alpha):
+        """
+        Translucent filled rectangle with the same corners as
+        cv2.rectangle(..., -1), blended in place over just that rectangle.
+        """
+        frame_height, frame_width = frame.shape[:2]
+        x1, y1 = max(x1, 0), max(y1, 0)
+        x2, y2 = min(x2 + 1, frame_width), min(y2 + 1, frame_height)
+        if x2 <= x1 or y2 <= y1:
+            return
+        roi = frame[y1:y2, x1:x2]
+        cv2.addWeighted(self.fill(y2 - y1, x2 - x1, color), alpha, roi, 1 - alpha, 0, roi)
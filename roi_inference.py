@@ -0,0 +1,66 @@
+import numpy as np
+
+from detections import class_id, class_mask, detections_from_results, offset_detections
+
+
+class RoiDetector:
+    """
+    Two-stage detector for large captures. The whole frame is first run at a
+    small imgsz to find people (and any phone big enough to see at that size),
+    then the hands/torso region around each person is cropped and run again at
+    a larger imgsz looking only for phones. The crop is much smaller than the
+    frame, so the second pass effectively upscales it and small phones are
+    found without running the model on the full-resolution frame.
+    """
+
+    def __init__(self, model, person_imgsz=320, phone_imgsz=640, conf_threshold=0.5,
+                 max_people=2, side_margin=0.35, top_fraction=0.3, bottom_margin=0.1):
+        self.model = model
+        self.person_imgsz = person_imgsz
+        self.phone_imgsz = phone_imgsz
+        self.conf_threshold = conf_threshold
+        self.max_people = max_people
+        self.side_margin = side_margin
+        self.top_fraction = top_fraction
+        self.bottom_margin = bottom_margin
+        self.person_class = class_id(model.names, "person")
+        self.phone_class = class_id(model.names, "cell phone")
+
+    def search_region(self, person_box, frame_width, frame_height):
+        # Hands and a held phone sit in the lower part of the person box and
+        # often stick out to the sides, so widen it and drop the head.
+        x1, y1, x2, y2 = person_box
+        width, height = x2 - x1, y2 - y1
+        rx1 = max(0, int(x1 - width * self.side_margin))
+        rx2 = min(frame_width, int(x2 + width * self.side_margin))
+        ry1 = max(0, int(y1 + height * self.top_fraction))
+        ry2 = min(frame_height, int(y2 + height * self.bottom_margin))
+        return rx1, ry1, rx2, ry2
+
+    def __call__(self, frame):
+        frame_height, frame_width = frame.shape[:2]
+        coarse = detections_from_results(
+            self.model(frame, imgsz=self.person_imgsz, classes=[self.person_class, self.phone_class],
+                       verbose=False),
+            self.conf_threshold)
+        people = coarse[class_mask(coarse, self.person_class)]
+        if not len(people):
+            return coarse
+
+        people = people[np.argsort(-people[:, 4])]
+        regions = [self.search_region(d[:4], frame_width, frame_height) for d in people[:self.max_people]]
+        regions = [r for r in regions if r[2] - r[0] > 1 and r[3] - r[1] > 1]
+        if not regions:
+            return coarse
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in regions]
+        results = self.model(crops, imgsz=self.phone_imgsz, classes=[self.phone_class], verbose=False)
+
+        phones = []
+        for (x1, y1, _, _), result in zip(regions, results):
+            found = detections_from_results([result], self.conf_threshold)
+            phones.append(offset_detections(found[class_mask(found, self.phone_class)], x1, y1))
+        phones = np.concatenate(phones)
+        if not len(phones):
+            # Keep a phone the coarse pass saw outside every search region
+            phones = coarse[class_mask(coarse, self.phone_class)]
+        return np.concatenate([people, phones])
@@ -0,0 +1,53 @@
+import collections
+
+
+class SessionStats:
+    """
+    Running totals over a session's finished distractions, updated once per
+    distraction instead of rescanning the log: count and total duration per
+    type code, the mean duration of the last `window` distractions, and the
+    longest stretch between distractions. Every read is O(1) however long
+    the session runs.
+    """
+
+    def __init__(self, kinds, start_time=0.0, window=5):
+        self.kinds = kinds
+        self.recent = collections.deque(maxlen=window)
+        self.reset(start_time)
+
+    def reset(self, start_time):
+        self.count = 0
+        self.counts = [0] * self.kinds
+        self.total_durations = [0] * self.kinds
+        self.total_duration = 0
+        self.recent.clear()
+        self.recent_total = 0
+        self.longest_streak = 0.0
+        self.streak_start = start_time
+
+    def add(self, kind, start_time, end_time, duration):
+        self.count += 1
+        self.counts[kind] += 1
+        self.total_durations[kind] += duration
+        self.total_duration += duration
+        if len(self.recent) == self.recent.maxlen:
+            self.recent_total -= self.recent[0]
+        self.recent.append(duration)
+        self.recent_total += duration
+        self.longest_streak = max(self.longest_streak, start_time - self.streak_start)
+        self.streak_start = end_time
+
+    def share(self, kind):
+        # Percentage of the distractions that were of this type
+        return self.counts[kind] / self.count * 100 if self.count else 0
+
+    def recent_mean(self):
+        # Mean duration of the last `window` distractions
+        return self.recent_total / len(self.recent) if self.recent else 0
+
+    def longest_focus_streak(self, until=None):
+        # Longest stretch without a distraction, counting the current one up
+        # to `until` (now, or when the distraction in progress began)
+        if until is None:
+            return self.longest_streak
+        return max(self.longest_streak, until - self.streak_start)
@@ -0,0 +1,294 @@
+"""
+Multi-process inference: the app's capture thread writes frames into a
+shared-memory ring and a worker process (python -m shm_ring ...) runs the
+model on them, so decoding, drawing and inference no longer share one GIL.
+Frames never go through pickling; the app lends the worker a slot in a
+small message on its stdin and the worker sends detections back on its
+stdout as small binary records, which also hand the slot back.
+"""
+import json
+import os
+import struct
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from box_tracker import BoxTracker
+from frame_pipeline import LatestQueue, capture_loop, inference_loop
+from inference_backends import build_detector, load_model
+from motion_gate import MotionGate
+
+# Worker -> app record: frame index, capture time, model seconds (0 when the
+# previous detections were reused), then `count` float32 detection rows. The
+# READY record comes first, with the model load time in place of the capture
+# time and the class names as a JSON payload of `count` bytes.
+RECORD = struct.Struct("<qddI")
+READY = -1
+# App -> worker: slot, frame index, capture time
+LEND = struct.Struct("<iqd")
+
+
+def attach_shared_memory(name):
+    # Only the creating process may unlink the segment; before Python 3.13
+    # attaching also registers it with this process's resource tracker
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        from multiprocessing import resource_tracker
+        memory = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(memory._name, "shared_memory")
+        return memory
+
+
+class FrameRing:
+    """
+    `slots` frames of one shape in shared memory, written by one process and
+    read by another. Which process may touch a slot is never decided through
+    the shared memory itself (plain loads and stores there carry no ordering
+    guarantee between processes): InferenceProcess lends the worker one slot
+    at a time over its stdin and gets it back with the worker's record on
+    stdout, and the pipe write / read orders the pixel copies on both sides.
+    Pass name to attach to an existing ring.
+    """
+
+    def __init__(self, shape, slots=4, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.owner = name is None
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(create=True, size=slots * int(np.prod(self.shape)))
+        else:
+            self.memory = attach_shared_memory(name)
+        self.name = self.memory.name
+        self.frames = np.ndarray((slots,) + self.shape, np.uint8, self.memory.buf)
+
+    def store(self, slot, frame):
+        if frame.shape == self.shape:
+            np.copyto(self.frames[slot], frame)
+        else:
+            # The camera switched modes; scale into the slot rather than fail
+            cv2.resize(frame, (self.shape[1], self.shape[0]), dst=self.frames[slot])
+
+    def close(self):
+        # Drop the view before closing, or the buffer is still exported
+        del self.frames
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+class InferenceProcess:
+    """
+    The worker process as the app sees it. It has the same ready / error /
+    load_seconds / names as ModelLoader, put() as a capture output, and
+    join() so stop_pipeline shuts it down along with the threads.
+
+    The worker holds at most one slot: the newest frame is lent as soon as
+    the worker asks for one (with its READY record, then with every result)
+    and the capture thread writes into a slot that is neither lent nor the
+    newest, so it never waits and the worker never sees a frame being
+    written. That takes at least three slots.
+    """
+
+    def __init__(self, ring, config, results, metrics=None):
+        if ring.slots < 3:
+            raise ValueError("the frame ring needs at least 3 slots")
+        self.ring = ring
+        self.ready = threading.Event()
+        self.error = None
+        self.load_seconds = None
+        self.names = None
+        self.stopping = False
+        self.lock = threading.Lock()
+        self.lent = None
+        self.newest = None
+        self.wanted = False
+        self.next_slot = 0
+        self.process = subprocess.Popen(
+            self.command(config), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.receiver = threading.Thread(target=self.receive, args=(results, metrics),
+                                         name="inference-results", daemon=True)
+        self.receiver.start()
+
+    def command(self, config):
+        return [sys.executable, "-m", "shm_ring", self.ring.name, json.dumps(list(self.ring.shape)),
+                str(self.ring.slots), json.dumps(config)]
+
+    def put(self, packet):
+        # Frames arriving while the model loads are not written at all
+        if not self.ready.is_set():
+            return
+        frame_index, capture_time, frame = packet
+        with self.lock:
+            busy = (self.lent, self.newest[0] if self.newest is not None else None)
+            while self.next_slot in busy:
+                self.next_slot = (self.next_slot + 1) % self.ring.slots
+            slot = self.next_slot
+            self.next_slot = (slot + 1) % self.ring.slots
+        # Only this thread writes, and nothing lends the slot until it is the newest
+        self.ring.store(slot, frame)
+        with self.lock:
+            self.newest = (slot, frame_index, capture_time)
+            if self.wanted:
+                self.lend()
+
+    def lend(self):
+        # Called under the lock
+        slot, frame_index, capture_time = self.newest
+        self.lent, self.newest, self.wanted = slot, None, False
+        try:
+            self.process.stdin.write(LEND.pack(slot, frame_index, capture_time))
+            self.process.stdin.flush()
+        except (OSError, ValueError):
+            pass  # worker gone; receive() reports it
+
+    def release(self):
+        # The worker is done with its slot and waits for the next frame
+        with self.lock:
+            self.lent = None
+            self.wanted = True
+            if self.newest is not None:
+                self.lend()
+
+    def receive(self, results, metrics):
+        stream = self.process.stdout
+        while True:
+            header = stream.read(RECORD.size)
+            if len(header) < RECORD.size:
+                break
+            frame_index, capture_time, model_seconds, count = RECORD.unpack(header)
+            if frame_index == READY:
+                self.names = {int(cls): name for cls, name in json.loads(stream.read(count)).items()}
+                self.load_seconds = capture_time
+                self.ready.set()
+                self.release()
+                continue
+            detections = np.frombuffer(stream.read(count * 24), dtype=np.float32).reshape(count, 6)
+            self.release()
+            if metrics is not None and model_seconds > 0:
+                metrics.record("inference", model_seconds)
+            results.put((frame_index, capture_time, detections))
+        if not self.stopping:
+            self.error = RuntimeError(f"inference worker exited with code {self.process.wait()}")
+
+    def join(self, timeout=None):
+        self.stopping = True
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.receiver.join(timeout)
+        self.ring.close()
+
+
+def start_process_pipeline(video_capture, config, display=True, metrics=None, slots=4, results=None):
+    """
+    Like start_pipeline, but inference runs in a worker process. config
+    describes the model and the optional motion gate / tracker (see
+    worker_main). Frames go into a ring sized from the capture's frame size.
+    Returns the frame queue, the results queue, the stop event, the capture
+    thread and worker (both joined by stop_pipeline), and the
+    InferenceProcess. results replaces the results queue, as in start_pipeline.
+    """
+    shape = (int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+             int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+    stop_event = threading.Event()
+    frame_queue = LatestQueue() if display else None
+    results_queue = results if results is not None else LatestQueue()
+    worker = InferenceProcess(FrameRing(shape, slots), config, results_queue, metrics)
+    outputs = [frame_queue, worker] if display else [worker]
+    capture_thread = threading.Thread(
+        target=capture_loop,
+        args=(video_capture, outputs, stop_event, metrics),
+        name="capture", daemon=True)
+    capture_thread.start()
+    return frame_queue, results_queue, stop_event, [capture_thread, worker], worker
+
+
+class RingInput:
+    # inference_loop's input in the worker: wait for the app to lend a slot;
+    # it is ours until RecordOutput sends the frame's record. End of stdin
+    # means the app is shutting down.
+    def __init__(self, ring, lend_fd, stop_event):
+        self.ring = ring
+        self.lend_fd = lend_fd
+        self.stop_event = stop_event
+
+    def get(self, timeout=None):
+        message = b""
+        while len(message) < LEND.size:
+            chunk = os.read(self.lend_fd, LEND.size - len(message))
+            if not chunk:
+                self.stop_event.set()
+                return None
+            message += chunk
+        slot, frame_index, capture_time = LEND.unpack(message)
+        return frame_index, capture_time, self.ring.frames[slot]
+
+
+class RecordOutput:
+    # inference_loop's output and metrics in the worker: each result becomes
+    # one record, carrying the model time recorded just before it and
+    # handing the frame's slot back
+    def __init__(self, stream, stop_event):
+        self.stream = stream
+        self.stop_event = stop_event
+        self.model_seconds = 0.0
+
+    def record(self, stage, seconds):
+        self.model_seconds = seconds
+
+    def put(self, packet):
+        frame_index, capture_time, detections = packet
+        rows = np.ascontiguousarray(detections, dtype=np.float32)
+        try:
+            self.stream.write(RECORD.pack(frame_index, capture_time, self.model_seconds, len(rows)) + rows.tobytes())
+            self.stream.flush()
+        except (OSError, ValueError):
+            self.stop_event.set()
+        self.model_seconds = 0.0
+
+
+def worker_main(ring_name, shape, slots, config):
+    """
+    Worker process entry point. config keys: weights, backend, int8, mode
+    ("full" / "roi"), roi_person_imgsz, roi_phone_imgsz, and motion_gate
+    ([sensitivity, max_staleness]) / tracker ([keyframe_interval, min_score])
+    or null.
+    """
+    # Records own stdout; anything the model prints goes to stderr instead
+    records = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    ring = FrameRing(shape, slots, ring_name)
+
+    started = time.perf_counter()
+    model = load_model(config["weights"], config["backend"], int8=config["int8"],
+                       dynamic=config["mode"] == "roi")
+    detect = build_detector(model, config["mode"], config["roi_person_imgsz"], config["roi_phone_imgsz"])
+    detect(np.zeros(shape, dtype=np.uint8))
+    names = json.dumps(model.names).encode()
+    records.write(RECORD.pack(READY, time.perf_counter() - started, 0.0, len(names)) + names)
+    records.flush()
+
+    gate = MotionGate(*config["motion_gate"]) if config.get("motion_gate") else None
+    tracker = BoxTracker(*config["tracker"]) if config.get("tracker") else None
+    stop_event = threading.Event()
+    output = RecordOutput(records, stop_event)
+    inference_loop(detect, RingInput(ring, sys.stdin.fileno(), stop_event), output, stop_event,
+                   gate, tracker, metrics=output)
+    ring.close()
+
+
+if __name__ == "__main__":
+    worker_main(sys.argv[1], tuple(json.loads(sys.argv[2])), int(sys.argv[3]), json.loads(sys.argv[4]))
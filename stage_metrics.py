@@ -0,0 +1,166 @@
+import collections
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class RollingHistogram:
+    """
+    The last `window` durations of one stage, plus when each was recorded so
+    the stage's rate (frames per second for a per-frame stage) can be
+    derived. Count and sum cover the whole run.
+    """
+
+    def __init__(self, window=600):
+        self.samples = collections.deque(maxlen=window)
+        self.times = collections.deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds, now):
+        self.samples.append(seconds)
+        self.times.append(now)
+        self.count += 1
+        self.total += seconds
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        if not self.samples:
+            return [0.0] * len(quantiles)
+        return np.percentile(np.fromiter(self.samples, dtype=np.float64, count=len(self.samples)), quantiles).tolist()
+
+    def rate(self):
+        if len(self.times) < 2 or self.times[-1] <= self.times[0]:
+            return 0.0
+        return (len(self.times) - 1) / (self.times[-1] - self.times[0])
+
+
+class StageMetrics:
+    """
+    Per-stage latency for the capture thread, the inference thread and the
+    render loop. Each stage is only recorded from one thread, so recording
+    is a couple of deque appends with no locking. The render loop marks
+    stage boundaries with start_frame() and lap(stage). One-off durations
+    such as time to first frame are kept separately with mark(name, seconds).
+    """
+
+    def __init__(self, window=600):
+        self.window = window
+        self.stages = {}
+        self.marks = {}
+        self.started = time.time()
+        self.frame_start = None
+        self.last_lap = None
+
+    def record(self, stage, seconds):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages.setdefault(stage, RollingHistogram(self.window))
+        histogram.add(seconds, time.perf_counter())
+
+    def start_frame(self):
+        # The time between frame starts is recorded as the "frame" stage
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.record("frame", now - self.frame_start)
+        self.frame_start = now
+        self.last_lap = now
+
+    def lap(self, stage):
+        # Record the time since the previous lap (or frame start) as `stage`
+        now = time.perf_counter()
+        self.record(stage, now - self.last_lap)
+        self.last_lap = now
+
+    def mark(self, name, seconds):
+        self.marks[name] = seconds
+
+    def percentile(self, stage, quantile):
+        histogram = self.stages.get(stage)
+        return histogram.percentiles((quantile,))[0] if histogram else 0.0
+
+    def rate(self, stage):
+        histogram = self.stages.get(stage)
+        return histogram.rate() if histogram else 0.0
+
+    def snapshot(self):
+        stages = {}
+        for stage, histogram in list(self.stages.items()):
+            p50, p95, p99 = histogram.percentiles()
+            stages[stage] = {
+                "count": histogram.count,
+                "rate_per_sec": round(histogram.rate(), 2),
+                "mean_ms": round(histogram.total / histogram.count * 1000, 3) if histogram.count else 0.0,
+                "p50_ms": round(p50 * 1000, 3),
+                "p95_ms": round(p95 * 1000, 3),
+                "p99_ms": round(p99 * 1000, 3),
+            }
+        return {"time": time.time(), "uptime_s": round(time.time() - self.started, 1), "stages": stages,
+                "marks_s": {name: round(seconds, 3) for name, seconds in self.marks.items()}}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        lines = [
+            "# HELP focus_monitor_stage_seconds Latency of each monitor stage over the recent window.",
+            "# TYPE focus_monitor_stage_seconds summary",
+        ]
+        rates = []
+        for stage, histogram in list(self.stages.items()):
+            for quantile, value in zip(("0.5", "0.95", "0.99"), histogram.percentiles()):
+                lines.append(f'focus_monitor_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {value:.6f}')
+            lines.append(f'focus_monitor_stage_seconds_sum{{stage="{stage}"}} {histogram.total:.6f}')
+            lines.append(f'focus_monitor_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            rates.append(f'focus_monitor_stage_rate{{stage="{stage}"}} {histogram.rate():.3f}')
+        lines.append("# HELP focus_monitor_stage_rate Recent calls per second of each stage.")
+        lines.append("# TYPE focus_monitor_stage_rate gauge")
+        lines.extend(rates)
+        if self.marks:
+            lines.append("# HELP focus_monitor_startup_seconds One-off startup durations (time to first frame / detection).")
+            lines.append("# TYPE focus_monitor_startup_seconds gauge")
+            for name, seconds in list(self.marks.items()):
+                lines.append(f'focus_monitor_startup_seconds{{mark="{name}"}} {seconds:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        # JSON for *.json, Prometheus text format otherwise (e.g. for the
+        # node_exporter textfile collector); replaced atomically
+        text = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as file:
+            file.write(text)
+        os.replace(temp_path, path)
+
+
+def serve_metrics(metrics, port, host="127.0.0.1"):
+    """
+    Serve /metrics (Prometheus text) and /metrics.json from a daemon thread.
+    Returns the server so the caller can shut it down.
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = metrics.to_prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = metrics.to_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
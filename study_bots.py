@@ -0,0 +1,120 @@
+import random
+import time
+
+from distraction_engine import PHONE
+
+study_questions = [
+    "What's the best way to improve my focus?",
+    "How can I study more efficiently?",
+    "Should I take more breaks?",
+    "How can I avoid phone distractions?",
+    "What time of day is best for studying?",
+    "How do I maintain motivation?",
+    "What's a good study schedule?",
+    "How can I remember more of what I study?"
+]
+
+study_responses = [
+    "Based on your recent focus metrics (focus rate: {focus_percent:.1f}%), try Pomodoro: 25 on, 5 off.",
+    "You've had {distraction_count} distractions today. Try a quieter environment.",
+    "Your focus time is {focus_time_str}. Increase your daily study by 15 minutes each week.",
+    "Phone distractions are {phone_distractions:.1f}% of your interruptions. Consider phone-free timeslots.",
+    "Your pattern suggests morning is your peak focus time.",
+    "Use spaced reviews for better retention.",
+    "Your average study session is {avg_session_length} min. 50-90 min is ideal for deep work.",
+    "Active recall: test yourself rather than just reading."
+]
+
+mental_health_questions = [
+    "How can I manage study stress?",
+    "I'm feeling overwhelmed with my workload",
+    "How do I know if I'm studying too much?",
+    "What are signs of burnout?",
+    "I feel anxious before exams",
+    "How can I maintain work-life balance?"
+]
+
+mental_health_responses = [
+    "Your sessions are {session_length_trend}. Take breaks and try a 5-min meditation.",
+    "You've studied {total_study_hours_today:.1f} hrs today. Walk or stretch to recharge.",
+    "Your ratio is {study_break_ratio:.1f}:1. Try ~4:1 for a balanced approach.",
+    "You've studied {consecutive_study_days} consecutive days. Schedule a rest day to avoid burnout.",
+    "Evening shows more distractions ({evening_distractions}). Move tasks earlier if possible.",
+    "Try progressive muscle relaxation to reduce physical tension.",
+    "You scored {boundary_score}/10 on work-life boundaries. Separate your study/personal time.",
+    "Before each session, do 2 minutes of mindful breathing."
+]
+
+book_recommendations = [
+    ("Deep Work", 4.7),
+    ("Atomic Habits", 4.8),
+    ("The Power of Now", 4.5),
+    ("Digital Minimalism", 4.6),
+    ("Thinking, Fast and Slow", 4.4)
+]
+
+def format_time(seconds):
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    seconds = int(seconds % 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+def get_phone_distraction_percentage(session_stats):
+    return session_stats.share(PHONE)
+
+def get_average_session_length(total_time, distraction_time):
+    if total_time <= 0:
+        return 0
+    focused_time = total_time - distraction_time
+
+    estimated_sessions = max(1, focused_time / 1800)
+    return round((focused_time / estimated_sessions) / 60)
+
+def get_session_length_trend(session_stats, current_time):
+    if session_stats.count < 2:
+        return "fairly consistent"
+    mean_duration = session_stats.recent_mean()
+    if mean_duration > 300:
+        return "showing longer breaks"
+    elif session_stats.count > 5 and mean_duration < 120:
+        return "improving with shorter breaks"
+    return "relatively steady"
+
+def get_study_recommendation(focus_percentage, session_stats, focus_time, total_study_time):
+    question = random.choice(study_questions)
+    response_template = random.choice(study_responses)
+    distraction_count = session_stats.count
+    focus_time_str = format_time(focus_time)
+    phone_distractions = get_phone_distraction_percentage(session_stats)
+    avg_session_length = get_average_session_length(total_study_time, total_study_time - focus_time)
+    response = response_template.format(
+        focus_percent=focus_percentage,
+        distraction_count=distraction_count,
+        focus_time_str=focus_time_str,
+        phone_distractions=phone_distractions,
+        avg_session_length=avg_session_length
+    )
+    return question, response
+
+def get_mental_health_recommendation(total_study_time, session_stats, focus_time, history):
+    # history: Analytics.wellbeing() for the past days
+    question = random.choice(mental_health_questions)
+    response_template = random.choice(mental_health_responses)
+    session_length_trend = get_session_length_trend(session_stats, time.time())
+    total_study_hours_today = total_study_time / 3600
+    if total_study_time - focus_time > 0:
+        study_break_ratio = focus_time / (total_study_time - focus_time)
+    else:
+        study_break_ratio = 5.0
+
+    response = response_template.format(
+        session_length_trend=session_length_trend,
+        total_study_hours_today=total_study_hours_today,
+        study_break_ratio=study_break_ratio,
+        **history
+    )
+    return question, response
+
+def get_book_recommendation():
+    recommendations = random.sample(book_recommendations, 3)#(0, len())
+    return recommendations
@@ -0,0 +1,145 @@
+"""
+Analytics rollups: stats and distraction events land in the row of their
+local hour, rows survive a restart, and the bot's questions are answered
+from the columns.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from analytics import COLUMNS, Analytics
+
+
+def at(day, hour, minute=0):
+    # Epoch time of a local wall-clock time in a week without DST changes
+    return (datetime(2026, 6, 1, hour, minute) + timedelta(days=day)).timestamp()
+
+
+def stats(time, total, focus=None, stream=""):
+    return {"event": "stats", "time": time, "stream": stream, "total_study_time": total,
+            "focus_time": total if focus is None else focus}
+
+
+def distraction(kind, time, duration):
+    return {"event": "distraction_end", "time": time, "type": kind, "duration": duration}
+
+
+def study(analytics, day, hour, seconds, stream=""):
+    # A session of `seconds` starting at the top of the hour
+    start = at(day, hour)
+    analytics.record_stats(stats(start, 0.0, stream=stream))
+    analytics.record_stats(stats(start + seconds, seconds, stream=stream))
+
+
+def test_rows_per_local_hour():
+    analytics = Analytics()
+    analytics.record_stats(stats(at(0, 9, 10), 0.0))
+    analytics.record_stats(stats(at(0, 9, 50), 2400.0, 2000.0))
+    analytics.record_event(distraction("Cell Phone", at(0, 9, 55), 40))
+    analytics.record_stats(stats(at(0, 10, 20), 4200.0, 3500.0))
+    analytics.record_event(distraction("Left Desk", at(0, 10, 25), 120))
+    analytics.record_event(distraction("Cell Phone", at(0, 10, 30), 15))
+    analytics.close()
+
+    table = analytics.table(at(0, 12), 1)
+    assert table["hour_of_day"].tolist() == [9, 10]
+    assert table["hour"].tolist() == [int(at(0, 9)), int(at(0, 10))]
+    # The change in the session totals goes to the hour it was reported in
+    np.testing.assert_allclose(table["study_seconds"], [2400, 1800])
+    np.testing.assert_allclose(table["focus_seconds"], [2000, 1500])
+    assert table["cell_phone_distractions"].tolist() == [1, 1]
+    np.testing.assert_allclose(table["cell_phone_seconds"], [40, 15])
+    assert table["left_desk_distractions"].tolist() == [0, 1]
+
+
+def test_session_reset_and_streams():
+    analytics = Analytics()
+    analytics.record_stats(stats(at(0, 9, 0), 0.0, stream="desk"))
+    analytics.record_stats(stats(at(0, 9, 0), 0.0, stream="door"))
+    analytics.record_stats(stats(at(0, 9, 10), 600.0, stream="desk"))
+    analytics.record_stats(stats(at(0, 9, 10), 300.0, stream="door"))
+    # The desk's session starts over: its new total counts from zero
+    analytics.record_stats(stats(at(0, 9, 20), 60.0, stream="desk"))
+    assert analytics.row["study_seconds"] == pytest.approx(960.0)
+
+
+def test_open_hour_included_in_queries():
+    analytics = Analytics()
+    study(analytics, 0, 9, 1800)
+    assert analytics.daily_study_seconds(at(0, 10), 2).tolist() == [1800, 0]
+
+
+def test_rows_survive_restart(tmp_path):
+    analytics = Analytics(str(tmp_path))
+    study(analytics, 0, 9, 1200)
+    study(analytics, 0, 14, 600)
+    analytics.record_event(distraction("Cell Phone", at(0, 14, 30), 12))
+    analytics.close()
+
+    reloaded = Analytics(str(tmp_path))
+    assert reloaded.size == 2
+    for name, _ in COLUMNS:
+        np.testing.assert_array_equal(reloaded.data[name][:2], analytics.data[name][:2])
+    # New rows go after the stored ones
+    study(reloaded, 1, 9, 300)
+    reloaded.close()
+    assert Analytics(str(tmp_path)).daily_study_seconds(at(1, 12), 2).tolist() == [300, 1800]
+
+
+def test_uneven_columns_cut_back(tmp_path):
+    analytics = Analytics(str(tmp_path))
+    study(analytics, 0, 9, 1200)
+    study(analytics, 0, 10, 600)
+    analytics.close()
+    # A crash while the last row was being appended left one column short
+    path = tmp_path / "focus_seconds.bin"
+    path.write_bytes(path.read_bytes()[:-4])
+    reloaded = Analytics(str(tmp_path))
+    assert reloaded.size == 1
+    assert (tmp_path / "study_seconds.bin").stat().st_size == 4
+
+
+def test_consecutive_study_days():
+    analytics = Analytics()
+    for day in range(4):
+        study(analytics, day, 10, 900)
+    # A short session does not count as a study day
+    study(analytics, 4, 10, 60)
+    assert analytics.consecutive_study_days(at(3, 20)) == 4
+    # Nothing yet today (day 5): the streak can still end yesterday, but day 4 was too short
+    assert analytics.consecutive_study_days(at(5, 8)) == 0
+    # On day 4 itself any study counts
+    assert analytics.consecutive_study_days(at(4, 20)) == 5
+
+
+def test_evening_distractions_and_by_hour():
+    analytics = Analytics()
+    for day, hour, kind in ((0, 9, "Cell Phone"), (0, 19, "Cell Phone"), (1, 19, "Cell Phone"),
+                            (1, 21, "Left Desk"), (1, 23, "Cell Phone"), (9, 20, "Cell Phone")):
+        analytics.record_event(distraction(kind, at(day, hour, 5), 10))
+    by_hour = analytics.distractions_by_hour(at(1, 23, 59))
+    assert by_hour[[9, 19, 21, 23]].tolist() == [1, 2, 1, 1]
+    # Day 9 is in the future of `now`, so it does not count
+    assert analytics.evening_distractions(at(1, 23, 59)) == 4
+
+
+def test_boundary_score():
+    analytics = Analytics()
+    for day in range(3):
+        study(analytics, day, 10, 3000)
+    assert analytics.boundary_score(at(2, 12)) == 10
+    # Half of the study late at night costs three points
+    late = Analytics()
+    for day in range(3):
+        study(late, day, 10, 1800)
+        study(late, day, 23, 1800)
+    assert late.boundary_score(at(2, 23, 59)) == 7
+    # Ten days in a row without rest cost four points
+    streak = Analytics()
+    for day in range(10):
+        study(streak, day, 10, 1800)
+    assert streak.consecutive_study_days(at(9, 12)) == 10
+    assert streak.boundary_score(at(9, 12)) == 6
+    assert streak.wellbeing(at(9, 12)) == {"consecutive_study_days": 10, "evening_distractions": 0,
+                                            "boundary_score": 6}
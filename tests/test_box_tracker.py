@@ -0,0 +1,84 @@
+"""
+BoxTracker: IoU matching keeps ids across keyframes, and predicted frames
+carry boxes along their measured velocity.
+"""
+import numpy as np
+import pytest
+
+from box_tracker import BoxTracker, iou_matrix
+
+
+def detections(*rows):
+    return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+
+def track_ids(tracker):
+    return [track.track_id for track in tracker.tracks]
+
+
+def test_iou_matrix():
+    a = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=np.float64)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [100, 100, 110, 110]], dtype=np.float64)
+    np.testing.assert_allclose(iou_matrix(a, b), [[1.0, 50 / 150, 0.0], [0.0, 0.0, 0.0]])
+    # Degenerate boxes have no overlap rather than a division by zero
+    assert iou_matrix(np.zeros((1, 4)), np.zeros((1, 4)))[0, 0] == 0.0
+
+
+def test_matching_keeps_ids():
+    tracker = BoxTracker(keyframe_interval=3)
+    tracker.update(detections([0, 0, 100, 100, 0.9, 0], [300, 300, 340, 360, 0.8, 67]))
+    assert track_ids(tracker) == [1, 2]
+    # Listed the other way round and moved a little: still the same two tracks
+    tracker.update(detections([305, 302, 345, 362, 0.8, 67], [4, 2, 104, 102, 0.9, 0]))
+    assert track_ids(tracker) == [1, 2]
+    np.testing.assert_allclose(tracker.tracks[0].box, [4, 2, 104, 102])
+    np.testing.assert_allclose(tracker.tracks[1].box, [305, 302, 345, 362])
+
+
+def test_class_must_match():
+    tracker = BoxTracker()
+    tracker.update(detections([0, 0, 100, 100, 0.9, 0]))
+    # Same place, different class: a new track, and the old one is held as a miss
+    tracker.update(detections([0, 0, 100, 100, 0.9, 67]))
+    assert track_ids(tracker) == [1, 2]
+    assert tracker.tracks[0].misses == 1
+
+
+def test_far_box_is_new_track():
+    tracker = BoxTracker(iou_threshold=0.3)
+    tracker.update(detections([0, 0, 100, 100, 0.9, 0]))
+    tracker.update(detections([80, 80, 180, 180, 0.9, 0]))
+    assert track_ids(tracker) == [1, 2]
+
+
+def test_missed_track_dropped_after_max_misses():
+    tracker = BoxTracker(max_misses=2)
+    tracker.update(detections([0, 0, 100, 100, 0.9, 0]))
+    for _ in range(2):
+        tracker.update(detections())
+        assert track_ids(tracker) == [1]
+    tracker.update(detections())
+    assert track_ids(tracker) == []
+
+
+def test_predict_follows_velocity():
+    tracker = BoxTracker(keyframe_interval=4, smoothing=1.0)
+    tracker.update(detections([0, 0, 100, 100, 0.9, 0]))
+    tracker.update(detections([10, 0, 110, 100, 0.9, 0]))
+    assert not tracker.needs_detection()
+    predicted = tracker.predict()
+    np.testing.assert_allclose(predicted[0, :4], [20, 0, 120, 100])
+    assert predicted[0, 4] == pytest.approx(0.9)
+    tracker.predict()
+    # keyframe_interval frames after the last keyframe the model runs again
+    tracker.predict()
+    assert tracker.needs_detection()
+
+
+def test_low_score_forces_keyframe():
+    tracker = BoxTracker(keyframe_interval=100, min_score=0.3, decay=0.5)
+    tracker.update(detections([0, 0, 100, 100, 0.9, 0]))
+    tracker.predict()
+    assert not tracker.needs_detection()
+    tracker.predict()
+    assert tracker.needs_detection()
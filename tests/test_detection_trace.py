@@ -0,0 +1,97 @@
+"""
+Trace files: what TraceWriter writes DetectionTrace reads back frame for
+frame, and TraceRecorder keeps every result the pipeline produces.
+"""
+import numpy as np
+import pytest
+
+from detection_trace import TRACE_DTYPE, DetectionTrace, TraceRecorder, TraceWriter
+from frame_pipeline import LatestQueue
+
+NAMES = {0: "person", 67: "cell phone"}
+
+
+def detections(*rows):
+    return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+
+def write_trace(path, frames, width=640, height=480):
+    writer = TraceWriter(path, NAMES, width, height)
+    for frame in frames:
+        writer.write(*frame)
+    writer.close()
+
+
+def assert_same_frames(read, written):
+    assert len(read) == len(written)
+    for (frame_index, timestamp, rows), (expected_index, expected_time, expected_rows) in zip(read, written):
+        assert frame_index == expected_index
+        assert timestamp == expected_time
+        np.testing.assert_array_equal(rows, expected_rows)
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "run.trace"
+    frames = [
+        (0, 1.7e9 + 0.0, detections([10, 20, 110, 220, 0.91, 0], [300, 40, 340, 90, 0.55, 67])),
+        (1, 1.7e9 + 0.033, detections()),
+        (2, 1.7e9 + 0.066, detections([12.5, 21, 111, 219.25, 0.88, 0])),
+    ]
+    write_trace(path, frames)
+
+    trace = DetectionTrace(path)
+    assert trace.names == NAMES
+    assert (trace.width, trace.height) == (640, 480)
+    assert len(trace) == 3
+    assert_same_frames(list(trace.frames()), frames)
+    timestamps, person, phone = trace.presence(0, 67)
+    np.testing.assert_array_equal(timestamps, [frame[1] for frame in frames])
+    assert person.tolist() == [True, False, True]
+    assert phone.tolist() == [True, False, False]
+
+
+def test_later_run_appends(tmp_path):
+    # Frame indexes restart in the second run; the timestamps keep the frames apart
+    path = tmp_path / "run.trace"
+    first = [(0, 100.0, detections([0, 0, 1, 1, 0.5, 0])), (1, 100.1, detections())]
+    second = [(0, 200.0, detections()), (1, 200.1, detections([0, 0, 2, 2, 0.7, 67]))]
+    write_trace(path, first)
+    write_trace(path, second, width=1280, height=720)
+
+    trace = DetectionTrace(path)
+    # The first run's header stays
+    assert (trace.width, trace.height) == (640, 480)
+    assert_same_frames(list(trace.frames()), first + second)
+
+
+def test_partial_last_row_ignored(tmp_path):
+    path = tmp_path / "run.trace"
+    frames = [(0, 1.0, detections([0, 0, 1, 1, 0.5, 0])), (1, 2.0, detections([0, 0, 1, 1, 0.6, 0]))]
+    write_trace(path, frames)
+    with open(path, "ab") as file:
+        file.write(b"\0" * (TRACE_DTYPE.itemsize // 2))
+    assert_same_frames(list(DetectionTrace(path).frames()), frames)
+
+
+def test_not_a_trace(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"hello, world")
+    with pytest.raises(ValueError):
+        DetectionTrace(path)
+
+
+def test_recorder_keeps_results_the_reader_missed(tmp_path):
+    path = tmp_path / "run.trace"
+    recorder = TraceRecorder(LatestQueue())
+    # Before open(), e.g. while the render loop has not started detection yet
+    recorder.put((0, 10.0, detections([1, 2, 3, 4, 0.9, 0])))
+    recorder.open(TraceWriter(path, NAMES, 640, 480))
+    for frame_index in range(1, 6):
+        recorder.put((frame_index, 10.0 + frame_index, detections()))
+    # Only the newest is still queued for the render loop
+    assert recorder.get_nowait()[0] == 5
+    assert recorder.get_nowait() is None
+    recorder.close()
+    recorder.put((6, 16.0, detections()))
+
+    assert [frame_index for frame_index, _, _ in DetectionTrace(path).frames()] == [0, 1, 2, 3, 4, 5]
@@ -0,0 +1,102 @@
+"""
+DistractionEngine.replay() skips every frame where no timer can fire, which
+only holds if it ends up in exactly the state update() reaches frame by
+frame. These checks compare the two on random traces, and the running
+SessionStats against a rescan of the log.
+"""
+import numpy as np
+import pytest
+
+from distraction_engine import PHONE, DistractionEngine
+
+
+def random_trace(rng, frames):
+    # Irregular frame times with the odd stall, and phone / person presence
+    # in runs of random length so the thresholds are crossed both ways
+    gaps = rng.uniform(0.01, 0.1, frames)
+    gaps[rng.random(frames) < 0.01] = rng.uniform(0.5, 8.0)
+    timestamps = 1.7e9 + np.cumsum(gaps)
+
+    def runs(probability):
+        flags = np.empty(frames, dtype=bool)
+        i = 0
+        while i < frames:
+            length = int(rng.integers(1, 200))
+            flags[i:i + length] = rng.random() < probability
+            i += length
+        return flags
+
+    phone = runs(0.4)
+    person = runs(0.8)
+    return timestamps, phone, person
+
+
+def random_engine(rng, start_time):
+    return dict(phone_detect_threshold=float(rng.uniform(0.5, 5.0)),
+                person_absent_threshold=float(rng.uniform(0.5, 8.0)),
+                flicker_tolerance=float(rng.uniform(0.0, 3.0)),
+                start_time=start_time)
+
+
+def run_update(settings, timestamps, phone, person):
+    engine = DistractionEngine(**settings)
+    events = []
+    for t, phone_detected, person_detected in zip(timestamps.tolist(), phone.tolist(), person.tolist()):
+        events += engine.update(t, phone_detected, person_detected, t)[1]
+    return engine, events
+
+
+def assert_same_state(a, b, end_time):
+    assert a.logs.entries() == b.logs.entries()
+    assert a.focus_stats(end_time) == b.focus_stats(end_time)
+    assert a.total_distraction_time == b.total_distraction_time
+    assert a.distraction_start_time == b.distraction_start_time
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_replay_matches_update(seed):
+    rng = np.random.default_rng(seed)
+    timestamps, phone, person = random_trace(rng, int(rng.integers(1, 3000)))
+    settings = random_engine(rng, timestamps[0])
+
+    expected_engine, expected_events = run_update(settings, timestamps, phone, person)
+    engine = DistractionEngine(**settings)
+    assert engine.replay(timestamps, phone, person) == expected_events
+    assert_same_state(engine, expected_engine, timestamps[-1])
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_replay_in_pieces(seed):
+    # The flicker history carries over from one replay() call to the next
+    rng = np.random.default_rng(1000 + seed)
+    timestamps, phone, person = random_trace(rng, 2000)
+    settings = random_engine(rng, timestamps[0])
+
+    expected_engine, expected_events = run_update(settings, timestamps, phone, person)
+    engine = DistractionEngine(**settings)
+    cuts = np.sort(rng.integers(0, len(timestamps), 3)).tolist()
+    events = []
+    for start, end in zip([0] + cuts, cuts + [len(timestamps)]):
+        events += engine.replay(timestamps[start:end], phone[start:end], person[start:end])
+    assert events == expected_events
+    assert_same_state(engine, expected_engine, timestamps[-1])
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_session_stats_match_log(seed):
+    rng = np.random.default_rng(2000 + seed)
+    timestamps, phone, person = random_trace(rng, 5000)
+    engine = DistractionEngine(**random_engine(rng, timestamps[0]))
+    engine.replay(timestamps, phone, person)
+    logs, stats = engine.logs, engine.stats
+
+    assert stats.count == len(logs)
+    assert stats.counts == np.bincount(logs.kind, minlength=len(stats.counts)).tolist()
+    assert stats.total_duration == int(logs.duration.sum())
+    if len(logs):
+        assert stats.share(PHONE) == pytest.approx(np.count_nonzero(logs.kind == PHONE) / len(logs) * 100)
+        assert stats.recent_mean() == pytest.approx(logs.duration[-5:].mean())
+        gaps = np.concatenate(([logs.start_time[0] - timestamps[0]], logs.start_time[1:] - logs.end_time[:-1]))
+        assert stats.longest_focus_streak() == pytest.approx(max(gaps.max(), 0.0))
+    else:
+        assert stats.recent_mean() == 0
@@ -0,0 +1,220 @@
+"""
+EventServer against raw sockets: published events reach a connected
+dashboard as one JSON array per flush, pages from other origins are turned
+away, and stop() sends what was published before it and returns while
+clients are still connected.
+"""
+import json
+import socket
+import struct
+import time
+
+import pytest
+
+from event_server import EventServer
+
+
+@pytest.fixture
+def server():
+    server = EventServer(0, flush_interval=0.02, origins=["http://localhost:8081"]).start()
+    yield server
+    server.stop()
+
+
+def own_origin(server):
+    return f"http://{server.host}:{server.port}"
+
+
+def connect(server, path="/events", origin=""):
+    # origin "" means the server's own; None sends no Origin header
+    if origin == "":
+        origin = own_origin(server)
+    origin_header = f"Origin: {origin}\r\n" if origin is not None else ""
+    client = socket.create_connection((server.host, server.port), timeout=5.0)
+    client.sendall((f"GET {path} HTTP/1.1\r\nHost: {server.host}:{server.port}\r\n{origin_header}"
+                    "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                    "Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    return client
+
+
+def read_exactly(client, size):
+    data = b""
+    while len(data) < size:
+        chunk = client.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("closed")
+        data += chunk
+    return data
+
+
+def read_response(client):
+    data = b""
+    while not data.endswith(b"\r\n\r\n"):
+        data += read_exactly(client, 1)
+    return data.decode("latin-1")
+
+
+def read_message(client):
+    first, second = read_exactly(client, 2)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", read_exactly(client, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", read_exactly(client, 8))[0]
+    return first & 0x0F, read_exactly(client, length)
+
+
+def test_published_events_reach_client(server):
+    client = connect(server)
+    assert read_response(client).startswith("HTTP/1.1 101")
+    time.sleep(0.05)
+    server.publish({"event": "distraction_start", "type": "Cell Phone", "time": 1.0})
+    server.publish({"event": "stats", "time": 1.0, "focus_percentage": 50.0})
+    server.publish({"event": "stats", "time": 2.0, "focus_percentage": 60.0})
+    opcode, payload = read_message(client)
+    assert opcode == 0x1
+    # The first stats were superseded within the flush and never sent
+    assert json.loads(payload) == [{"event": "distraction_start", "type": "Cell Phone", "time": 1.0},
+                                   {"event": "stats", "time": 2.0, "focus_percentage": 60.0}]
+    client.close()
+
+
+def test_new_client_gets_current_state(server):
+    server.publish({"event": "distraction_end", "type": "Left Desk", "time": 3.0, "duration": 12})
+    server.publish({"event": "stats", "time": 3.0, "focus_percentage": 75.0})
+    time.sleep(0.1)
+    client = connect(server)
+    read_response(client)
+    _, payload = read_message(client)
+    assert [event["event"] for event in json.loads(payload)] == ["distraction_end", "stats"]
+    client.close()
+
+
+def http_get(server, path, origin=None):
+    client = socket.create_connection((server.host, server.port), timeout=5.0)
+    origin_header = f"Origin: {origin}\r\n" if origin is not None else ""
+    client.sendall(f"GET {path} HTTP/1.1\r\nHost: {server.host}:{server.port}\r\n{origin_header}\r\n".encode())
+    data = b""
+    while True:
+        chunk = client.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    client.close()
+    head, _, body = data.decode("latin-1").partition("\r\n\r\n")
+    return head, body
+
+
+@pytest.mark.parametrize("origin", [None, "http://evil.example", "http://127.0.0.1:1", "null"])
+def test_upgrade_from_other_origin_refused(server, origin):
+    client = connect(server, origin=origin)
+    assert read_response(client).startswith("HTTP/1.1 403")
+    assert not server.clients
+    client.close()
+
+
+def test_upgrade_from_allowed_origin(server):
+    for origin in ("http://localhost:8081", f"http://localhost:{server.port}"):
+        client = connect(server, origin=origin)
+        assert read_response(client).startswith("HTTP/1.1 101")
+        client.close()
+
+
+def test_http_origins(server):
+    server.publish({"event": "stats", "time": 1.0, "focus_percentage": 50.0})
+    time.sleep(0.1)
+    head, body = http_get(server, "/stats")
+    assert head.startswith("HTTP/1.1 200") and "Access-Control-Allow-Origin" not in head
+    assert json.loads(body)[0]["focus_percentage"] == 50.0
+    head, _ = http_get(server, "/stats", "http://localhost:8081")
+    assert "Access-Control-Allow-Origin: http://localhost:8081" in head
+    head, body = http_get(server, "/events/recent", "http://evil.example")
+    assert head.startswith("HTTP/1.1 403") and "Access-Control-Allow-Origin" not in head
+
+
+def client_frame(payload, opcode):
+    # Clients mask their frames
+    mask = bytes([1, 2, 3, 4])
+    masked = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return struct.pack("!BB", 0x80 | opcode, 0x80 | len(payload)) + mask + masked
+
+
+def test_ping_answered(server):
+    client = connect(server)
+    read_response(client)
+    client.sendall(client_frame(b"are you there", 0x9))
+    assert read_message(client) == (0xA, b"are you there")
+    # A close from the client ends the subscription
+    client.sendall(client_frame(b"", 0x8))
+    assert read_message(client)[0] == 0x8
+    client.close()
+
+
+def test_recent_events_and_unknown_path(server):
+    for second in range(3):
+        server.publish({"event": "distraction_start", "type": "Left Desk", "time": float(second)})
+    time.sleep(0.1)
+    head, body = http_get(server, "/events/recent")
+    assert [event["time"] for event in json.loads(body)] == [0.0, 1.0, 2.0]
+    head, _ = http_get(server, "/nothing-here")
+    assert head.startswith("HTTP/1.1 404")
+
+
+def test_slow_client_dropped():
+    server = EventServer(0, flush_interval=0.01, max_backlog=3).start()
+    client = connect(server)
+    read_response(client)
+    time.sleep(0.05)
+    # The client never reads, so its socket fills up and the flushes queue behind it
+    payload = "x" * (1 << 20)
+    for _ in range(200):
+        server.publish({"event": "note", "payload": payload})
+        time.sleep(0.01)
+        if not server.clients:
+            break
+    assert not server.clients
+    client.close()
+    server.stop()
+
+
+def read_until_closed(client):
+    data = b""
+    try:
+        while True:
+            chunk = client.recv(4096)
+            if not chunk:
+                break
+            data += chunk
+    except ConnectionResetError:
+        pass
+    client.close()
+    return data
+
+
+def test_stop_sends_pending_events():
+    server = EventServer(0, flush_interval=10.0).start()
+    client = connect(server)
+    read_response(client)
+    time.sleep(0.05)
+    server.publish({"event": "stats", "time": 9.0, "focus_percentage": 80.0})
+    server.stop()
+    opcode, payload = read_message(client)
+    assert json.loads(payload) == [{"event": "stats", "time": 9.0, "focus_percentage": 80.0}]
+    assert read_message(client)[0] == 0x8
+    assert read_until_closed(client) == b""
+
+
+def test_stop_with_client_connected():
+    server = EventServer(0, flush_interval=0.02).start()
+    clients = [connect(server) for _ in range(3)]
+    for client in clients:
+        read_response(client)
+    # And one that never finishes its request
+    idle = socket.create_connection((server.host, server.port), timeout=5.0)
+    time.sleep(0.05)
+    start = time.perf_counter()
+    server.stop()
+    assert time.perf_counter() - start < 1.5
+    assert not server.thread.is_alive()
+    for client in clients + [idle]:
+        read_until_closed(client)
@@ -0,0 +1,80 @@
+"""
+EventStore round trips through its background writer: events and focus
+samples come back from the queries once close() has flushed them.
+"""
+import time
+
+from event_store import EventStore
+
+
+def stats(time, total, stream=""):
+    return {"event": "stats", "time": time, "stream": stream, "total_study_time": total,
+            "focus_time": total / 2, "focus_percentage": 50.0, "distractions": 0}
+
+
+def test_final_sample_kept(tmp_path):
+    store = EventStore(str(tmp_path / "history.db"), flush_interval=0.05, sample_interval=60.0)
+    for second in range(0, 100, 10):
+        store.record_stats(stats(1000.0 + second, second))
+    store.record_stats(stats(1095.0, 95.0), force=True)
+    store.close()
+    assert [sample["time"] for sample in store.samples()] == [1000.0, 1060.0, 1095.0]
+
+
+def distraction(kind, start, duration, stream=""):
+    return {"event": "distraction_end", "time": start + duration, "stream": stream, "type": kind,
+            "duration": duration, "start_time": start, "end_time": start + duration}
+
+
+def test_event_queries(tmp_path):
+    store = EventStore(str(tmp_path / "history.db"), flush_interval=0.05)
+    events = [
+        {"event": "distraction_start", "time": 100.0, "stream": "desk", "type": "Cell Phone"},
+        distraction("Cell Phone", 100.0, 5, "desk"),
+        distraction("Left Desk", 200.0, 30, "desk"),
+        distraction("Cell Phone", 300.0, 8, "door"),
+        {"event": "startup", "time": 50.0, "model_load": 1.5},
+    ]
+    for event in events:
+        store.record_event(event)
+    store.close()
+
+    # Oldest first, whatever order they were recorded in
+    assert [event["time"] for event in store.events()] == [50.0, 100.0, 105.0, 230.0, 308.0]
+    assert store.events(start=105.0, end=308.0) == [events[1], events[2]]
+    assert store.distraction_logs() == [events[1], events[2], events[3]]
+    assert store.events(type="Cell Phone", event="distraction_end") == [events[1], events[3]]
+    assert store.distraction_logs(stream="door") == [events[3]]
+    assert store.events(limit=2) == [events[4], events[0]]
+
+
+def test_samples_per_stream_interval(tmp_path):
+    store = EventStore(str(tmp_path / "history.db"), flush_interval=0.05, sample_interval=60.0)
+    kept = [store.record_stats(stats(1000.0 + second, second, stream))
+            for second in (0, 30, 60, 90, 130) for stream in ("desk", "door")]
+    assert kept == [True, True, False, False, True, True, False, False, True, True]
+    store.close()
+    assert [sample["time"] for sample in store.samples(stream="desk")] == [1000.0, 1060.0, 1130.0]
+    assert [sample["time"] for sample in store.samples(start=1060.0, end=1130.0)] == [1060.0, 1060.0]
+
+
+def test_queries_see_flushed_records_while_open(tmp_path):
+    store = EventStore(str(tmp_path / "history.db"), flush_interval=0.02)
+    store.record_event(distraction("Left Desk", 10.0, 20))
+    for _ in range(100):
+        if store.distraction_logs():
+            break
+        time.sleep(0.01)
+    assert len(store.distraction_logs()) == 1
+    store.close()
+
+
+def test_history_survives_reopening(tmp_path):
+    path = str(tmp_path / "history.db")
+    store = EventStore(path, flush_interval=0.05)
+    store.record_event(distraction("Cell Phone", 10.0, 4))
+    store.close()
+    store = EventStore(path, flush_interval=0.05)
+    store.record_event(distraction("Cell Phone", 20.0, 6))
+    store.close()
+    assert [event["duration"] for event in store.distraction_logs()] == [4, 6]
@@ -0,0 +1,145 @@
+"""
+BatchScheduler and StreamScheduler on stand-in streams: when a batch goes
+out, how big it is, whose turn comes first and how often a stream is
+served.
+"""
+import threading
+import time
+
+from batch_scheduler import BatchScheduler
+from multi_camera import StreamScheduler
+
+
+class Stream:
+    # The attributes the schedulers use of a CameraStream
+    def __init__(self, name):
+        self.name = name
+        self.busy = False
+        self.stop_event = threading.Event()
+        self.next_due = 0.0
+        self.packet = None
+        self.packet_time = None
+
+    def put(self, scheduler, frame_index=0):
+        with scheduler.condition:
+            self.packet = (frame_index, time.time(), None)
+            self.packet_time = time.perf_counter()
+            scheduler.condition.notify()
+
+
+def scheduler_with(scheduler, count):
+    scheduler.streams = [Stream(f"cam{i}") for i in range(count)]
+    return scheduler, scheduler.streams
+
+
+def names(batch):
+    return [stream.name for stream, _ in batch]
+
+
+def test_batch_goes_out_when_every_stream_has_a_frame():
+    scheduler, streams = scheduler_with(BatchScheduler(max_batch=8, latency_budget=1.0), 3)
+    for stream in streams:
+        stream.put(scheduler)
+    started = time.perf_counter()
+    batch = scheduler.next_batch(threading.Event())
+    assert time.perf_counter() - started < 0.5
+    assert sorted(names(batch)) == ["cam0", "cam1", "cam2"]
+    assert all(stream.busy and stream.packet is None for stream in streams)
+
+
+def test_partial_batch_after_latency_budget():
+    scheduler, streams = scheduler_with(BatchScheduler(max_batch=8, latency_budget=0.05), 3)
+    streams[0].put(scheduler)
+    streams[1].put(scheduler)
+    started = time.perf_counter()
+    batch = scheduler.next_batch(threading.Event())
+    assert time.perf_counter() - started >= 0.04
+    assert sorted(names(batch)) == ["cam0", "cam1"]
+
+
+def test_late_frame_joins_batch():
+    scheduler, streams = scheduler_with(BatchScheduler(max_batch=8, latency_budget=1.0), 2)
+    streams[0].put(scheduler)
+    threading.Timer(0.05, streams[1].put, (scheduler,)).start()
+    started = time.perf_counter()
+    batch = scheduler.next_batch(threading.Event())
+    assert time.perf_counter() - started < 0.5
+    assert sorted(names(batch)) == ["cam0", "cam1"]
+
+
+def test_max_batch_takes_oldest_turns_first():
+    scheduler, streams = scheduler_with(BatchScheduler(max_batch=2, latency_budget=1.0, max_rate=1000.0), 4)
+    for stream, due in zip(streams, (0.3, 0.1, 0.4, 0.2)):
+        stream.next_due = due
+        stream.put(scheduler)
+    stop_event = threading.Event()
+    assert names(scheduler.next_batch(stop_event)) == ["cam1", "cam3"]
+    assert names(scheduler.next_batch(stop_event)) == ["cam0", "cam2"]
+    assert scheduler.batches == 2
+    assert scheduler.mean_batch_size() == 2.0
+
+
+def test_busy_and_stopped_streams_left_out():
+    scheduler, streams = scheduler_with(BatchScheduler(max_batch=8, latency_budget=1.0), 3)
+    streams[0].busy = True
+    streams[1].stop_event.set()
+    for stream in streams:
+        stream.put(scheduler)
+    # cam2 is the only stream that can take a frame, so it need not wait
+    assert names(scheduler.next_batch(threading.Event())) == ["cam2"]
+    scheduler.done([streams[0]])
+    assert not streams[0].busy
+
+
+def test_batch_rate_limit():
+    scheduler, streams = scheduler_with(BatchScheduler(max_batch=8, latency_budget=0.0, max_rate=10.0), 1)
+    stop_event = threading.Event()
+    streams[0].put(scheduler)
+    scheduler.next_batch(stop_event)
+    scheduler.done(streams)
+    streams[0].put(scheduler)
+    started = time.perf_counter()
+    scheduler.next_batch(stop_event)
+    assert time.perf_counter() - started >= 0.08
+
+
+def test_next_batch_returns_none_on_stop():
+    scheduler, _ = scheduler_with(BatchScheduler(), 2)
+    stop_event = threading.Event()
+    threading.Timer(0.05, stop_event.set).start()
+    assert scheduler.next_batch(stop_event) is None
+
+
+def test_stream_scheduler_round_robin():
+    scheduler, streams = scheduler_with(StreamScheduler(max_rate=1000.0), 3)
+    stop_event = threading.Event()
+    served = []
+    for _ in range(6):
+        for stream in streams:
+            if stream.packet is None:
+                stream.put(scheduler)
+        stream, packet = scheduler.next(stop_event)
+        assert stream.busy and packet is not None
+        served.append(stream.name)
+        scheduler.done(stream)
+        # Still overloaded: the stream just served is due again straight away
+        time.sleep(0.002)
+    assert served == ["cam0", "cam1", "cam2"] * 2
+
+
+def test_stream_scheduler_skips_busy_and_rate_limits():
+    scheduler, streams = scheduler_with(StreamScheduler(max_rate=10.0), 2)
+    stop_event = threading.Event()
+    for stream in streams:
+        stream.put(scheduler)
+    first, _ = scheduler.next(stop_event)
+    second, _ = scheduler.next(stop_event)
+    assert {first.name, second.name} == {"cam0", "cam1"}
+    scheduler.done(first)
+    first.put(scheduler)
+    started = time.perf_counter()
+    assert scheduler.next(stop_event)[0] is first
+    assert time.perf_counter() - started >= 0.08
+    threading.Timer(0.05, stop_event.set).start()
+    # second is still busy and first has no new frame
+    assert scheduler.next(stop_event) is None
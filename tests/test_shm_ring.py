@@ -0,0 +1,131 @@
+"""
+The frame ring's slot handoff across two processes: the app side writes
+frames as fast as it can while a worker checks every frame it is lent,
+before and after a stand-in for inference, for pixels from another frame.
+"""
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from shm_ring import FrameRing, InferenceProcess
+
+# Worker side, with the real RingInput / RecordOutput and a check in place
+# of the model; a torn frame comes back as a detection with class 1
+CHECKER = """
+import os, random, sys, threading, time
+import numpy as np
+from shm_ring import READY, RECORD, FrameRing, RecordOutput, RingInput
+ring = FrameRing(tuple(int(size) for size in sys.argv[2].split(",")), int(sys.argv[3]), sys.argv[1])
+records = os.fdopen(1, "wb")
+records.write(RECORD.pack(READY, 0.0, 0.0, 2) + b"{}")
+records.flush()
+stop_event = threading.Event()
+inputs, output = RingInput(ring, 0, stop_event), RecordOutput(records, stop_event)
+while not stop_event.is_set():
+    packet = inputs.get()
+    if packet is None:
+        break
+    frame_index, capture_time, frame = packet
+    expected = frame_index % 251
+    intact = bool((frame == expected).all())
+    time.sleep(random.uniform(0, 0.002))
+    intact = intact and bool((frame == expected).all())
+    output.put((frame_index, capture_time, np.array([[0, 0, 1, 1, 1, 0 if intact else 1]], np.float32)))
+ring.close()
+"""
+
+
+class CheckerProcess(InferenceProcess):
+    def command(self, config):
+        return [sys.executable, "-c", CHECKER, self.ring.name, ",".join(map(str, self.ring.shape)),
+                str(self.ring.slots)]
+
+
+class Results:
+    def __init__(self):
+        self.packets = []
+
+    def put(self, packet):
+        self.packets.append(packet)
+
+
+@pytest.mark.parametrize("slots", [3, 4])
+def test_worker_never_sees_torn_frame(slots):
+    shape = (240, 320, 3)
+    results = Results()
+    worker = CheckerProcess(FrameRing(shape, slots), {}, results)
+    assert worker.ready.wait(10.0)
+    frames = [np.full(shape, value, np.uint8) for value in range(251)]
+    deadline = time.perf_counter() + 2.0
+    frame_index = 0
+    while time.perf_counter() < deadline:
+        worker.put((frame_index, float(frame_index), frames[frame_index % 251]))
+        frame_index += 1
+    # Let the last lent frame come back
+    time.sleep(0.1)
+    worker.join(5.0)
+
+    assert worker.error is None
+    assert len(results.packets) > 50
+    indices = [packet[0] for packet in results.packets]
+    assert indices == sorted(set(indices))
+    torn = [packet[0] for packet in results.packets if packet[2][0, 5] != 0]
+    assert torn == []
+
+
+def test_worker_gets_newest_frame():
+    shape = (8, 8, 3)
+    results = Results()
+    worker = CheckerProcess(FrameRing(shape, 3), {}, results)
+    assert worker.ready.wait(10.0)
+    # Frames written while nothing is asked for replace each other
+    with worker.lock:
+        worker.wanted = False
+    for frame_index in range(10):
+        worker.put((frame_index, 0.0, np.full(shape, frame_index, np.uint8)))
+    worker.release()
+    for _ in range(100):
+        if results.packets:
+            break
+        time.sleep(0.01)
+    worker.join(5.0)
+    assert [packet[0] for packet in results.packets] == [9]
+
+
+def test_ring_needs_three_slots():
+    ring = FrameRing((4, 4, 3), 2)
+    with pytest.raises(ValueError):
+        InferenceProcess(ring, {}, Results())
+    ring.close()
+
+
+
+def test_attached_ring_sees_frames():
+    ring = FrameRing((4, 6, 3), 3)
+    other = FrameRing((4, 6, 3), 3, ring.name)
+    frame = np.arange(72, dtype=np.uint8).reshape(4, 6, 3)
+    ring.store(1, frame)
+    np.testing.assert_array_equal(other.frames[1], frame)
+    # A frame of another size (the camera switched modes) is scaled into the slot
+    ring.store(2, np.full((8, 12, 3), 7, np.uint8))
+    np.testing.assert_array_equal(other.frames[2], 7)
+    other.close()
+    ring.close()
+
+
+class ExitingProcess(InferenceProcess):
+    def command(self, config):
+        return [sys.executable, "-c", "import sys; sys.exit(3)"]
+
+
+def test_worker_exit_reported():
+    worker = ExitingProcess(FrameRing((4, 4, 3), 3), {}, Results())
+    worker.receiver.join(10.0)
+    assert not worker.ready.is_set()
+    assert "code 3" in str(worker.error)
+    worker.join(5.0)
+    # join() also removes the shared memory
+    with pytest.raises(FileNotFoundError):
+        FrameRing((4, 4, 3), 3, worker.ring.name)
@@ -0,0 +1,33 @@
+import functools
+
+import cv2
+
+
+@functools.lru_cache(maxsize=1024)
+def text_size(text, font, scale, thickness):
+    # Memoized cv2.getTextSize; the overlay measures the same labels every frame
+    return cv2.getTextSize(text, font, scale, thickness)
+
+
+@functools.lru_cache(maxsize=64)
+def wrap_text(text, font, scale, thickness, max_width):
+    """
+    Word-wrap text (which may contain newlines) to max_width pixels. Returns a
+    tuple of (line, row) pairs, where row is the line's index from the top, so
+    callers only have to multiply by their line spacing to place it.
+    """
+    layout = []
+    for i, line in enumerate(text.split('\n')):
+        current_line = ""
+        line_num = 0
+        for word in line.split():
+            test_line = (current_line + " " + word).strip() if current_line else word
+            if text_size(test_line, font, scale, thickness)[0][0] < max_width:
+                current_line = test_line
+            else:
+                layout.append((current_line, i + line_num))
+                line_num += 1
+                current_line = word
+        if current_line:
+            layout.append((current_line, i + line_num))
+    return tuple(layout)
@@ -0,0 +1,173 @@
+import collections
+
+import cv2
+
+from overlays import render_layer
+
+
+class Widget:
+    """
+    Rectangle in the widget tree. Positions are relative to the parent; a
+    widget with an on_click handler is a hit target.
+    """
+
+    def __init__(self, x=0, y=0, width=0, height=0, on_click=None):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.on_click = on_click
+        self.visible = True
+        self.parent = None
+        self.children = []
+
+    def add(self, child):
+        child.parent = self
+        self.children.append(child)
+        self.invalidate_layout()
+        return child
+
+    def root(self):
+        widget = self
+        while widget.parent is not None:
+            widget = widget.parent
+        return widget
+
+    def invalidate_layout(self):
+        self.root().layout_changed = True
+
+    def set_rect(self, x, y, width=None, height=None):
+        width = self.width if width is None else width
+        height = self.height if height is None else height
+        if (x, y, width, height) != (self.x, self.y, self.width, self.height):
+            self.x, self.y, self.width, self.height = x, y, width, height
+            self.resized()
+            self.invalidate_layout()
+
+    def set_visible(self, visible):
+        if visible != self.visible:
+            self.visible = visible
+            self.invalidate_layout()
+
+    def resized(self):
+        pass
+
+    def absolute_position(self):
+        x, y = self.x, self.y
+        parent = self.parent
+        while parent is not None:
+            x += parent.x
+            y += parent.y
+            parent = parent.parent
+        return x, y
+
+    def walk_visible(self):
+        if not self.visible:
+            return
+        yield self
+        for child in self.children:
+            yield from child.walk_visible()
+
+    def draw(self, frame, layers):
+        for child in self.children:
+            if child.visible:
+                child.draw(frame, layers)
+
+
+class Panel(Widget):
+    """
+    Widget whose pixels come from a cached layer. render(canvas, state) is only
+    called again when update() is given a different state (text, toggles,
+    cursor blink...) or the panel is resized; every other frame the layer is
+    just composited. An optional translucent background is blended underneath
+    because the video behind it changes every frame.
+    """
+
+    def __init__(self, x, y, width, height, render, background=None, background_alpha=1.0,
+                 opaque=False, layer_alpha=None, on_click=None):
+        super().__init__(x, y, width, height, on_click)
+        self.render = render
+        self.background = background
+        self.background_alpha = background_alpha
+        self.opaque = opaque
+        self.layer_alpha = layer_alpha
+        self.state = None
+        self.layer = None
+        self.dirty = True
+
+    def update(self, state):
+        if state != self.state:
+            self.state = state
+            self.dirty = True
+
+    def resized(self):
+        self.dirty = True
+
+    def draw(self, frame, layers):
+        if self.dirty:
+            self.layer = render_layer(self.width, self.height,
+                                      lambda canvas: self.render(canvas, self.state), self.opaque)
+            self.dirty = False
+        x, y = self.absolute_position()
+        if self.background is not None:
+            layers.blend_rect(frame, x, y, x + self.width - 1, y + self.height - 1,
+                              self.background, self.background_alpha)
+        if self.layer_alpha is None:
+            self.layer.draw(frame, x, y)
+        else:
+            self.layer.blend(frame, x, y, self.layer_alpha)
+        super().draw(frame, layers)
+
+
+class HitTestIndex:
+    """
+    Uniform grid over the window: each cell lists the clickable widgets that
+    overlap it, in drawing order, so a click only tests a handful of rectangles.
+    """
+
+    def __init__(self, cell_size=32):
+        self.cell_size = cell_size
+        self.cells = collections.defaultdict(list)
+
+    def rebuild(self, widgets):
+        self.cells.clear()
+        for widget in widgets:
+            x, y = widget.absolute_position()
+            for cx in range(x // self.cell_size, (x + widget.width - 1) // self.cell_size + 1):
+                for cy in range(y // self.cell_size, (y + widget.height - 1) // self.cell_size + 1):
+                    self.cells[(cx, cy)].append((x, y, widget))
+
+    def hit(self, x, y):
+        # Topmost (last drawn) widget under the point
+        for wx, wy, widget in reversed(self.cells.get((x // self.cell_size, y // self.cell_size), ())):
+            if wx <= x < wx + widget.width and wy <= y < wy + widget.height:
+                return widget
+        return None
+
+
+class WidgetTree(Widget):
+    """
+    Root of the widget tree. The OpenCV mouse callback only queues clicks;
+    dispatch_events() runs their handlers from the main loop, so handlers can
+    change app state without racing the frame being drawn.
+    """
+
+    def __init__(self, cell_size=32):
+        super().__init__()
+        self.index = HitTestIndex(cell_size)
+        self.events = collections.deque()
+        self.layout_changed = True
+
+    def mouse_callback(self, event, x, y, flags, param):
+        if event == cv2.EVENT_LBUTTONDOWN:
+            self.events.append((x, y))
+
+    def dispatch_events(self):
+        while self.events:
+            x, y = self.events.popleft()
+            if self.layout_changed:
+                self.index.rebuild([w for w in self.walk_visible() if w.on_click is not None])
+                self.layout_changed = False
+            widget = self.index.hit(x, y)
+            if widget is not None:
+                widget.on_click()